@@ -1,20 +1,31 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots # Importação necessária para eixos duplos
 from streamlit_autorefresh import st_autorefresh # Rodízio automático
 from datetime import datetime
 import os
 
 # --- IMPORTAÇÃO SEGURA DOS LOADERS ---
 try:
-    from data_loader.loader import load_dashboard_data # Carregador GSheets (MRR/LTV)
+    from data_loader.dataset import load_prepared_dataset # Dados MRR/LTV preparados uma vez por carga
+    from data_loader.periods import month_label # Meses como períodos reais (PeriodIndex)
+    from data_loader.loader import load_dashboard_snapshot # Snapshot local (arranque a quente)
+    from data_loader.snapshot import format_snapshot_age
+    from dashboard.render_cache import get_render_cache # [NOVO] Telas pré-calculadas por versão dos dados
+    from dashboard.views import END_P, PAGE_OPTIONS, START_P, ViewFilters, default_filters, render_view
+    from dashboard.formatting import format_percent # [NOVO] Formatação pt-BR partilhada
+    from data_loader.tracing import get_tracer, span # [NOVO] Tempos por etapa (painel com ?perf=1)
+    from dashboard.perf_panel import render_perf_panel
+    from dashboard.rotation import ROTATION_CLIENT, ROTATION_MODES, ROTATION_SECONDS, rotation_css, slot_key, watch_data_version # [NOVO] Rodízio no navegador
     # [COMENTADO COM #]
     # from data_loader.loader_leads import load_leads_data # Carregador CSV (Leads)
 except ImportError as e:
     st.error(f"Erro de Estrutura: Não foi possível encontrar os ficheiros na pasta 'data_loader'. Detalhe: {e}")
     st.stop()
 
+# [NOVO] Agrupa os tempos de cada etapa deste rerun (carga, filtros, telas, gráficos)
+tracer = get_tracer()
+tracer.start_rerun("MRR_app")
+
 # Configuração da página - Restaurado para estado expandido
 st.set_page_config(page_title="Dashboard MRR", layout="wide", initial_sidebar_state="expanded")
 
@@ -114,72 +125,52 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# --- FUNÇÕES DE FORMATAÇÃO ---
-def format_currency(value):
-    try:
-        val = float(value)
-        if pd.isna(val): return "R$ 0,00"
-        return f"R$ {val:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-    except: return "R$ 0,00"
-
-def format_percent(value):
-    try:
-        val = float(value)
-        if pd.isna(val): return "0,0%"
-        return f"{val:.1%}".replace('.', ',')
-    except: return "0,0%"
-
-def clean_sheets_numeric(val):
-    if pd.isna(val) or val == "" or str(val).strip() == "": return 0.0
-    if isinstance(val, (int, float)): return float(val)
-    try:
-        s = str(val).replace('R$', '').replace(' ', '').strip()
-        if '.' in s and ',' in s: s = s.replace('.', '').replace(',', '.')
-        elif ',' in s: s = s.replace(',', '.')
-        return float(s)
-    except: return 0.0
-
 # --- CARREGA DADOS ---
-df = load_dashboard_data()
+# [ALTERAÇÃO] O dataset é preparado uma única vez por carga e partilhado entre reruns:
+# as telas apenas leem dele (sem df.copy() nem nova limpeza de colunas)
+ds = load_prepared_dataset()
 
 # --- PRÉ-CÁLCULOS GERAIS ---
 all_months_list = []
-current_month_str = ""
-if not df.empty:
-    month_map = {'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4, 'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12}
-    def get_sort_key(ms):
-        try:
-            m, y = ms.lower().split('/')
-            m_val = int(m) if m.isdigit() else month_map.get(m, 0)
-            return (int(y), m_val)
-        except: return (0, 0)
+current_month = pd.Period(datetime.now(), 'M')
+if not ds.empty:
+    all_months_list = list(ds.months)
 
-    all_months_list = sorted(df['Mes'].unique(), key=get_sort_key)
-    now = datetime.now()
-    current_month_str = now.strftime('%m/%Y') 
-
-    if current_month_str in all_months_list:
-        idx_curr = all_months_list.index(current_month_str)
-        default_month_selection = [current_month_str]
-        past_and_current_months = all_months_list[:idx_curr + 1]
-    else:
-        default_month_selection = [all_months_list[-1]] if all_months_list else []
-        past_and_current_months = all_months_list
+    # [ALTERAÇÃO] Seleção padrão partilhada com a exportação estática (dashboard/static_export.py)
+    auto_filters = default_filters(ds.months, current_month)
+    past_and_current_months = list(auto_filters.acumulado)
+    # [ALTERAÇÃO] O mês de referência não entra nos cálculos das telas nem na chave da RenderCache
+    default_month_selection = [current_month] if current_month in ds.months else all_months_list[-1:]
 
 # --- NAVEGAÇÃO E RODÍZIO ---
 st.sidebar.header("Controlos de Visualização")
 auto_rotate = st.sidebar.checkbox("Rodízio automático (30s)", value=True)
-page_options = ['Receita', 'LTV', 'Ticket Médio', 'Clientes'] 
+page_options = PAGE_OPTIONS
+# [NOVO] "No navegador": as 4 telas são montadas uma vez por versão dos dados e o
+# navegador alterna entre elas; o servidor só volta a correr quando os dados mudam.
+# "No servidor": o rodízio antigo, com um rerun completo a cada 30s.
+client_rotation = False
 
 if auto_rotate:
-    count = st_autorefresh(interval=30000, key="view_switcher")
-    view_to_show = page_options[count % len(page_options)]
+    rotation_mode = st.sidebar.radio("Modo do rodízio", ROTATION_MODES)
+    client_rotation = rotation_mode == ROTATION_CLIENT
+    if client_rotation:
+        view_to_show = None
+    else:
+        count = st_autorefresh(interval=ROTATION_SECONDS * 1000, key="view_switcher")
+        view_to_show = page_options[count % len(page_options)]
 else:
     view_to_show = st.sidebar.radio("Navegar para:", page_options)
 
 # --- FILTROS ---
 st.sidebar.markdown("---")
-if not df.empty:
+if not ds.empty:
+    # [NOVO] Idade do snapshot local (serve o último snapshot enquanto atualiza em segundo plano)
+    st.sidebar.caption(format_snapshot_age(load_dashboard_snapshot()))
+    # [NOVO] Colunas em falta ou com nome alternativo (validadas uma vez por carga pelo MRR_SCHEMA)
+    if ds.report is not None and not ds.report.clean:
+        for mensagem in ds.report.messages():
+            st.sidebar.warning(mensagem)
     if auto_rotate:
         # Se estiver em rodízio, usa os valores padrão automaticamente
         selected_months_acumulado = past_and_current_months
@@ -187,30 +178,24 @@ if not df.empty:
         st.sidebar.info("Modo Automático Ativado")
     else:
         # Se o rodízio estiver desligado, permite controlo manual
-        selected_months_acumulado = st.sidebar.multiselect("Filtrar Acumulado (Cards)", options=all_months_list, default=past_and_current_months)
-        selected_months_mrr = st.sidebar.multiselect("Filtrar Referência", options=all_months_list, default=default_month_selection)
+        selected_months_acumulado = st.sidebar.multiselect("Filtrar Acumulado (Cards)", options=all_months_list, default=past_and_current_months, format_func=month_label)
+        selected_months_mrr = st.sidebar.multiselect("Filtrar Referência", options=all_months_list, default=default_month_selection, format_func=month_label)
 else:
     st.sidebar.warning("Carregando base de dados...")
 
-# --- LÓGICA DE EXIBIÇÃO POR PÁGINA ---
-if df.empty:
-    st.error("Não foi possível carregar os dados. Verifique a planilha 'DADOS STREAMLIT'.")
-else:
+# --- TELAS ---
+def show_view(view_to_show, view):
+    """Exibe uma tela já calculada (RenderedView) na posição atual da página."""
+    values = view.values
+
     if view_to_show == 'Receita':
         # --- TELA 1: RECEITA ---
         st.subheader("Receita x Meta")
-        df_ac_vigente = df[df['Mes'].isin(selected_months_acumulado)]
-        acum_vigente = df_ac_vigente['Receita Realizada'].sum()
-        
-        META_VALOR = 1400000.0
-        start_p, end_p = '08/2025', '08/2026'
-        range_total_periodo = [m for m in all_months_list if get_sort_key(start_p) <= get_sort_key(m) <= get_sort_key(end_p)]
-        total_periodo = df[df['Mes'].isin(range_total_periodo)]['Receita Realizada'].sum()
-        progresso = total_periodo / META_VALOR if META_VALOR else 0
+        progresso = values["progresso"]
 
         c1, c2, c3 = st.columns(3)
-        with c1: st.metric("Receita Acumulada", format_currency(acum_vigente))
-        with c2: st.metric("Receita Total (Ago/25 - Ago/26)", format_currency(total_periodo))
+        with c1: st.metric("Receita Acumulada", values["acum_vigente"])
+        with c2: st.metric("Receita Total (Ago/25 - Ago/26)", values["total_periodo"])
         with c3:
             with st.container(border=True):
                 st.markdown("<h6>Progresso da Meta</h6>", unsafe_allow_html=True)
@@ -218,141 +203,79 @@ else:
                 # Implementação da "Flag" Verde para o percentual
                 st.markdown(f"""
                     <div class="goal-badge-container">
-                        <span class="goal-badge">{progresso:.1%}</span>
+                        <span class="goal-badge">{format_percent(progresso)}</span>
                         <span class="goal-subtext">de R$ 1.400.000</span>
                     </div>
                 """, unsafe_allow_html=True)
 
         st.markdown("---")
         st.subheader("Resultado x Faturamento")
-        res_col = next((c for c in ['Resultado Acumulado', 'Resultado AC', 'AC'] if c in df.columns), None)
-        if res_col:
-            df_safe = df.copy()
-            df_safe[res_col] = df_safe[res_col].apply(clean_sheets_numeric)
-            res_vigente = df_safe[df_safe['Mes'].isin(selected_months_acumulado)][res_col].sum()
-            res_total = df_safe[df_safe['Mes'].isin(range_total_periodo)][res_col].sum()
-            perc_res = res_vigente / acum_vigente if acum_vigente else 0
-            
+        if values["result_column"]:
             r1, r2, r3 = st.columns(3)
-            with r1: st.metric("Resultado Acumulado", format_currency(res_vigente))
-            with r2: st.metric(label="Resultado / Receita %", value=format_percent(perc_res))
-            with r3: st.metric(f"Resultado Total ({start_p}-{end_p})", format_currency(res_total))
+            with r1: st.metric("Resultado Acumulado", values["res_vigente"])
+            with r2: st.metric(label="Resultado / Receita %", value=values["perc_res"])
+            with r3: st.metric(f"Resultado Total ({START_P}-{END_P})", values["res_total"])
 
     elif view_to_show == 'LTV':
         # --- TELA 2: LTV ---
-        range_vigente_ltv = [m for m in all_months_list if get_sort_key('08/2025') <= get_sort_key(m) <= get_sort_key(current_month_str)]
-        df_ltv_vig = df[df['Mes'].isin(range_vigente_ltv)].copy()
-        range_total_ltv = [m for m in all_months_list if get_sort_key('08/2025') <= get_sort_key(m) <= get_sort_key('08/2026')]
-        df_ltv_tot = df[df['Mes'].isin(range_total_ltv)].copy()
-
         st.subheader("LTV por Plano (Média Vigente)")
         l1, l2, l3 = st.columns(3)
-        v_ess = df_ltv_vig['LTV Essencial'].apply(clean_sheets_numeric).mean() if 'LTV Essencial' in df_ltv_vig.columns else 0
-        v_ven = df_ltv_vig['LTV Vender'].apply(clean_sheets_numeric).mean() if 'LTV Vender' in df_ltv_vig.columns else 0
-        v_ava = df_ltv_vig['LTV Avancado'].apply(clean_sheets_numeric).mean() if 'LTV Avancado' in df_ltv_vig.columns else 0
-        
-        with l1: st.metric("LTV Essencial", format_currency(v_ess))
-        with l2: st.metric("LTV Vender", format_currency(v_ven))
-        with l3: st.metric("LTV Avançado", format_currency(v_ava))
+        with l1: st.metric("LTV Essencial", values["v_ess"])
+        with l2: st.metric("LTV Vender", values["v_ven"])
+        with l3: st.metric("LTV Avançado", values["v_ava"])
 
         st.markdown("---")
         st.subheader("LTV por Plano (Média Anual)")
         lt1, lt2, lt3 = st.columns(3)
-        v_ess_t = df_ltv_tot['LTV Essencial Total'].apply(clean_sheets_numeric).mean() if 'LTV Essencial Total' in df_ltv_tot.columns else 0
-        v_ven_t = df_ltv_tot['LTV Vender Total'].apply(clean_sheets_numeric).mean() if 'LTV Vender Total' in df_ltv_tot.columns else 0
-        v_ava_t = df_ltv_tot['LTV Avancado Total'].apply(clean_sheets_numeric).mean() if 'LTV Avancado Total' in df_ltv_tot.columns else 0
-
-        with lt1: st.metric("Essencial Total", format_currency(v_ess_t))
-        with lt2: st.metric("Vender Total", format_currency(v_ven_t))
-        with lt3: st.metric("Avançado Total", format_currency(v_ava_t))
+        with lt1: st.metric("Essencial Total", values["v_ess_t"])
+        with lt2: st.metric("Vender Total", values["v_ven_t"])
+        with lt3: st.metric("Avançado Total", values["v_ava_t"])
 
     elif view_to_show == 'Ticket Médio':
         # --- TELA 3: TICKET MÉDIO ---
-        chart_df = df.copy()
-        chart_df['Mes'] = pd.Categorical(chart_df['Mes'], categories=all_months_list, ordered=True)
-        chart_df = chart_df.sort_values('Mes').set_index('Mes')
-        range_tm = [m for m in all_months_list if get_sort_key('08/2025') <= get_sort_key(m) <= get_sort_key(current_month_str)]
-        
         st.subheader("🎟️ Ticket Médio Geral")
         with st.container():
-            if 'TM Geral' in chart_df.columns:
-                df_tm_chart = chart_df[chart_df.index.isin(range_tm)]
-                fig_tm = go.Figure(go.Bar(
-                    x=df_tm_chart.index, 
-                    y=df_tm_chart['TM Geral'], 
-                    marker=dict(color='#41D9FF', line=dict(width=0)), 
-                    text=[format_currency(v) for v in df_tm_chart['TM Geral']], 
-                    textposition='auto'
-                ))
-                fig_tm.update_layout(
-                    height=450, 
-                    paper_bgcolor='rgba(0,0,0,0)', 
-                    plot_bgcolor='rgba(0,0,0,0)', 
-                    font=dict(color="white", size=10),
-                    margin=dict(t=30, b=10, l=10, r=10),
-                    xaxis=dict(showgrid=False),
-                    yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)')
-                )
-                st.plotly_chart(fig_tm, use_container_width=True)
+            if "fig_tm" in view.figures:
+                with span("plotly_chart"):
+                    st.plotly_chart(view.figures["fig_tm"], use_container_width=True)
 
     elif view_to_show == 'Clientes':
         # --- TELA 4: CLIENTES (EVOLUÇÃO CRUZADA COM FATURAMENTO) ---
-        chart_df = df.copy()
-        chart_df['Mes'] = pd.Categorical(chart_df['Mes'], categories=all_months_list, ordered=True)
-        chart_df = chart_df.sort_values('Mes').set_index('Mes')
-        
-        # Range solicitado: Ago/25 até Ago/26
-        range_cli = [m for m in all_months_list if get_sort_key('08/2025') <= get_sort_key(m) <= get_sort_key('08/2026')]
-        df_cli_chart = chart_df[chart_df.index.isin(range_cli)]
-        
         st.subheader("Evolução: Clientes x Faturamento")
         with st.container():
-            fig_combined = make_subplots(specs=[[{"secondary_y": True}]])
-
-            fig_combined.add_trace(
-                go.Scatter(
-                    x=df_cli_chart.index, 
-                    y=df_cli_chart['Receita Realizada'], 
-                    name="Faturamento (R$)",
-                    mode='lines+markers+text', 
-                    line=dict(color='#41D9FF', width=4, shape='spline'),
-                    marker=dict(size=8),
-                    text=[f"R${v/1000:,.0f}k" for v in df_cli_chart['Receita Realizada']],
-                    textposition='top left'
-                ),
-                secondary_y=False,
-            )
+            with span("plotly_chart"):
+                st.plotly_chart(view.figures["fig_combined"], use_container_width=True)
 
-            fig_combined.add_trace(
-                go.Scatter(
-                    x=df_cli_chart.index, 
-                    y=df_cli_chart['Total de Clientes Realizados'], 
-                    name="Clientes (Un)",
-                    mode='lines+markers+text', 
-                    line=dict(color='#69FF4E', width=4, shape='spline'),
-                    marker=dict(size=8),
-                    text=df_cli_chart['Total de Clientes Realizados'], 
-                    textposition='bottom right'
-                ),
-                secondary_y=True,
-            )
 
-            fig_combined.update_layout(
-                height=500, 
-                paper_bgcolor='rgba(0,0,0,0)', 
-                plot_bgcolor='rgba(0,0,0,0)', 
-                font=dict(color="white", size=10),
-                margin=dict(t=30, b=10, l=10, r=10),
-                xaxis=dict(showgrid=False),
-                # [ALTERAÇÃO] Legenda movida para a esquerda (x=0, xanchor="left")
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0)
-            )
-
-            fig_combined.update_yaxes(title_text="Faturamento (R$)", secondary_y=False, gridcolor='rgba(255,255,255,0.05)')
-            fig_combined.update_yaxes(title_text="Clientes (Un)", secondary_y=True, showgrid=False)
+# --- LÓGICA DE EXIBIÇÃO POR PÁGINA ---
+if ds.empty:
+    st.error("Não foi possível carregar os dados. Verifique a planilha 'DADOS STREAMLIT'.")
+else:
+    # [ALTERAÇÃO] Os valores e gráficos de cada tela são calculados uma vez por
+    # (tela, versão dos dados, filtros) e partilhados entre reruns e TVs:
+    # um tique do rodízio só repete o resultado guardado.
+    render_cache = get_render_cache()
+    filters = ViewFilters.of(selected_months_acumulado, current_month)
+    if client_rotation:
+        # [NOVO] Todas as telas na página, alternadas pelo navegador (CSS) a cada 30s
+        st.markdown(rotation_css(len(page_options)), unsafe_allow_html=True)
+        for index, name in enumerate(page_options):
+            with st.container(key=slot_key(index)):
+                show_view(name, render_view(render_cache, name, ds, filters))
+        # Rerun completo só quando chega uma nova versão dos dados (ou muda o mês)
+        watch_data_version(ds.version, current_month)
+    else:
+        show_view(view_to_show, render_view(render_cache, view_to_show, ds, filters))
 
-            st.plotly_chart(fig_combined, use_container_width=True)
+    # [NOVO] Estatísticas da cache de telas (várias TVs servidas pelo mesmo servidor)
+    stats = render_cache.stats()
+    with st.sidebar.expander("Cache de telas"):
+        st.caption(f"Acertos: {stats['hits']} · Falhas: {stats['misses']} · "
+                   f"Taxa: {stats['hit_rate']:.0%} · Entradas: {stats['entries']}")
 
     # --- PÁGINA DE LEADS (COMENTADA COM #) ---
     # elif view_to_show == 'Leads':
-    #     ...
\ No newline at end of file
+    #     ...
+
+# [NOVO] Painel de desempenho (escondido; aparece com ?perf=1 no URL)
+render_perf_panel(tracer, tracer.end_rerun())
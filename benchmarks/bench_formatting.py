@@ -0,0 +1,92 @@
+"""
+Benchmark da formatação pt-BR (dashboard/formatting.py).
+
+Compara, para uma coluna de valores em reais com alguns vazios (NaN):
+
+- o formato antigo das páginas: f"R$ {v:,.2f}" + três .replace() por valor;
+- format_currency escalar, com a cache LRU vazia e já preenchida (os mesmos
+  valores a cada render, como nos cards das TVs);
+- format_currency_array, format_percent_array e format_thousands_array,
+  que formatam a coluna inteira de uma vez (rótulos dos gráficos).
+
+Uso:
+    python benchmarks/bench_formatting.py [--rows 100000] [--distinct 2000] [--repeat 5] [--json resultados.json]
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+import fixtures  # noqa: F401 - acrescenta a raiz do projeto ao sys.path
+
+
+def legacy_currency(value):
+    """format_currency de antes (MRR_app.py / dashboard/views.py)."""
+    try:
+        val = float(value)
+        if pd.isna(val): return "R$ 0,00"
+        return f"R$ {val:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+    except: return "R$ 0,00"
+
+
+def values(rows, distinct, seed=7):
+    """Valores em reais (0 a 2 milhões, com centavos), `distinct` diferentes e ~2% de vazios."""
+    rng = np.random.default_rng(seed)
+    valores = np.round(rng.uniform(0, 2_000_000, distinct), 2)
+    serie = pd.Series(rng.choice(valores, rows))
+    serie[rng.random(rows) < 0.02] = np.nan
+    return serie
+
+
+def median_ms(fn, repeat, setup=None):
+    tempos = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - started) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="valores na coluna")
+    parser.add_argument("--distinct", type=int, default=2000,
+                        help="valores diferentes (acima de formatting.CACHE_SIZE a cache LRU deixa de ajudar)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="grava os resultados neste ficheiro JSON")
+    args = parser.parse_args()
+
+    from dashboard import formatting
+
+    serie = values(args.rows, args.distinct)
+    fracoes = serie / 2_000_000
+    esperado = [legacy_currency(v) for v in serie]
+    assert list(formatting.format_currency_array(serie)) == esperado, "format_currency_array difere do formato antigo"
+
+    results = {
+        "legacy_scalar": median_ms(lambda: serie.map(legacy_currency), args.repeat),
+        "scalar_cold": median_ms(lambda: serie.map(formatting.format_currency), args.repeat,
+                                 setup=formatting._number.cache_clear),
+        "scalar_warm": median_ms(lambda: serie.map(formatting.format_currency), args.repeat),
+        "currency_array": median_ms(lambda: formatting.format_currency_array(serie), args.repeat),
+        "percent_array": median_ms(lambda: formatting.format_percent_array(fracoes), args.repeat),
+        "thousands_array": median_ms(lambda: formatting.format_thousands_array(serie), args.repeat),
+    }
+
+    base = results["legacy_scalar"]
+    print(f"{'formatação':<20}{'ms':>10}{'vs antigo':>12}   ({args.rows} valores, {args.distinct} diferentes)")
+    for name, ms in results.items():
+        print(f"{name:<20}{ms:>10.2f}{base / ms:>11.1f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"rows": args.rows, "distinct": args.distinct, "median_ms": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark de memória e serialização dos DataFrames dos loaders.
+
+Compara, para os mesmos dados sintéticos (benchmarks/fixtures.py), o que os
+loaders devolviam antes do esquema compacto (a mesma leitura, sem
+compact_frame: números da planilha em float64, a aba operacional como o
+get_as_dataframe a entrega e o CSV de leads com 'Periodo' em string e
+contagens em Int64 com <NA>) com o que devolvem agora (data_loader/dtypes.py).
+Para cada fonte mede:
+
+- bytes em memória (memory_usage(deep=True));
+- tamanho e tempo do pickle (o que o st.cache_data faria a cada leitura);
+- tamanho e tempo do snapshot Parquet (o que o SnapshotStore grava);
+- tempo de uma cópia completa (df.copy()).
+
+Uso:
+    python benchmarks/bench_memory.py [--rows 24] [--leads-months 36] [--repeat 5] [--json resultados.json]
+"""
+import argparse
+import io
+import json
+import os
+import pickle
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+import fixtures  # noqa: E402 - também acrescenta a raiz do projeto ao sys.path
+
+
+def legacy_mrr(worksheet):
+    """fetch_dashboard_data antes do esquema compacto: tudo o que é número em float64."""
+    from gspread_dataframe import get_as_dataframe
+
+    from data_loader.loader import MRR_SCHEMA
+    from data_loader.parsing import clean_numeric_columns
+    from data_loader.periods import parse_months
+
+    df = get_as_dataframe(worksheet, header=0, value_render_option='FORMATTED_VALUE', evaluate_formulas=True)
+    df.columns = df.columns.str.strip()
+    df.dropna(how='all', inplace=True)
+    columns = MRR_SCHEMA.compile(df.columns)
+    df = columns.apply(df)
+    clean_numeric_columns(df, columns.typed)
+    df['Mes'] = parse_months(df['Mes'])
+    return df
+
+
+def legacy_operacional(worksheet):
+    """fetch_operacional_data antes do esquema compacto: o DataFrame do get_as_dataframe, sem conversões."""
+    from gspread_dataframe import get_as_dataframe
+
+    df = get_as_dataframe(worksheet, header=0, value_render_option='UNFORMATTED_VALUE', evaluate_formulas=True)
+    df.columns = df.columns.str.strip()
+    df.dropna(how='all', inplace=True)
+    return df
+
+
+def legacy_leads(path):
+    """read_leads_csv antes do esquema compacto."""
+    from data_loader.loader_leads import FUNNEL_STAGES, REVENUE_COLUMN
+
+    dtypes = {'Periodo': 'string', **{etapa: 'Int64' for etapa in FUNNEL_STAGES}, REVENUE_COLUMN: 'float64'}
+    return pd.read_csv(path, sep=';', dtype=dtypes, usecols=lambda c: c in dtypes)
+
+
+def median_ms(fn, repeat):
+    tempos = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - started) * 1000)
+    return statistics.median(tempos)
+
+
+def measure(df, repeat):
+    from data_loader.dtypes import frame_nbytes
+    from data_loader.snapshot import _arrow_safe
+
+    def parquet():
+        buffer = io.BytesIO()
+        _arrow_safe(df).to_parquet(buffer, index=False)
+        return buffer
+
+    return {
+        "memory_bytes": frame_nbytes(df),
+        "pickle_bytes": len(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)),
+        "pickle_ms": median_ms(lambda: pickle.loads(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)), repeat),
+        "parquet_bytes": parquet().getbuffer().nbytes,
+        "parquet_ms": median_ms(parquet, repeat),
+        "copy_ms": median_ms(df.copy, repeat),
+    }
+
+
+def sources(args):
+    """{fonte: (DataFrame antes, DataFrame agora)}, lidos a partir dos mesmos dados sintéticos."""
+    from data_loader import load_operacional_data, loader, loader_leads
+
+    mrr = fixtures.mrr_values(args.rows)
+    operacional = fixtures.operacional_values()
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = fixtures.leads_csv(os.path.join(tmp, "leads.csv"), args.leads_months)
+        leads = (legacy_leads(csv), loader_leads.read_leads_csv(csv))
+    return {
+        "dados_streamlit": (legacy_mrr(fixtures.fake_worksheet("DADOS STREAMLIT", mrr)),
+                            loader.fetch_dashboard_data(fixtures.fake_worksheet("DADOS STREAMLIT", mrr))),
+        "dados_operacional": (legacy_operacional(fixtures.fake_worksheet("DADOS OPERACIONAL", operacional)),
+                              load_operacional_data.fetch_operacional_data(
+                                  fixtures.fake_worksheet("DADOS OPERACIONAL", operacional))),
+        "leads_sprinthub": leads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=24, help="linhas da aba 'DADOS STREAMLIT'")
+    parser.add_argument("--leads-months", type=int, default=36, help="períodos no CSV de leads")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="grava os resultados neste ficheiro JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (antes, agora) in sources(args).items():
+        results[name] = {"legacy": measure(antes, args.repeat), "compact": measure(agora, args.repeat)}
+
+    print(f"{'fonte':<20}{'esquema':<10}{'memória':>10}{'pickle':>10}{'pickle ms':>11}{'parquet':>10}{'cópia ms':>10}")
+    for name, r in results.items():
+        for schema, m in r.items():
+            print(f"{name:<20}{schema:<10}{m['memory_bytes'] / 1024:>8.1f}KB{m['pickle_bytes'] / 1024:>8.1f}KB"
+                  f"{m['pickle_ms']:>11.2f}{m['parquet_bytes'] / 1024:>8.1f}KB{m['copy_ms']:>10.3f}")
+        antes, depois = r["legacy"]["memory_bytes"], r["compact"]["memory_bytes"]
+        print(f"{'':<20}{'redução':<10}{1 - depois / antes:>10.0%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
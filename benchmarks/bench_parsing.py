@@ -0,0 +1,78 @@
+"""
+Micro-benchmark da conversão de números brasileiros.
+
+Compara a versão célula a célula (clean_brazilian_number via .apply) com a
+versão vetorizada (parse_brazilian_numbers) numa planilha sintética.
+
+Uso:
+    python benchmarks/bench_parsing.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Permite importar 'data_loader/' ao correr o script a partir de qualquer pasta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_loader.parsing import clean_brazilian_number, parse_brazilian_numbers
+
+
+def synthetic_column(rows, seed=42):
+    """Gera uma coluna com a mistura de formatos que chega do Google Sheets."""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 2_000_000, rows)
+    kinds = rng.integers(0, 6, rows)
+    cells = np.empty(rows, dtype=object)
+    for i, (v, k) in enumerate(zip(values, kinds)):
+        if k == 0:
+            cells[i] = "R$ " + f"{v:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+        elif k == 1:
+            cells[i] = f"{v / 1e6:.2f}%".replace('.', ',')
+        elif k == 2:
+            cells[i] = f"{v:.2f}".replace('.', ',')
+        elif k == 3:
+            cells[i] = "#N/A"
+        elif k == 4:
+            cells[i] = ""
+        else:
+            cells[i] = str(int(v))
+    return pd.Series(cells, name="Receita Realizada")
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    column = synthetic_column(args.rows)
+
+    escalar = column.apply(clean_brazilian_number).astype("Float64").astype(np.float64)
+    vetorizado = parse_brazilian_numbers(column)
+    if not np.allclose(escalar.to_numpy(), vetorizado.to_numpy(), equal_nan=True):
+        raise SystemExit("Resultados divergentes entre a versão escalar e a vetorizada.")
+
+    t_escalar = best_of(lambda: column.apply(clean_brazilian_number), args.repeat)
+    t_vetorizado = best_of(lambda: parse_brazilian_numbers(column), args.repeat)
+
+    print(f"Linhas: {args.rows:,}".replace(',', '.'))
+    print(f"  .apply(clean_brazilian_number): {t_escalar * 1000:8.1f} ms")
+    print(f"  parse_brazilian_numbers:        {t_vetorizado * 1000:8.1f} ms")
+    print(f"  Ganho: {t_escalar / t_vetorizado:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark de arranque: tempo até ao primeiro render de cada página.
+
+Cada medição corre num interpretador novo (como após um restart do servidor),
+com snapshots sintéticos numa pasta temporária (KAPTHA_SNAPSHOT_DIR), por isso
+o primeiro render não faz pedidos ao Google Sheets. A página é executada com o
+AppTest do Streamlit; o tempo de importar o próprio Streamlit é medido à parte.
+
+Também lista os módulos pesados (plotly, gspread, ...) que a página carrega no
+primeiro render, para apanhar regressões nas importações diferidas. Os que o
+próprio Streamlit já importa (ex: o tema do plotly) não contam.
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 3] [--json resultados.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Permite importar 'data_loader/' ao correr o script a partir de qualquer pasta
+sys.path.append(ROOT)
+
+PAGES = {
+    "MRR_app": os.path.join(ROOT, "MRR_app.py"),
+    "metricas_operacionais": os.path.join(ROOT, "pages", "metricas_operacioanis.py"),
+}
+
+# Módulos que não deviam ser necessários para o primeiro render
+HEAVY_MODULES = ["plotly", "plotly.graph_objects", "gspread", "gspread_dataframe", "google.auth"]
+
+# Código executado em cada interpretador novo
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+before = set(sys.modules)
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_streamlit": t1 - t0,
+    "first_render": t2 - t1,
+    "exceptions": [str(e.value) for e in at.exception],
+    "heavy_loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules and m not in before],
+}))
+"""
+
+
+def write_synthetic_snapshots(directory, seed=42):
+    """Grava snapshots sintéticos de todas as fontes, recentes o suficiente para não haver refresh imediato."""
+    os.environ["KAPTHA_SNAPSHOT_DIR"] = directory
+    from data_loader.snapshot import SnapshotStore
+
+    rng = np.random.default_rng(seed)
+    months = [f"{m:02d}/{y}" for y in (2025, 2026) for m in range(1, 13)]
+    mrr = pd.DataFrame({
+        'Mes': months,
+        'Receita Realizada': rng.uniform(5e4, 1e5, len(months)),
+        'TM Geral': rng.uniform(500, 900, len(months)),
+        'Total de Clientes Realizados': rng.integers(50, 200, len(months)).astype(float),
+        'LTV Essencial': rng.uniform(1e3, 2e3, len(months)),
+        'Resultado AC': rng.uniform(1e3, 2e4, len(months)),
+    })
+    operacional = pd.DataFrame([{
+        'ctr google mes atual': 0.054, 'ctr google mes anterior': 0.05,
+        'cpr google mes atual': 66.81, 'cpr google mes anterior': 70.2,
+        'ctr meta mes atual': 0.012, 'ctr meta mes anterior': 0.011,
+        'cpr meta mes atual': 12.5, 'cpr meta mes anterior': 10.0,
+    }])
+    leads = pd.DataFrame({
+        'Periodo': ['este_mes', 'mes_passado', 'dois_meses_atras'],
+        'gerados': [7, 74, 34], 'qualificados': [7, 71, 27], 'diagnostico': [1, 11, 4],
+        'proposta': [0, 5, 4], 'vendas': [1, 6, 4], 'receita_vendas': [5562.0, 33355.99, 22649.0],
+    })
+
+    store = SnapshotStore(directory)
+    store.save("dados_streamlit", mrr)
+    store.save("dados_operacional", operacional)
+    store.save("leads_sprinthub", leads)
+    store.save("leads_sprinthub_raw", leads.assign(Periodo=['01/2025', '02/2025', '03/2025']))
+
+
+def measure(page_path, snapshot_dir):
+    env = dict(os.environ, KAPTHA_SNAPSHOT_DIR=snapshot_dir)
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, page_path, json.dumps(HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    # A última linha é o JSON; o resto são logs da própria página
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="grava os resultados neste ficheiro JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        write_synthetic_snapshots(snapshot_dir)
+        results = {}
+        for name, path in PAGES.items():
+            runs = [measure(path, snapshot_dir) for _ in range(args.repeat)]
+            results[name] = {
+                "import_streamlit_s": statistics.median(r["import_streamlit"] for r in runs),
+                "first_render_s": statistics.median(r["first_render"] for r in runs),
+                "heavy_loaded": runs[-1]["heavy_loaded"],
+                "exceptions": runs[-1]["exceptions"],
+            }
+
+    print(f"{'página':<24}{'import streamlit':>18}{'1º render':>12}  módulos pesados")
+    for name, r in results.items():
+        print(f"{name:<24}{r['import_streamlit_s']:>17.3f}s{r['first_render_s']:>11.3f}s  "
+              f"{', '.join(r['heavy_loaded']) or '-'}")
+        if r["exceptions"]:
+            print(f"  ! exceções: {r['exceptions']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark dos loaders e das telas do dashboard com dados sintéticos.
+
+Corre sem Google Sheets: as abas vêm de planilhas falsas (benchmarks/fixtures.py)
+com valores em formato brasileiro, e os snapshots/estado ficam numa pasta
+temporária. Mede:
+
+- o parse de cada fonte (fetch_dashboard_data, fetch_operacional_data, CSV de
+  leads e export bruto por lead);
+- load_dashboard_data / load_operacional_data / load_leads_data, no primeiro
+  pedido (ciclo completo do pipeline) e nos seguintes (snapshot em memória);
+- o cálculo de cada tela do MRR_app.py (KPIs, filtros e construção das
+  figuras) e uma repetição servida pela RenderCache;
+- o tamanho do JSON das figuras de cada tela (o que vai para o navegador).
+
+O relatório sai numa tabela e, opcionalmente, em JSON, para comparar execuções
+à medida que as planilhas crescem.
+
+Uso:
+    python benchmarks/bench_suite.py [--rows 24] [--leads-rows 100000] [--repeat 5] [--json resultados.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+# Snapshots, histórico e estado dos exports numa pasta temporária (antes de importar data_loader)
+_TMP = tempfile.TemporaryDirectory()
+os.environ["KAPTHA_SNAPSHOT_DIR"] = os.path.join(_TMP.name, "snapshots")
+
+import pandas as pd
+
+import fixtures  # noqa: E402 - também acrescenta a raiz do projeto ao sys.path
+
+
+def timed(fn, repeat):
+    """Executa `fn` `repeat` vezes; devolve (tempos em ms, último resultado)."""
+    tempos, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        tempos.append((time.perf_counter() - started) * 1000)
+    return tempos, result
+
+
+def summary(tempos):
+    ordenados = sorted(tempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))]
+    return {"median_ms": statistics.median(tempos), "min_ms": ordenados[0], "p95_ms": p95, "runs": len(tempos)}
+
+
+def run(args):
+    from data_loader import loader, load_operacional_data, loader_leads
+    from data_loader.dataset import load_prepared_dataset, prepare_dataset
+    from data_loader.leads_stream import LeadsStreamIngestor
+    from dashboard.render_cache import RenderCache
+    from dashboard.views import VIEW_BUILDERS, ViewFilters, render_view
+
+    # Sem os avisos "missing ScriptRunContext": os loaders correm fora do `streamlit run`
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+    results = {}
+
+    def record(name, tempos):
+        results[name] = summary(tempos)
+
+    # --- Parse de cada fonte ---
+    mrr_ws = fixtures.fake_worksheet("DADOS STREAMLIT", fixtures.mrr_values(args.rows))
+    op_ws = fixtures.fake_worksheet("DADOS OPERACIONAL", fixtures.operacional_values())
+    tempos, mrr_df = timed(lambda: loader.fetch_dashboard_data(mrr_ws), args.repeat)
+    record("fetch_dashboard_data", tempos)
+    record("fetch_operacional_data", timed(lambda: load_operacional_data.fetch_operacional_data(op_ws), args.repeat)[0])
+
+    csv_path = fixtures.leads_csv(os.path.join(_TMP.name, "_DADOS_SPRINTHUB.csv"), months=args.leads_months)
+    record("read_leads_csv+prepare_leads",
+           timed(lambda: loader_leads.prepare_leads(loader_leads.read_leads_csv(csv_path)), args.repeat)[0])
+
+    raw_dir = os.path.join(_TMP.name, "raw")
+    os.makedirs(raw_dir)
+    fixtures.raw_leads_csv(os.path.join(raw_dir, "_LEADS_SPRINTHUB_bench.csv"), args.leads_rows)
+    pattern = os.path.join(raw_dir, "_LEADS_SPRINTHUB*.csv")
+    record(f"leads_stream ingest ({args.leads_rows} leads, a frio)", timed(
+        lambda: LeadsStreamIngestor(pattern, os.path.join(_TMP.name, f"state-{time.perf_counter_ns()}")).ingest(),
+        max(1, args.repeat // 2))[0])
+
+    # --- Loaders completos (pipeline + snapshots), sem rede ---
+    fixtures.install_fake_sheets(args.rows)
+    loader_leads.LEADS_CSV_PATH = csv_path
+    ingestor = LeadsStreamIngestor(pattern, os.path.join(_TMP.name, "state"))
+    loader_leads.get_leads_ingestor = lambda: ingestor
+
+    record("load_dashboard_data (1º pedido)", timed(loader.load_dashboard_data, 1)[0])
+    record("load_dashboard_data", timed(loader.load_dashboard_data, args.repeat)[0])
+    record("load_operacional_data", timed(load_operacional_data.load_operacional_data, args.repeat)[0])
+    record("load_leads_data", timed(loader_leads.load_leads_data, args.repeat)[0])
+    # Dataset preparado servido pelo DataBroker (o custo por sessão/rerun)
+    record("load_prepared_dataset", timed(load_prepared_dataset, args.repeat)[0])
+
+    # --- Telas do MRR_app.py ---
+    tempos, ds = timed(lambda: prepare_dataset(mrr_df), args.repeat)
+    record("prepare_dataset", tempos)
+    meses = list(ds.months)
+    filters = ViewFilters.of(meses, meses[-1])
+    for view, build in VIEW_BUILDERS.items():
+        # ds sem versão: cada chamada usa um motor de KPIs novo (sem memoização)
+        record(f"view: {view}", timed(lambda: build(ds, filters), args.repeat)[0])
+
+    cache = RenderCache()
+    versioned = ds.__class__(**{**ds.__dict__, "version": 1.0})
+    for view in VIEW_BUILDERS:
+        render_view(cache, view, versioned, filters)
+    record("view (RenderCache, acerto)", timed(
+        lambda: [render_view(cache, v, versioned, filters) for v in VIEW_BUILDERS], args.repeat)[0])
+
+    # Bytes das figuras serializadas de cada tela (o que st.plotly_chart envia ao navegador)
+    import plotly.io as pio
+    payload = {view: sum(len(pio.to_json(fig, validate=False))
+                         for fig in render_view(cache, view, versioned, filters).figures.values())
+               for view in VIEW_BUILDERS}
+    return results, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=24, help="linhas da aba 'DADOS STREAMLIT'")
+    parser.add_argument("--leads-rows", type=int, default=100_000, help="leads no export bruto do SprintHub")
+    parser.add_argument("--leads-months", type=int, default=3, help="períodos no CSV agregado de leads")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="grava o relatório neste ficheiro JSON")
+    args = parser.parse_args()
+
+    results, payload = run(args)
+
+    print(f"{'etapa':<44}{'mediana':>10}{'p95':>10}{'mín':>10}")
+    for name, r in results.items():
+        print(f"{name:<44}{r['median_ms']:>8.1f}ms{r['p95_ms']:>8.1f}ms{r['min_ms']:>8.1f}ms")
+    for view, nbytes in payload.items():
+        if nbytes:
+            print(f"{'figuras: ' + view:<44}{nbytes / 1024:>8.1f}KB")
+
+    if args.json:
+        report = {
+            "params": {"rows": args.rows, "leads_rows": args.leads_rows,
+                       "leads_months": args.leads_months, "repeat": args.repeat},
+            "environment": {"python": platform.python_version(), "pandas": pd.__version__,
+                            "machine": platform.machine()},
+            "results": results,
+            "payload_bytes": payload,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
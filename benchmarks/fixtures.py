@@ -0,0 +1,207 @@
+"""
+Dados sintéticos e um Google Sheets falso para os benchmarks.
+
+Gera as abas 'DADOS STREAMLIT' e 'DADOS OPERACIONAL' e os ficheiros do
+SprintHub (CSV agregado e export bruto por lead) com o aspeto dos dados reais:
+valores em formato brasileiro ("R$ 1.234,56", "5,40%"), meses "08/2025" e
+células vazias/"#N/A" pelo meio. FakeSheetsManager substitui o gestor de
+ligações (data_loader/connections.py), para que os loaders corram sem rede.
+"""
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Permite importar 'data_loader/' ao correr os benchmarks a partir de qualquer pasta
+sys.path.append(ROOT)
+
+OPERACIONAL_COLUMNS = [
+    'ctr google mes atual', 'ctr google mes anterior', 'cpr google mes atual', 'cpr google mes anterior',
+    'ctr meta mes atual', 'ctr meta mes anterior', 'cpr meta mes atual', 'cpr meta mes anterior',
+]
+
+STAGES = ['Novo', 'Qualificado', 'Diagnóstico', 'Proposta', 'Venda']
+
+
+def brl(values):
+    """Formata números como moeda brasileira ('R$ 1.234,56'), de forma vetorizada."""
+    texto = pd.Series(values).map('{:,.2f}'.format)
+    return ("R$ " + texto.str.replace(',', 'X').str.replace('.', ',').str.replace('X', '.')).tolist()
+
+
+def percent(values):
+    """Formata frações como percentagem brasileira ('5,40%')."""
+    return (pd.Series(values).mul(100).map('{:.2f}%'.format).str.replace('.', ',')).tolist()
+
+
+def last_month():
+    """
+    Último mês das abas sintéticas: o mês corrente ou o fim da janela fixa das
+    telas (END_P), o que for mais tarde. Assim as janelas das telas (START_P-END_P
+    e START_P até ao mês corrente) têm sempre dados e os benchmarks medem
+    gráficos preenchidos.
+    """
+    from dashboard.views import END_P
+
+    return max(pd.Period.now('M'), pd.Period(pd.to_datetime(END_P, format='%m/%Y'), 'M'))
+
+
+def month_labels(rows, start=None):
+    """
+    Rótulos 'mm/aaaa' a partir de `start` ou, sem `start`, os últimos meses até
+    last_month(); com mais linhas do que meses (48), os meses repetem-se.
+    """
+    periodos = max(1, min(rows, 48))
+    if start is None:
+        start = last_month() - (periodos - 1)
+    meses = pd.period_range(start, periods=periodos, freq='M').strftime('%m/%Y')
+    return [meses[i % len(meses)] for i in range(rows)]
+
+
+def mrr_values(rows=24, seed=0):
+    """Valores (lista de linhas, com cabeçalho) da aba 'DADOS STREAMLIT'."""
+    from data_loader.loader import NUMERIC_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    # A coluna de resultado com um dos nomes alternativos aceites pelo MRR_SCHEMA
+    colunas = [c for c in NUMERIC_COLUMNS if c != 'Resultado Acumulado'] + ['Resultado AC']
+    dados = {'Mes': month_labels(rows)}
+    for col in colunas:
+        if '%' in col:
+            dados[col] = percent(rng.uniform(0, 0.1, rows))
+        elif 'Clientes' in col or 'Churn' in col:
+            dados[col] = rng.integers(0, 300, rows).astype(str).tolist()
+        else:
+            dados[col] = brl(rng.uniform(-5e4, 2e5, rows))
+    frame = pd.DataFrame(dados)
+    # Algumas células vazias ou com erro, como numa planilha real
+    buracos = rng.random(frame.shape) < 0.03
+    buracos[:, 0] = False
+    frame = frame.mask(buracos & (rng.random(frame.shape) < 0.5), '').mask(buracos, '#N/A')
+    return [list(frame.columns)] + frame.values.tolist()
+
+
+def operacional_values(seed=0):
+    """Valores da aba 'DADOS OPERACIONAL' (uma linha, números brutos como com UNFORMATTED_VALUE)."""
+    rng = np.random.default_rng(seed)
+    linha = [round(float(v), 4) if 'ctr' in c else round(float(v) * 100, 2)
+             for c, v in zip(OPERACIONAL_COLUMNS, rng.uniform(0.005, 0.08, len(OPERACIONAL_COLUMNS)))]
+    return [OPERACIONAL_COLUMNS, linha]
+
+
+def leads_csv(path, months=3, seed=0):
+    """Grava o CSV agregado do SprintHub (uma linha por período)."""
+    rng = np.random.default_rng(seed)
+    relativos = ['este_mes', 'mes_passado', 'dois_meses_atras']
+    periodos = relativos[:months] + month_labels(max(0, months - 3), start='2020-01')
+    gerados = rng.integers(10, 500, months)
+    frame = pd.DataFrame({'Periodo': periodos, 'gerados': gerados})
+    anterior = gerados
+    for etapa in ['qualificados', 'diagnostico', 'proposta', 'vendas']:
+        anterior = (anterior * rng.uniform(0.3, 0.9, months)).astype(int)
+        frame[etapa] = anterior
+    frame['receita_vendas'] = (frame['vendas'] * rng.uniform(2e3, 8e3, months)).round(2)
+    frame.to_csv(path, sep=';', index=False)
+    return path
+
+
+def raw_leads_csv(path, rows, seed=0):
+    """Grava um export bruto do SprintHub (uma linha por lead) com `rows` leads."""
+    rng = np.random.default_rng(seed)
+    datas = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), 'D')
+    etapas = rng.choice(STAGES, rows, p=[0.4, 0.25, 0.15, 0.1, 0.1])
+    valores = np.where(etapas == 'Venda', brl(rng.uniform(1e3, 2e4, rows)), '')
+    pd.DataFrame({
+        'Data de criação': datas.strftime('%d/%m/%Y'),
+        'Nome': [f"Lead {i}" for i in range(rows)],
+        'Etapa': etapas,
+        'Valor': valores,
+    }).to_csv(path, sep=';', index=False)
+    return path
+
+
+class FakeSpreadsheet:
+    """Planilha em memória com a parte da API do gspread usada pelos loaders."""
+
+    def __init__(self, key, sheets):
+        self.id = hashlib.sha1(key.encode()).hexdigest()
+        self.sheets = sheets
+        self.requests = 0
+        self.modified = "2026-01-01T00:00:00.000Z"
+
+    def _values(self, range_name):
+        title, _, cells = range_name.partition('!')
+        values = self.sheets[title.strip("'")]
+        if not cells:
+            return values
+        # Intervalos 'A1:AH1' ou 'A25:AH' (linhas a partir de 25)
+        inicio, _, fim = cells.partition(':')
+        primeira = int(''.join(ch for ch in inicio if ch.isdigit()) or 1)
+        ultima = ''.join(ch for ch in fim if ch.isdigit())
+        return values[primeira - 1:int(ultima) if ultima else None]
+
+    def values_get(self, range_name, params=None):
+        self.requests += 1
+        return {"values": self._values(range_name)}
+
+    def values_batch_get(self, ranges, params=None):
+        self.requests += 1
+        return {"valueRanges": [{"values": self._values(r)} for r in ranges]}
+
+    def get_lastUpdateTime(self):
+        return self.modified
+
+    def worksheet(self, title):
+        return FakeWorksheet(self, title)
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        values = spreadsheet.sheets[title]
+        self.row_count = len(values)
+        self.col_count = max(len(r) for r in values)
+
+
+def fake_worksheet(title, values):
+    """Worksheet falso isolado (para chamar os fetch_* diretamente)."""
+    return FakeSpreadsheet(title, {title: values}).worksheet(title)
+
+
+class FakeSheetsManager:
+    """Substituto do SheetsConnectionManager: cada ligação aponta para uma FakeSpreadsheet."""
+
+    def __init__(self, spreadsheets):
+        self.spreadsheets = spreadsheets
+
+    def spreadsheet_key(self, connection):
+        return None, connection
+
+    def spreadsheet(self, connection):
+        return self.spreadsheets[connection]
+
+    def worksheet(self, connection, title):
+        return self.spreadsheets[connection].worksheet(title)
+
+    def invalidate(self, connection):
+        pass
+
+
+def install_fake_sheets(mrr_rows=24, seed=0):
+    """
+    Liga os loaders a planilhas falsas (sem rede nem credenciais). Devolve o
+    FakeSheetsManager, para inspecionar os pedidos feitos.
+    """
+    from data_loader import connections, pipeline
+
+    manager = FakeSheetsManager({
+        "gsheets_mrr": FakeSpreadsheet("gsheets_mrr", {"DADOS STREAMLIT": mrr_values(mrr_rows, seed)}),
+        "gsheets_operacional": FakeSpreadsheet("gsheets_operacional", {"DADOS OPERACIONAL": operacional_values(seed)}),
+    })
+    connections.get_connection_manager = lambda: manager
+    pipeline.get_connection_manager = lambda: manager
+    return manager
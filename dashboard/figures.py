@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class FigureTemplate:
+    """
+    Modelo de um gráfico: layout, eixos, legenda e estilo dos traces construídos
+    uma única vez por processo (na primeira utilização), com `build()`.
+
+    A cada versão dos dados, render() só junta os arrays de cada trace (x, y,
+    text...) ao modelo já guardado, sem voltar a montar nem a validar o layout.
+    Arrays NumPy numéricos são serializados pelo plotly como typed arrays
+    (base64), mais leves do que listas JSON.
+
+    O modelo usa um template Plotly vazio: com st.plotly_chart o tema vem do
+    Streamlit, e o template por omissão do plotly era a maior parte do JSON
+    enviado ao navegador.
+    """
+
+    def __init__(self, build):
+        self._build = build
+        self._base = None
+        self._lock = threading.Lock()
+
+    def base(self):
+        """Figura do modelo como dicionário ({'data': [...], 'layout': {...}}), sem dados."""
+        if self._base is None:
+            import plotly.graph_objects as go
+
+            with self._lock:
+                if self._base is None:
+                    fig = self._build()
+                    fig.update_layout(template=go.layout.Template())
+                    self._base = fig.to_plotly_json()
+        return self._base
+
+    def render(self, *traces):
+        """
+        go.Figure com o layout do modelo e os dados de cada trace (dicionários
+        com x, y, text...), pela ordem dos traces do modelo. Traces do modelo sem
+        dados correspondentes ficam de fora (ex: coluna em falta na planilha).
+        """
+        import plotly.graph_objects as go
+
+        base = self.base()
+        data = [{**estilo, **dados} for estilo, dados in zip(base['data'], traces)]
+        # Sem validação: o estilo já foi validado ao construir o modelo e os dados são arrays
+        return go.Figure({'data': data, 'layout': base['layout']}, _validate=False)
+
+
+def numbers(series):
+    """
+    Coluna como array NumPy, serializado como typed array: inteiros sem vazios
+    ficam int32 e colunas float32 (contagens, ver data_loader/dtypes.py) ficam
+    float32 (4 bytes por valor); o resto passa a float64, com os vazios como NaN.
+    """
+    if pd.api.types.is_integer_dtype(series.dtype) and not series.isna().any():
+        return series.to_numpy(dtype='int32')
+    if series.dtype == np.float32:
+        return series.to_numpy()
+    return series.to_numpy(dtype='float64', na_value=np.nan)
@@ -0,0 +1,177 @@
+"""
+Formatação pt-BR partilhada pelas telas, pela página operacional e pela exportação estática.
+
+- Funções escalares (format_currency, format_percent, ...) para os valores das
+  KPIs, com cache LRU: os mesmos valores repetem-se a cada render e a cada TV.
+- Versões vetorizadas (format_*_array) para rótulos de gráficos e tabelas:
+  recebem Series/arrays, formatam só os valores distintos, todos de uma vez
+  com as funções de texto do NumPy (np.strings), e repetem-nos pelas posições.
+
+Regra única para vazios: None, NaN, <NA> e valores não numéricos são tratados
+como vazios e saem como o texto `na` de cada função (por omissão o zero
+formatado, ex: 'R$ 0,00', como sempre apareceu nos cards). MISSING ('—') fica
+para as KPIs cuja coluna não existe na planilha.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Valor de uma KPI cuja coluna não existe na planilha (ver MRR_SCHEMA)
+MISSING = "—"
+
+# '1,234.56' (formato do Python) -> '1.234,56' numa só passagem
+_PT_BR = str.maketrans(',.', '.,')
+
+# Valores escalares diferentes guardados por função
+CACHE_SIZE = 4096
+# Texto de tamanho variável do NumPy 2 (np.strings), bem mais rápido do que arrays '<U'
+_TEXT = np.dtypes.StringDType()
+
+
+def _as_float(value):
+    """float do valor, ou None se for vazio (None/NaN/<NA>) ou não numérico."""
+    if value is None or value is pd.NA:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # number != number só é verdade para NaN (bem mais barato do que np.isnan num escalar);
+    # + 0.0 junta -0.0 e 0.0 (a mesma chave na cache LRU)
+    return None if number != number else number + 0.0
+
+
+# --- ESCALARES (com cache LRU) ---
+@lru_cache(maxsize=CACHE_SIZE)
+def _number(value, decimals):
+    return f"{value:,.{decimals}f}".translate(_PT_BR)
+
+
+def format_number(value, decimals=2, na=None):
+    """Número com separadores pt-BR, ex: 1234.5 -> '1.234,50'."""
+    number = _as_float(value)
+    if number is None:
+        return _number(0.0, decimals) if na is None else na
+    return _number(number, decimals)
+
+
+def format_currency(value, decimals=2, na="R$ 0,00"):
+    """Moeda, ex: 1234.5 -> 'R$ 1.234,50'."""
+    number = _as_float(value)
+    return na if number is None else f"R$ {_number(number, decimals)}"
+
+
+def format_percent(value, decimals=1, na=None):
+    """Fração como percentagem, ex: 0.054 -> '5,4%' (decimals=2 -> '5,40%')."""
+    number = _as_float(value)
+    if number is None:
+        return f"{_number(0.0, decimals)}%" if na is None else na
+    return f"{_number(number * 100, decimals)}%"
+
+
+def format_kpi(value, formatter=None):
+    """Formata uma KPI; None (coluna em falta) aparece como MISSING em vez de zero."""
+    if value is None:
+        return MISSING
+    return (formatter or format_currency)(value)
+
+
+def format_points_delta(current, previous, decimals=2):
+    """
+    Variação de uma taxa em pontos percentuais, ex: 0.054 vs 0.050 -> '+0,40 p.p.'.
+    Sem valor anterior devolve o valor atual com '(Novo)'.
+    """
+    current = _as_float(current) or 0.0
+    previous = _as_float(previous) or 0.0
+    if previous == 0:
+        return f"{format_percent(current, decimals)} (Novo)" if current != 0 else f"{format_percent(0, decimals)} (0,0%)"
+    delta = (current * 100) - (previous * 100)
+    return f"{'+' if delta > 0 else ''}{_number(delta, decimals)} p.p."
+
+
+def format_currency_delta(current, previous):
+    """
+    Variação de um valor em reais, absoluta e percentual, ex: 'R$ +2,50 (+25,0%)'.
+    Sem valor anterior devolve o valor atual com '(Novo)'.
+    """
+    current = _as_float(current) or 0.0
+    previous = _as_float(previous)
+    if not previous:
+        return f"{format_currency(current)} (Novo)" if current > 0 else "R$ 0,00 (0,0%)"
+    delta = current - previous
+    delta_pct = delta / previous * 100
+    sinal_pct = '+' if delta_pct >= 0 else ''
+    return f"R$ {'+' if delta > 0 else ''}{_number(delta, 2)} ({sinal_pct}{_number(delta_pct, 1)}%)"
+
+
+# --- VETORIZADAS (Series/arrays) ---
+def _values(values):
+    """(array float64 com vazios como NaN, índice se a entrada for uma Series)."""
+    if isinstance(values, pd.Series):
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan), values.index
+    array = np.asarray(values)
+    if array.dtype == object:
+        array = pd.to_numeric(pd.Series(array), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return array.astype('float64', copy=False), None
+
+
+def _digits(values, decimals, thousands='.', decimal=','):
+    """
+    Números com `decimals` casas e os separadores dados, todos de uma vez: a parte
+    inteira é preenchida com zeros até um múltiplo de 3 dígitos, cortada em grupos
+    de 3 com os separadores e sem os zeros à esquerda. Arredonda com np.round:
+    só meios exatos na última casa (ex: 0.005 com 2 casas) podem sair diferentes
+    das funções escalares.
+    """
+    escalados = np.round(values * 10 ** decimals)
+    negativos = np.signbit(escalados)
+    inteiros, fracao = np.divmod(np.abs(escalados).astype(np.int64), 10 ** decimals)
+    if not inteiros.size:
+        return inteiros.astype(_TEXT)
+
+    grupos = -(-len(str(inteiros.max())) // 3)
+    preenchidos = np.strings.zfill(inteiros.astype(_TEXT), grupos * 3)
+    texto = np.strings.slice(preenchidos, 0, 3)
+    for inicio in range(3, grupos * 3, 3):
+        texto = np.strings.add(np.strings.add(texto, thousands), np.strings.slice(preenchidos, inicio, inicio + 3))
+    texto = np.strings.lstrip(texto, "0" + thousands)
+    texto = np.where(np.strings.str_len(texto) == 0, "0", texto)
+    if decimals:
+        texto = np.strings.add(np.strings.add(texto, decimal), np.strings.zfill(fracao.astype(_TEXT), decimals))
+    return np.where(negativos, np.strings.add('-', texto), texto)
+
+
+def _labels(values, prefix, decimals, suffix, na, scale=1, divisor=1):
+    """Rótulos prefix + número (× scale / divisor) + suffix; vazios como `na` (None = o zero formatado)."""
+    array, index = _values(values)
+    # Rótulos de planilhas repetem-se muito: cada valor distinto é formatado uma só vez
+    codigos, distintos = pd.factorize(array, use_na_sentinel=False)
+    vazios = np.isnan(distintos)
+    # + 0.0: -0.0 sai como '0', tal como nas funções escalares
+    numeros = np.where(vazios, 0.0, distintos * scale / divisor if scale != 1 or divisor != 1 else distintos) + 0.0
+    texto = np.strings.add(np.strings.add(prefix, _digits(numeros, decimals)), suffix)
+    if na is not None:
+        texto = np.where(vazios, na, texto)
+    texto = texto.astype(object)[codigos]
+    return pd.Series(texto, index=index, dtype=object) if index is not None else texto
+
+
+def format_number_array(values, decimals=2, na=None):
+    """format_number vetorizado; devolve uma Series (com o mesmo índice) ou um array."""
+    return _labels(values, "", decimals, "", na)
+
+
+def format_currency_array(values, decimals=2, na="R$ 0,00"):
+    """format_currency vetorizado, ex: rótulos 'R$ 1.234,56' das barras."""
+    return _labels(values, "R$ ", decimals, "", na)
+
+
+def format_percent_array(values, decimals=1, na=None):
+    """format_percent vetorizado (frações -> '5,4%')."""
+    return _labels(values, "", decimals, "%", na, scale=100)
+
+
+def format_thousands_array(values, na=""):
+    """Rótulos curtos em milhares de reais, ex: 47321.5 -> 'R$47k'; vazios ficam sem rótulo."""
+    return _labels(values, "R$", 0, "k", na, divisor=1000)
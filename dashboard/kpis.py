@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import streamlit as st
+
+from data_loader.periods import MonthRange, parse_months
+from data_loader.tracing import get_tracer
+
+# Agregações suportadas sobre os agregados mensais do PreparedDataset
+#   sum:   soma da coluna no período
+#   mean:  média por linha (vazios contam como 0, como no dashboard original)
+#   count: número de linhas no período
+AGGREGATIONS = ('sum', 'mean', 'count')
+
+# Número máximo de combinações (KPIs, períodos) guardadas por snapshot
+MAX_MEMO_ENTRIES = 128
+
+
+@dataclass(frozen=True)
+class KPI:
+    """
+    Definição declarativa de um indicador: coluna, agregação e janela de meses.
+
+    `window` é o nome de uma janela resolvida no momento da avaliação (ex:
+    'acumulado' = meses selecionados no filtro, 'meta' = Ago/25-Ago/26), para
+    que a mesma definição sirva para qualquer seleção.
+    """
+    name: str
+    column: str | None
+    agg: str = 'sum'
+    window: str = 'acumulado'
+
+    def __post_init__(self):
+        if self.agg not in AGGREGATIONS:
+            raise ValueError(f"Agregação desconhecida para '{self.name}': {self.agg!r}")
+
+
+def _window_key(months):
+    """Forma imutável de uma janela (MonthRange ou lista de meses), usada na memoização."""
+    if isinstance(months, MonthRange):
+        return months
+    return tuple(parse_months(list(months)).asi8) if len(months) else ()
+
+
+class KPIEngine:
+    """
+    Avalia KPIs sobre os agregados mensais de um snapshot (PreparedDataset.monthly).
+
+    Todas as KPIs de uma tela são calculadas numa única passagem vetorizada:
+    uma matriz de máscaras (janelas x meses) multiplicada pela matriz de somas
+    mensais (meses x colunas) dá as somas de todas as colunas em todas as
+    janelas de uma vez. Acrescentar KPIs não acrescenta varrimentos ao frame.
+
+    Os resultados ficam memorizados por (KPIs, janelas); o motor é criado uma vez
+    por versão do snapshot (get_kpi_engine).
+    """
+
+    def __init__(self, monthly):
+        self.columns = [c for c in monthly.columns if c != '_linhas']
+        self._ordinals = monthly.index.asi8
+        self._values = monthly[self.columns].to_numpy(dtype=float)
+        self._rows = (monthly['_linhas'].to_numpy(dtype=float) if '_linhas' in monthly.columns
+                      else np.zeros(len(monthly)))
+        self._positions = {c: i for i, c in enumerate(self.columns)}
+        self._lock = threading.Lock()
+        self._memo = OrderedDict()
+        self.passes = 0
+
+    def _mask(self, window):
+        if isinstance(window, MonthRange):
+            return (self._ordinals >= window.start.ordinal) & (self._ordinals <= window.end.ordinal)
+        return np.isin(self._ordinals, np.asarray(window, dtype=np.int64))
+
+    def evaluate(self, kpis, windows):
+        """
+        Calcula `kpis` (sequência de KPI) com as janelas `windows`
+        ({nome: MonthRange ou lista de meses}). Devolve {nome da KPI: float}.
+        KPIs sobre colunas que não existem nesta carga valem None (não 0.0): a
+        tela mostra que o dado falta em vez de um zero enganador.
+        """
+        kpis = tuple(kpis)
+        names = sorted({k.window for k in kpis})
+        missing = [n for n in names if n not in windows]
+        if missing:
+            raise KeyError(f"Janelas não definidas: {missing}")
+        resolved = tuple((n, _window_key(windows[n])) for n in names)
+
+        key = (kpis, resolved)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                get_tracer().count("kpis.memo_hits")
+                return dict(self._memo[key])
+        get_tracer().count("kpis.memo_misses")
+
+        # Passagem única: somas (janelas x colunas) e número de linhas por janela
+        masks = np.vstack([self._mask(w) for _, w in resolved]).astype(float) if resolved else np.zeros((0, len(self._ordinals)))
+        sums = masks @ self._values
+        rows = masks @ self._rows
+        row_of = {n: i for i, (n, _) in enumerate(resolved)}
+
+        results = {}
+        for kpi in kpis:
+            w = row_of[kpi.window]
+            if kpi.agg == 'count':
+                results[kpi.name] = float(rows[w])
+            elif kpi.column not in self._positions:
+                results[kpi.name] = None
+            elif kpi.agg == 'sum':
+                results[kpi.name] = float(sums[w, self._positions[kpi.column]])
+            else:
+                results[kpi.name] = float(sums[w, self._positions[kpi.column]] / rows[w]) if rows[w] else 0.0
+
+        with self._lock:
+            self.passes += 1
+            self._memo[key] = results
+            while len(self._memo) > MAX_MEMO_ENTRIES:
+                self._memo.popitem(last=False)
+        return dict(results)
+
+
+@st.cache_resource(max_entries=2)
+def _engine_for(version, _monthly):
+    return KPIEngine(_monthly)
+
+
+def get_kpi_engine(ds):
+    """Motor de KPIs da versão atual do dataset (partilhado entre sessões e reruns)."""
+    if ds.version is None:
+        return KPIEngine(ds.monthly)
+    return _engine_for(ds.version, ds.monthly)
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from data_loader.snapshot import SNAPSHOT_DIR
+
+# O painel fica escondido nas TVs; aparece com ?perf=1 no URL ou KAPTHA_PERF_PANEL=1
+PERF_QUERY_PARAM = "perf"
+PERF_PANEL_ENABLED = os.environ.get("KAPTHA_PERF_PANEL", "0") == "1"
+
+# Ficheiros gravados pelo botão de exportação (ao lado dos snapshots)
+EXPORT_PATHS = (os.path.join(SNAPSHOT_DIR, "metrics.prom"), os.path.join(SNAPSHOT_DIR, "metrics.jsonl"))
+
+
+def perf_panel_requested():
+    return PERF_PANEL_ENABLED or st.query_params.get(PERF_QUERY_PARAM) == "1"
+
+
+def render_perf_panel(tracer, rerun):
+    """
+    Painel de desempenho na barra lateral: p50/p95 de cada etapa medida pelo
+    Tracer (data_loader/tracing.py), os spans do último rerun desta sessão e os
+    contadores (caches, pedidos e bytes descarregados do Google Sheets).
+    """
+    if not perf_panel_requested():
+        return
+
+    with st.sidebar.expander("Desempenho", expanded=True):
+        if rerun is not None:
+            st.caption(f"Último rerun: {rerun['seconds'] * 1000:.0f} ms")
+            spans = pd.DataFrame(rerun["spans"], columns=["stage", "seconds"])
+            if not spans.empty:
+                st.dataframe(spans.assign(ms=spans.pop("seconds") * 1000).round(1), hide_index=True)
+
+        stats = tracer.stage_stats()
+        if stats:
+            tabela = pd.DataFrame.from_dict(stats, orient="index")[["count", "p50_ms", "p95_ms", "max_ms"]]
+            st.dataframe(tabela.round(1))
+
+        counters = tracer.counters()
+        if counters:
+            st.caption(" · ".join(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}"
+                                  for k, v in counters.items()))
+
+        if st.button("Exportar métricas", key="perf_export"):
+            st.caption("Gravado em: " + ", ".join(tracer.export(p) for p in EXPORT_PATHS))
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from data_loader.tracing import get_tracer
+
+# Número máximo de telas guardadas (4 telas x algumas combinações de filtros)
+MAX_ENTRIES = 64
+
+
+class RenderCache:
+    """
+    Cache das telas já calculadas, partilhada por todas as sessões do processo.
+
+    A chave é (tela, versão do snapshot, filtros). Com o rodízio automático cada
+    TV repete as mesmas 4 telas a cada 30s, mas os dados só mudam a cada ~10 min:
+    um tique do rodízio apenas repete o resultado guardado (valores das métricas
+    e figuras já montadas), sem voltar a filtrar dados nem construir gráficos.
+
+    Quando aparece uma versão nova do snapshot, as entradas das versões
+    anteriores são descartadas; uma tela de uma versão antiga que termine depois
+    disso é devolvida a quem a pediu, mas não é guardada.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self._per_view = {}
+
+    def _count(self, view, hit):
+        hits, misses = self._per_view.get(view, (0, 0))
+        self._per_view[view] = (hits + 1, misses) if hit else (hits, misses + 1)
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _is_older(self, version):
+        """True se `version` é anterior à versão das entradas guardadas (sem versão conta como antiga)."""
+        if self._version is None:
+            return False
+        return version is None or version < self._version
+
+    def get_or_render(self, view, version, filters, render):
+        """
+        Devolve o resultado guardado para (view, version, filters) ou, se não
+        existir, executa `render()` (sem argumentos) e guarda o resultado.
+        """
+        key = (view, version, filters)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._count(view, hit=True)
+                return entry
+            self._count(view, hit=False)
+
+        # Calculado fora do lock: uma tela lenta não bloqueia as outras sessões
+        entry = render()
+
+        with self._lock:
+            if self._is_older(version):
+                # Uma sessão ainda com a versão anterior: não apaga as entradas da mais recente
+                return entry
+            if version != self._version:
+                self._entries = OrderedDict((k, v) for k, v in self._entries.items() if k[1] == version)
+                self._version = version
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        """Contadores de acertos/falhas (totais e por tela) e número de entradas."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "views": {v: {"hits": h, "misses": m} for v, (h, m) in self._per_view.items()},
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@st.cache_resource
+def get_render_cache():
+    """Instância única da RenderCache no processo do Streamlit."""
+    cache = RenderCache()
+    # Acertos/falhas entram nas métricas exportadas ('render_cache.hits', ...)
+    get_tracer().add_collector("render_cache", cache.stats)
+    return cache
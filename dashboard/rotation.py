@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+# Modos do rodízio automático (barra lateral do MRR_app.py)
+ROTATION_CLIENT = "No navegador"
+ROTATION_SERVER = "No servidor"
+ROTATION_MODES = [ROTATION_CLIENT, ROTATION_SERVER]
+
+# Tempo de cada tela no rodízio (segundos)
+ROTATION_SECONDS = 30
+# De quanto em quanto tempo o modo "No navegador" confirma se há dados novos
+VERSION_CHECK_SECONDS = 30
+
+# Prefixo das chaves dos contentores de cada tela (o Streamlit gera a classe CSS st-key-<chave>)
+SLOT_KEY = "rotacao_tela"
+
+
+def slot_key(index):
+    return f"{SLOT_KEY}_{index}"
+
+
+def rotation_css(count, seconds=ROTATION_SECONDS, class_prefix=f"st-key-{SLOT_KEY}"):
+    """
+    CSS do rodízio no navegador: as `count` telas ficam todas na página e uma
+    animação em loop mostra uma de cada vez durante `seconds` segundos. A troca
+    de tela não passa pelo servidor (sem rerun nem pedido), por isso não pisca.
+
+    Cada contentor usa a mesma animação com um atraso de i * `seconds`; antes de
+    começar fica escondido. As telas escondidas mantêm a largura, e os gráficos
+    Plotly já estão dimensionados quando aparecem. `class_prefix` é a classe dos
+    contentores sem o índice (as páginas estáticas usam as suas próprias classes).
+    """
+    cycle = count * seconds
+    visible = 100 / count
+    slots = "\n        ".join(
+        f".{class_prefix}_{i} {{ animation-delay: {i * seconds}s; }}" for i in range(count)
+    )
+    return f"""
+    <style>
+        [class*="{class_prefix}_"] {{
+            visibility: hidden;
+            max-height: 0;
+            overflow: hidden;
+            animation: kaptha-rotacao {cycle}s step-end infinite;
+        }}
+        {slots}
+        @keyframes kaptha-rotacao {{
+            0% {{ visibility: visible; max-height: none; overflow: visible; }}
+            {visible:.4f}% {{ visibility: hidden; max-height: 0; overflow: hidden; }}
+            100% {{ visibility: hidden; max-height: 0; overflow: hidden; }}
+        }}
+    </style>
+    """
+
+
+@st.fragment(run_every=VERSION_CHECK_SECONDS)
+def watch_data_version(version, current_month):
+    """
+    Fragmento que corre sozinho a cada VERSION_CHECK_SECONDS: compara a versão do
+    snapshot e o mês corrente com os da página exibida e só pede um rerun
+    completo quando mudam. Entre versões dos dados o servidor não volta a
+    montar as telas.
+
+    O Streamlit não deixa outra thread acordar uma sessão, por isso o aviso do
+    DataBroker chega às TVs por este fragmento: cada verificação é só uma
+    leitura em memória, e os derivados da versão nova já estão prontos quando
+    o rerun acontece. Processos fora do Streamlit (export_static.py --watch)
+    esperam em DataBroker.wait_for_version().
+    """
+    from data_loader.loader import load_dashboard_snapshot
+
+    snapshot = load_dashboard_snapshot()
+    latest = snapshot.version if snapshot is not None else None
+    if latest != version or pd.Period(datetime.now(), 'M') != current_month:
+        st.rerun()
@@ -0,0 +1,207 @@
+import html
+import json
+import os
+
+from dashboard.formatting import format_currency, format_percent
+from dashboard.render_cache import get_render_cache
+from dashboard.rotation import ROTATION_SECONDS, rotation_css
+from dashboard.views import END_P, META_VALOR, PAGE_OPTIONS, START_P, render_view
+from data_loader.schema import normalize_name
+from data_loader.tracing import span
+
+# Cards de cada tela (título da secção, [(rótulo, chave em RenderedView.values)]),
+# com os mesmos rótulos do MRR_app.py
+CARD_SECTIONS = {
+    'Receita': [
+        ("Receita x Meta", [("Receita Acumulada", "acum_vigente"),
+                            ("Receita Total (Ago/25 - Ago/26)", "total_periodo")]),
+        ("Resultado x Faturamento", [("Resultado Acumulado", "res_vigente"),
+                                     ("Resultado / Receita %", "perc_res"),
+                                     (f"Resultado Total ({START_P}-{END_P})", "res_total")]),
+    ],
+    'LTV': [
+        ("LTV por Plano (Média Vigente)", [("LTV Essencial", "v_ess"), ("LTV Vender", "v_ven"),
+                                           ("LTV Avançado", "v_ava")]),
+        ("LTV por Plano (Média Anual)", [("Essencial Total", "v_ess_t"), ("Vender Total", "v_ven_t"),
+                                         ("Avançado Total", "v_ava_t")]),
+    ],
+}
+
+# Títulos das telas só com gráfico
+CHART_TITLES = {
+    'Ticket Médio': "🎟️ Ticket Médio Geral",
+    'Clientes': "Evolução: Clientes x Faturamento",
+}
+
+# O index.html recarrega-se sozinho para apanhar uma exportação nova (segundos)
+PAGE_RELOAD_SECONDS = 600
+# Guarda a versão exportada, para não voltar a gerar os ficheiros sem dados novos
+VERSION_FILE = "version.json"
+PLOTLY_JS = "plotly.min.js"
+
+PAGE_CSS = """
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+    body { margin: 0; padding: 1.5rem 2rem; background: #0E1117; color: #FAFAFA; font-family: 'Inter', sans-serif; }
+    h3 { font-weight: 700; letter-spacing: -0.02em; margin: 0.5rem 0 1rem; }
+    .cards { display: flex; gap: 1rem; }
+    .card { flex: 1; background: rgba(255, 255, 255, 0.03); border: 1px solid rgba(255, 255, 255, 0.1);
+            padding: 15px; border-radius: 12px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); }
+    .card .label { font-size: 0.875rem; color: rgba(250, 250, 250, 0.8); }
+    .card .value { font-size: 2.25rem; padding-top: 0.25rem; }
+    .progress { height: 8px; border-radius: 4px; background: rgba(255, 255, 255, 0.1); margin: 8px 0; }
+    .progress > div { height: 100%; border-radius: 4px; background-image: linear-gradient(to right, #41D9FF, #69FF4E); }
+    .goal-badge { background-color: #69FF4E; color: #000000; padding: 4px 16px; border-radius: 20px;
+                  font-weight: 800; font-size: 1.1rem; display: inline-block; }
+    .goal-subtext { font-size: 0.7rem; color: rgba(255, 255, 255, 0.6); display: block; }
+    h6 { font-size: 0.9rem; margin: 0 0 8px; font-weight: 600; text-align: center; color: #41D9FF; }
+    hr { border: 0; height: 1px; margin: 1.5rem 0;
+         background-image: linear-gradient(to right, rgba(255, 255, 255, 0), rgba(255, 255, 255, 0.2), rgba(255, 255, 255, 0)); }
+    .updated { font-size: 0.75rem; color: rgba(255, 255, 255, 0.6); text-align: center; margin-top: 1rem; }
+"""
+
+
+def view_slug(view):
+    """Nome do ficheiro de uma tela, ex: 'Ticket Médio' -> 'ticket_medio'."""
+    return normalize_name(view).replace(' ', '_')
+
+
+def _card(label, value):
+    return (f'<div class="card"><div class="label">{html.escape(label)}</div>'
+            f'<div class="value">{html.escape(str(value))}</div></div>')
+
+
+def _goal_card(progresso):
+    return (f'<div class="card"><h6>Progresso da Meta</h6>'
+            f'<div class="progress"><div style="width: {min(progresso, 1.0):.1%}"></div></div>'
+            f'<div style="text-align: center"><span class="goal-badge">{format_percent(progresso)}</span>'
+            f'<span class="goal-subtext">de {html.escape(format_currency(META_VALOR))}</span></div></div>')
+
+
+def view_body(view_name, view):
+    """HTML de uma tela (cards e gráficos), sem <html>/<head>; o plotly.js é carregado pela página."""
+    import plotly.io as pio
+
+    partes = []
+    for index, (titulo, cards) in enumerate(CARD_SECTIONS.get(view_name, [])):
+        presentes = [(rotulo, view.values[chave]) for rotulo, chave in cards if chave in view.values]
+        if not presentes:
+            continue
+        if index:
+            partes.append("<hr>")
+        partes.append(f"<h3>{html.escape(titulo)}</h3>")
+        linha = [_card(rotulo, valor) for rotulo, valor in presentes]
+        if view_name == 'Receita' and index == 0:
+            linha.append(_goal_card(view.values.get("progresso", 0)))
+        partes.append(f'<div class="cards">{"".join(linha)}</div>')
+
+    if view_name in CHART_TITLES:
+        partes.append(f"<h3>{html.escape(CHART_TITLES[view_name])}</h3>")
+    for name, fig in view.figures.items():
+        with span("export.figure_html"):
+            partes.append(pio.to_html(fig, full_html=False, include_plotlyjs=False,
+                                      div_id=f"{view_slug(view_name)}_{name}", config={"displayModeBar": False}))
+    return "\n".join(partes)
+
+
+def page(title, body, extra_head=""):
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<script src="{PLOTLY_JS}"></script>
+<style>{PAGE_CSS}</style>
+{extra_head}
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def _write_atomic(path, text):
+    """Grava via ficheiro temporário + os.replace: o servidor estático nunca serve um ficheiro a meio."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _write_png(fig, path):
+    """PNG de uma figura (precisa do kaleido). Devolve False se não estiver instalado."""
+    try:
+        fig.write_image(path, width=1600, height=fig.layout.height or 500, scale=1)
+        return True
+    except (ImportError, ValueError, RuntimeError) as e:
+        print(f"[static_export.py] PNG de '{os.path.basename(path)}' ignorado: {e}")
+        return False
+
+
+def exported_version(out_dir):
+    try:
+        with open(os.path.join(out_dir, VERSION_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_views(ds, filters, out_dir, views=PAGE_OPTIONS, png=False, cache=None):
+    """
+    Exporta cada tela do MRR_app.py para `out_dir` como HTML estático
+    (<tela>.html), mais index.html com todas as telas em rodízio no navegador
+    (o mesmo CSS do modo "No navegador") e, com `png`, os gráficos em PNG.
+    Os valores e figuras vêm de render_view, tal como no dashboard.
+    Devolve a lista de ficheiros gravados.
+    """
+    import plotly.offline
+
+    cache = cache or get_render_cache()
+    os.makedirs(out_dir, exist_ok=True)
+    escritos = []
+
+    plotly_js = os.path.join(out_dir, PLOTLY_JS)
+    if not os.path.exists(plotly_js):
+        _write_atomic(plotly_js, plotly.offline.get_plotlyjs())
+        escritos.append(plotly_js)
+
+    atualizado = (ds.saved_at.strftime("%d/%m %H:%M") if ds.saved_at else "")
+    rodape = f'<div class="updated">Dados de {atualizado}</div>' if atualizado else ""
+
+    slots = []
+    for index, name in enumerate(views):
+        view = render_view(cache, name, ds, filters)
+        body = view_body(name, view)
+        path = os.path.join(out_dir, f"{view_slug(name)}.html")
+        _write_atomic(path, page(name, body + rodape))
+        escritos.append(path)
+        slots.append(f'<div class="tela_{index}">{body}</div>')
+        if png:
+            for fig_name, fig in view.figures.items():
+                png_path = os.path.join(out_dir, f"{view_slug(name)}_{fig_name}.png")
+                if not _write_png(fig, png_path):
+                    png = False  # sem kaleido não vale a pena tentar as restantes
+                    break
+                escritos.append(png_path)
+
+    index_path = os.path.join(out_dir, "index.html")
+    head = (f'<meta http-equiv="refresh" content="{PAGE_RELOAD_SECONDS}">'
+            + rotation_css(len(views), ROTATION_SECONDS, class_prefix="tela"))
+    _write_atomic(index_path, page("Dashboard MRR", "\n".join(slots) + rodape, head))
+    escritos.append(index_path)
+
+    _write_atomic(os.path.join(out_dir, VERSION_FILE),
+                  json.dumps({"version": ds.version, "current_month": str(filters.current_month)}))
+    return escritos
+
+
+def export_if_changed(ds, filters, out_dir, force=False, **kwargs):
+    """
+    Exporta só se a versão dos dados (ou o mês corrente) mudou desde a última
+    exportação para `out_dir`. Devolve os ficheiros gravados (vazio se nada mudou).
+    """
+    marca = {"version": ds.version, "current_month": str(filters.current_month)}
+    if not force and exported_version(out_dir) == marca:
+        return []
+    with span("export.views"):
+        return export_views(ds, filters, out_dir, **kwargs)
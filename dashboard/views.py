@@ -0,0 +1,238 @@
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from dashboard.figures import FigureTemplate, numbers
+from dashboard.formatting import format_currency, format_currency_array, format_kpi, format_percent, format_thousands_array
+from dashboard.kpis import KPI, get_kpi_engine
+from data_loader.periods import MonthRange
+from data_loader.tracing import span
+
+# Telas do rodízio, pela ordem de exibição
+PAGE_OPTIONS = ['Receita', 'LTV', 'Ticket Médio', 'Clientes']
+
+META_VALOR = 1400000.0
+# Período da meta anual (Receita/Resultado total e gráfico de clientes)
+START_P, END_P = '08/2025', '08/2026'
+
+
+@dataclass(frozen=True)
+class ViewFilters:
+    """
+    Seleção que afeta o conteúdo de uma tela (faz parte da chave da RenderCache).
+    Só entra aqui o que os cálculos usam: um filtro a mais na chave só causaria falhas.
+    """
+    acumulado: tuple
+    current_month: pd.Period
+
+    @classmethod
+    def of(cls, acumulado, current_month):
+        return cls(tuple(acumulado), current_month)
+
+
+def default_filters(months, current_month):
+    """
+    Filtros do rodízio automático: acumulado até ao mês corrente (ou todos os
+    meses, se o mês corrente não tiver dados).
+    """
+    if current_month in months:
+        return ViewFilters.of(MonthRange(months[0], current_month).select(months), current_month)
+    return ViewFilters.of(months, current_month)
+
+
+@dataclass(frozen=True)
+class RenderedView:
+    """
+    Resultado de uma tela pronto a exibir.
+
+    - values: valores calculados (números) e textos já formatados para os cards.
+    - figures: figuras Plotly já montadas, prontas para st.plotly_chart (que as
+      serializa ao enviar para o navegador).
+    """
+    values: dict = field(default_factory=dict)
+    figures: dict = field(default_factory=dict)
+
+
+# --- KPIs DECLARADAS POR TELA ---
+# Cada KPI é (nome, coluna, agregação, janela); todas as de uma tela são
+# calculadas numa única passagem pelo KPIEngine (dashboard/kpis.py).
+RECEITA_KPIS = (
+    KPI('acum_vigente', 'Receita Realizada', 'sum', 'acumulado'),
+    KPI('total_periodo', 'Receita Realizada', 'sum', 'meta'),
+)
+
+LTV_KPIS = (
+    KPI('v_ess', 'LTV Essencial', 'mean', 'vigente'),
+    KPI('v_ven', 'LTV Vender', 'mean', 'vigente'),
+    KPI('v_ava', 'LTV Avancado', 'mean', 'vigente'),
+    KPI('v_ess_t', 'LTV Essencial Total', 'mean', 'meta'),
+    KPI('v_ven_t', 'LTV Vender Total', 'mean', 'meta'),
+    KPI('v_ava_t', 'LTV Avancado Total', 'mean', 'meta'),
+)
+
+
+def kpi_windows(filters):
+    """Janelas de meses usadas pelas KPIs, resolvidas para os filtros atuais."""
+    return {
+        'acumulado': list(filters.acumulado),
+        'meta': MonthRange.of(START_P, END_P),
+        'vigente': MonthRange.of('08/2025', filters.current_month),
+    }
+
+
+def result_kpis(result_column):
+    """KPIs de resultado, sobre a coluna de resultado encontrada na planilha."""
+    return (
+        KPI('res_vigente', result_column, 'sum', 'acumulado'),
+        KPI('res_total', result_column, 'sum', 'meta'),
+    )
+
+
+def compute_receita(ds, filters):
+    """TELA 1: RECEITA"""
+    res_col = ds.result_column
+    kpis = RECEITA_KPIS + (result_kpis(res_col) if res_col else ())
+    k = get_kpi_engine(ds).evaluate(kpis, kpi_windows(filters))
+
+    progresso = (k['total_periodo'] or 0) / META_VALOR if META_VALOR else 0
+    values = {
+        "acum_vigente": format_kpi(k['acum_vigente']),
+        "total_periodo": format_kpi(k['total_periodo']),
+        "progresso": progresso,
+        "result_column": res_col,
+    }
+    if res_col:
+        perc_res = k['res_vigente'] / k['acum_vigente'] if k['acum_vigente'] else 0
+        values.update({
+            "res_vigente": format_currency(k['res_vigente']),
+            "perc_res": format_percent(perc_res),
+            "res_total": format_currency(k['res_total']),
+        })
+    return RenderedView(values)
+
+
+def compute_ltv(ds, filters):
+    """TELA 2: LTV"""
+    k = get_kpi_engine(ds).evaluate(LTV_KPIS, kpi_windows(filters))
+    return RenderedView({name: format_kpi(v) for name, v in k.items()})
+
+
+# --- MODELOS DOS GRÁFICOS ---
+# Layout e estilo montados uma vez por processo (dashboard/figures.py); as telas
+# só trocam os arrays de cada trace
+def _build_tm_figure():
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Bar(
+        marker=dict(color='#41D9FF', line=dict(width=0)),
+        textposition='auto'
+    ))
+    fig.update_layout(
+        height=450,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color="white", size=10),
+        margin=dict(t=30, b=10, l=10, r=10),
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.05)')
+    )
+    return fig
+
+
+def _build_clientes_figure():
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots # Importação necessária para eixos duplos
+
+    fig_combined = make_subplots(specs=[[{"secondary_y": True}]])
+
+    fig_combined.add_trace(
+        go.Scatter(
+            name="Faturamento (R$)",
+            mode='lines+markers+text',
+            line=dict(color='#41D9FF', width=4, shape='spline'),
+            marker=dict(size=8),
+            textposition='top left'
+        ),
+        secondary_y=False,
+    )
+    fig_combined.add_trace(
+        go.Scatter(
+            name="Clientes (Un)",
+            mode='lines+markers+text',
+            line=dict(color='#69FF4E', width=4, shape='spline'),
+            marker=dict(size=8),
+            textposition='bottom right'
+        ),
+        secondary_y=True,
+    )
+
+    fig_combined.update_layout(
+        height=500,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color="white", size=10),
+        margin=dict(t=30, b=10, l=10, r=10),
+        xaxis=dict(showgrid=False),
+        # [ALTERAÇÃO] Legenda movida para a esquerda (x=0, xanchor="left")
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0)
+    )
+
+    fig_combined.update_yaxes(title_text="Faturamento (R$)", secondary_y=False, gridcolor='rgba(255,255,255,0.05)')
+    fig_combined.update_yaxes(title_text="Clientes (Un)", secondary_y=True, showgrid=False)
+    return fig_combined
+
+
+TM_FIGURE = FigureTemplate(_build_tm_figure)
+CLIENTES_FIGURE = FigureTemplate(_build_clientes_figure)
+
+
+def month_axis(df):
+    """Rótulos 'mm/aaaa' do índice mensal, para o eixo x."""
+    return df.index.strftime('%m/%Y').to_numpy(dtype=object)
+
+
+def compute_ticket_medio(ds, filters):
+    """TELA 3: TICKET MÉDIO"""
+    if not ds.has('TM Geral'):
+        return RenderedView({})
+
+    range_tm = MonthRange.of('08/2025', filters.current_month)
+    df_tm_chart = ds.rows(range_tm)
+    tm = numbers(df_tm_chart['TM Geral'])
+    fig_tm = TM_FIGURE.render(dict(x=month_axis(df_tm_chart), y=tm, text=format_currency_array(tm)))
+    return RenderedView({}, {"fig_tm": fig_tm})
+
+
+def compute_clientes(ds, filters):
+    """TELA 4: CLIENTES (EVOLUÇÃO CRUZADA COM FATURAMENTO)"""
+    # Range solicitado: Ago/25 até Ago/26
+    range_cli = MonthRange.of(START_P, END_P)
+    df_cli_chart = ds.rows(range_cli)
+    meses = month_axis(df_cli_chart)
+    receita = numbers(df_cli_chart['Receita Realizada'])
+
+    traces = [dict(x=meses, y=receita, text=format_thousands_array(receita))]
+    # Linha de clientes só se a coluna existir nesta carga (resolvido pelo MRR_SCHEMA)
+    if ds.has('Total de Clientes Realizados'):
+        clientes = numbers(df_cli_chart['Total de Clientes Realizados'])
+        traces.append(dict(x=meses, y=clientes, text=clientes))
+    return RenderedView({}, {"fig_combined": CLIENTES_FIGURE.render(*traces)})
+
+
+VIEW_BUILDERS = {
+    'Receita': compute_receita,
+    'LTV': compute_ltv,
+    'Ticket Médio': compute_ticket_medio,
+    'Clientes': compute_clientes,
+}
+
+
+def render_view(cache, view, ds, filters):
+    """
+    Devolve o RenderedView de `view` para o dataset e filtros atuais, calculando-o
+    só na primeira vez para cada (tela, versão dos dados, filtros).
+    """
+    def render():
+        with span(f"view.{view}"):
+            return VIEW_BUILDERS[view](ds, filters)
+    return cache.get_or_render(view, ds.version, filters, render)
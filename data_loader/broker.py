@@ -0,0 +1,152 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader.snapshot import get_snapshot_cache
+from data_loader.tracing import get_tracer, span
+
+
+def read_only(array):
+    """Vista NumPy só de leitura do mesmo buffer (sem cópia)."""
+    view = np.asarray(array).view()
+    view.flags.writeable = False
+    return view
+
+
+class _Derived:
+    """Um objeto derivado dos snapshots (ex: PreparedDataset), guardado para uma versão."""
+
+    def __init__(self, sources, build):
+        self.sources = tuple(sources)
+        self.build = build
+        self.version = None
+        self.value = None
+        self.lock = threading.Lock()
+
+
+class DataBroker:
+    """
+    Ponto único de acesso aos dados no processo, partilhado por todas as sessões.
+
+    Cada fonte existe uma única vez em memória (o snapshot da SnapshotCache). As
+    sessões recebem vistas sem cópia: column() devolve arrays NumPy só de
+    leitura, e frame() um DataFrame que partilha os buffers do snapshot. O
+    DataFrame só está protegido pelo Copy-on-Write do pandas 3 (por isso
+    requirements.txt exige pandas>=3): alterar a vista copia só o que for
+    alterado e o snapshot partilhado nunca muda.
+
+    Objetos derivados (dataset preparado, funil de leads) são calculados uma vez
+    por versão das fontes de que dependem, com derive(). Quando o pipeline publica
+    uma versão nova, o broker recalcula-os logo, na thread que publicou, e acorda
+    quem espera em wait_for_version(): a primeira TV depois da atualização já
+    encontra tudo pronto, e mais ecrãs não acrescentam cargas nem cópias.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._derived = {}
+        self._version = cache.current_set().version
+        self.stats = {"derive_hits": 0, "derive_builds": 0, "views": 0}
+        cache.subscribe(self._on_publish)
+
+    @property
+    def version(self):
+        """Versão atual dos dados (aumenta a cada publicação do pipeline)."""
+        with self._lock:
+            return self._version
+
+    # --- Leitura ---
+    def snapshot(self, name):
+        return self.cache.current(name)
+
+    def frame(self, name):
+        """DataFrame atual da fonte `name` como vista sem cópia (vazio se nunca foi carregada)."""
+        snapshot = self.cache.current(name)
+        self._count("views")
+        if snapshot is None:
+            return pd.DataFrame()
+        return snapshot.data.copy(deep=False)
+
+    def column(self, name, column):
+        """Coluna de uma fonte como array NumPy só de leitura (sem cópia para colunas numéricas)."""
+        snapshot = self.cache.current(name)
+        if snapshot is None or column not in snapshot.data.columns:
+            return read_only(np.array([], dtype=float))
+        return read_only(snapshot.data[column].to_numpy())
+
+    # --- Objetos derivados ---
+    def derive(self, key, sources, build):
+        """
+        Devolve build(*snapshots das `sources`) calculado uma única vez por versão
+        das fontes. `build` recebe os Snapshots (ou None) pela ordem de `sources`.
+        """
+        with self._lock:
+            slot = self._derived.get(key)
+            if slot is None:
+                slot = self._derived[key] = _Derived(sources, build)
+        return self._resolve(key, slot)
+
+    def _resolve(self, key, slot):
+        snapshots = [self.cache.current(name) for name in slot.sources]
+        version = tuple(s.version if s is not None else None for s in snapshots)
+        if slot.version == version:
+            self._count("derive_hits")
+            return slot.value
+        # Um lock por objeto: várias sessões à espera da mesma versão calculam-na uma vez
+        with slot.lock:
+            if slot.version != version:
+                with span(f"broker.derive.{key}"):
+                    value = slot.build(*snapshots)
+                slot.value, slot.version = value, version
+                self._count("derive_builds")
+            else:
+                self._count("derive_hits")
+            return slot.value
+
+    # --- Notificação de versões ---
+    def wait_for_version(self, after, timeout=None):
+        """Espera até haver uma versão maior que `after` (ou o timeout). Devolve a versão atual."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version > after, timeout)
+            return self._version
+
+    def _on_publish(self, version, names):
+        with self._lock:
+            slots = [(k, s) for k, s in self._derived.items() if set(s.sources) & set(names)]
+        # Recalcula já os derivados afetados, fora do caminho de qualquer rerun
+        for key, slot in slots:
+            try:
+                self._resolve(key, slot)
+            except Exception as e:
+                print(f"[broker.py] Erro ao preparar '{key}' da versão {version}: {e}")
+        # Só depois acorda quem espera: a versão nova já tem os derivados prontos
+        with self._changed:
+            self._version = max(self._version, version)
+            self._changed.notify_all()
+
+    def _count(self, field):
+        with self._lock:
+            self.stats[field] += 1
+
+    def memory(self):
+        """Bytes em memória de cada fonte (uma cópia por fonte, independentemente do número de sessões)."""
+        sets = self.cache.current_set()
+        return {name: int(s.data.memory_usage(deep=True).sum()) for name, s in sets.snapshots.items()}
+
+    def as_dict(self):
+        with self._lock:
+            stats = dict(self.stats, version=self._version)
+        stats["bytes"] = sum(self.memory().values())
+        return stats
+
+
+@st.cache_resource
+def get_data_broker():
+    """Instância única do DataBroker no processo do Streamlit."""
+    broker = DataBroker(get_snapshot_cache())
+    get_tracer().add_collector("broker", broker.as_dict)
+    return broker
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import streamlit as st
+
+from data_loader.tracing import get_tracer, span
+
+# Renova o token OAuth quando faltar menos do que isto para expirar
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+class ConnectionStats:
+    """Contadores partilhados do gestor de ligações (lidos pela interface/benchmarks)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.bytes_fetched = 0
+        self.token_refreshes = 0
+        self.handle_hits = 0
+        self.last_connect_seconds = None
+
+    def add(self, **counts):
+        with self._lock:
+            for field, value in counts.items():
+                setattr(self, field, getattr(self, field) + value)
+
+    def as_dict(self):
+        with self._lock:
+            return {k: v for k, v in vars(self).items() if not k.startswith('_')}
+
+
+def _counting_http_client(stats):
+    """Classe de HTTPClient do gspread que conta pedidos e bytes recebidos em `stats`."""
+    from gspread.http_client import HTTPClient
+
+    class CountingHTTPClient(HTTPClient):
+        def request(self, *args, **kwargs):
+            stats.add(requests=1)
+            response = super().request(*args, **kwargs)
+            stats.add(bytes_fetched=len(response.content))
+            return response
+
+    return CountingHTTPClient
+
+
+class SheetsConnectionManager:
+    """
+    Reaproveita clientes gspread e handles de planilhas/abas entre cargas.
+
+    As credenciais de cada conta de serviço são lidas uma única vez e partilhadas
+    por todas as entradas de st.secrets["connections"] que a usam (ex: "gsheets_mrr"
+    e "gsheets_operacional"): um cliente autorizado e um token por conta. Cada
+    entrada guarda a planilha aberta e as abas já localizadas. Assim uma
+    atualização só faz o pedido dos valores, sem nova troca de token nem
+    pedidos de metadados. O token é renovado antes de expirar.
+
+    O gspread só é importado na primeira ligação: o primeiro render, servido a
+    partir do snapshot local, não o carrega.
+    """
+
+    def __init__(self, secrets=None):
+        self._secrets = secrets
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self.stats = ConnectionStats()
+
+    def _creds(self, connection):
+        secrets = self._secrets if self._secrets is not None else st.secrets["connections"]
+        return secrets[connection]
+
+    def spreadsheet_key(self, connection):
+        """(conta de serviço, URL da planilha): ligações com a mesma chave leem o mesmo ficheiro."""
+        creds = self._creds(connection)
+        return creds.get("client_email"), creds["spreadsheet"]
+
+    def _account(self, connection):
+        """Conta de serviço de uma ligação (chave do cliente partilhado)."""
+        return self._creds(connection).get("client_email") or connection
+
+    def client(self, connection):
+        account = self._account(connection)
+        with self._lock:
+            gc = self._clients.get(account)
+            if gc is None:
+                import gspread
+
+                started = time.perf_counter()
+                with span("sheets.auth"):
+                    gc = gspread.service_account_from_dict(
+                        self._creds(connection), http_client=_counting_http_client(self.stats)
+                    )
+                self._clients[account] = gc
+                self.stats.add(connections=1)
+                self.stats.last_connect_seconds = time.perf_counter() - started
+        self._ensure_token(gc)
+        return gc
+
+    def _ensure_token(self, gc):
+        """Renova o token proativamente, fora do caminho de um pedido de dados."""
+        creds = gc.http_client.auth
+        expiry = getattr(creds, "expiry", None)
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)  # o google-auth usa UTC sem fuso
+        if creds.token is None or expiry is None or expiry - agora < TOKEN_REFRESH_MARGIN:
+            from google.auth.transport.requests import Request
+            with span("sheets.token_refresh"):
+                creds.refresh(Request())
+            self.stats.add(token_refreshes=1)
+
+    def spreadsheet(self, connection):
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(connection)
+        if spreadsheet is not None:
+            self.stats.add(handle_hits=1)
+            return spreadsheet
+
+        client = self.client(connection)
+        with span("sheets.open"):
+            spreadsheet = client.open_by_url(self._creds(connection)["spreadsheet"])
+        with self._lock:
+            return self._spreadsheets.setdefault(connection, spreadsheet)
+
+    def worksheet(self, connection, title):
+        key = (connection, title)
+        with self._lock:
+            worksheet = self._worksheets.get(key)
+        if worksheet is not None:
+            self.stats.add(handle_hits=1)
+            self._ensure_token(self.client(connection))
+            return worksheet
+
+        worksheet = self.spreadsheet(connection).worksheet(title)
+        with self._lock:
+            return self._worksheets.setdefault(key, worksheet)
+
+    def invalidate(self, connection):
+        """Descarta cliente e handles de uma ligação (ex: após um erro), forçando nova ligação."""
+        try:
+            account = self._account(connection)
+        except Exception:
+            account = connection
+        with self._lock:
+            self._clients.pop(account, None)
+            self._spreadsheets.pop(connection, None)
+            for key in [k for k in self._worksheets if k[0] == connection]:
+                del self._worksheets[key]
+
+
+@st.cache_resource
+def get_connection_manager():
+    """Instância única do SheetsConnectionManager no processo do Streamlit."""
+    manager = SheetsConnectionManager()
+    # Pedidos, bytes descarregados e renovações de token entram nas métricas exportadas
+    get_tracer().add_collector("sheets", manager.stats.as_dict)
+    return manager
+
+
+def open_worksheet(connection, title):
+    """Atalho usado pelos loaders: devolve a aba reaproveitando a ligação existente."""
+    return get_connection_manager().worksheet(connection, title)
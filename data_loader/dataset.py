@@ -0,0 +1,115 @@
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+import pandas as pd
+
+from data_loader.broker import get_data_broker
+from data_loader.loader import MRR_SCHEMA, SNAPSHOT_NAME, load_dashboard_snapshot
+from data_loader.periods import parse_months, select_months
+from data_loader.schema import ColumnMap
+from data_loader.tracing import traced
+
+# Coluna de resultado (nome canónico; 'Resultado AC' e 'AC' são aceites pelo MRR_SCHEMA)
+RESULT_COLUMN = 'Resultado Acumulado'
+
+
+@dataclass(frozen=True)
+class PreparedDataset:
+    """
+    Dados da aba 'DADOS STREAMLIT' preparados uma única vez por carga.
+
+    - frame: linhas ordenadas por mês, indexadas por 'Mes' (PeriodIndex mensal),
+      com as colunas numéricas já convertidas pelo loader.
+    - months: meses presentes, por ordem cronológica (PeriodIndex sem repetições).
+    - monthly: agregados por mês (soma de cada coluna numérica, com vazios = 0)
+      e o número de linhas do mês em '_linhas'.
+    - result_column: coluna de resultado encontrada na planilha (ou None).
+    - saved_at: momento em que o snapshot de origem foi gravado.
+    - version: versão do snapshot de origem (chave das caches de renderização).
+    - columns: mapa de colunas compilado pelo MRR_SCHEMA, com o relatório de
+      validação (colunas em falta, nomes alternativos usados).
+
+    Em todos os métodos, `months` pode ser um MonthRange (slice por pesquisa
+    binária no índice ordenado) ou uma lista de meses avulsos.
+
+    O objeto é partilhado entre reruns e sessões: as telas apenas leem dele,
+    nunca o alteram.
+    """
+    frame: pd.DataFrame
+    months: pd.PeriodIndex
+    monthly: pd.DataFrame
+    result_column: str | None
+    saved_at: datetime | None = None
+    version: float | None = None
+    columns: ColumnMap | None = None
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    @property
+    def report(self):
+        return self.columns.report if self.columns is not None else None
+
+    def has(self, column):
+        """Se a coluna (nome canónico) existe nesta carga, resolvido uma vez em prepare_dataset."""
+        return self.columns is not None and self.columns.has(column)
+
+    def rows(self, months):
+        """Linhas dos meses indicados (sem copiar o frame inteiro)."""
+        return select_months(self.frame, months)
+
+    def total(self, column, months):
+        """Soma de `column` nos meses indicados, a partir dos agregados mensais."""
+        if column not in self.monthly.columns:
+            return 0.0
+        return float(select_months(self.monthly, months)[column].sum())
+
+    def average(self, column, months):
+        """Média por linha de `column` nos meses indicados (vazios contam como 0)."""
+        if column not in self.monthly.columns:
+            return 0.0
+        selected = select_months(self.monthly, months)
+        linhas = selected['_linhas'].sum()
+        return float(selected[column].sum() / linhas) if linhas else 0.0
+
+
+@traced("dataset.prepare")
+def prepare_dataset(df):
+    """Constrói o PreparedDataset a partir do DataFrame devolvido por load_dashboard_data."""
+    if df.empty or 'Mes' not in df.columns:
+        return PreparedDataset(pd.DataFrame(), pd.PeriodIndex([], freq='M'), pd.DataFrame(), None)
+
+    # Snapshots gravados antes do esquema podem ter nomes alternativos ('Resultado AC')
+    columns = MRR_SCHEMA.compile(df.columns)
+    df = columns.apply(df)
+
+    periods = parse_months(df['Mes'])
+    frame = df.drop(columns='Mes').set_axis(periods.rename('Mes'), axis=0)
+    frame = frame[frame.index.notna()].sort_index(kind='stable')
+
+    grouped = frame[columns.typed].groupby(level='Mes')
+    monthly = grouped.sum(min_count=0)
+    monthly['_linhas'] = grouped.size()
+
+    result_column = RESULT_COLUMN if columns.has(RESULT_COLUMN) else None
+    return PreparedDataset(frame, monthly.index, monthly, result_column, columns=columns)
+
+
+def _prepare_snapshot(snapshot):
+    """PreparedDataset de um snapshot da aba 'DADOS STREAMLIT' (chamado pelo DataBroker, uma vez por versão)."""
+    if snapshot is None:
+        return prepare_dataset(pd.DataFrame())
+    return replace(prepare_dataset(snapshot.data), saved_at=snapshot.saved_at, version=snapshot.version)
+
+
+def load_prepared_dataset():
+    """
+    Devolve o dataset preparado da versão atual do snapshot (partilhado entre sessões).
+    O DataBroker guarda um único objeto por versão, que as telas leem sem cópias;
+    uma nova versão do snapshot (ex: atualização em segundo plano) é preparada
+    logo na publicação, antes do próximo rerun.
+    """
+    if load_dashboard_snapshot() is None:
+        return prepare_dataset(pd.DataFrame())
+    return get_data_broker().derive("dataset", [SNAPSHOT_NAME], _prepare_snapshot)
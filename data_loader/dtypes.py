@@ -0,0 +1,58 @@
+import pandas as pd
+
+# Tipos compactos comuns a todos os loaders (loader.py, load_operacional_data.py e
+# loader_leads.py). Valores em reais ficam em float64: o float32 só tem ~7 dígitos
+# significativos e perde os centavos acima de R$ 100 mil (ex: a receita acumulada).
+MONEY = 'float64'
+# Percentagens e frações (ex: 0.054 = 5,40%), exibidas com 1-2 casas decimais.
+# float32 do NumPy e não Float32 anulável: sem máscara de nulos (vazios como NaN),
+# as colunas juntam-se num só bloco e o pickle/snapshot não cresce coluna a coluna
+RATIO = 'float32'
+# Contagens (clientes, churn, leads por etapa): float32 do NumPy de propósito, e não
+# Int32 nem um ArrowDtype inteiro. Guarda inteiros exatos até 2^24 (16,7 milhões)
+# e aceita vazios como NaN; o Int32 anulável e o int32[pyarrow] levam uma máscara
+# de nulos por coluna e, medidos contra os loaders antigos (bench_memory.py),
+# aumentavam a memória e o pickle em vez de os reduzir
+COUNT = 'float32'
+# Texto repetido em muitas linhas (um código por linha): só para colunas declaradas
+# no esquema com poucos valores distintos. Rótulos quase únicos, como o 'Periodo'
+# do SprintHub, ficam TEXT
+LABEL = 'category'
+# Texto livre: buffers Arrow em vez de um objeto Python por célula
+try:
+    import pyarrow  # noqa: F401
+    TEXT = 'string[pyarrow]'
+except ImportError:
+    TEXT = 'string'
+
+
+def compact_frame(df, dtypes):
+    """
+    Aplica o esquema compacto: `dtypes` = {coluna: MONEY/RATIO/COUNT/LABEL/TEXT}
+    para as colunas presentes. Colunas fora do esquema que ainda sejam de texto
+    (object) passam a TEXT. O tipo de cada coluna depende só do esquema, nunca
+    do número de linhas, por isso uma aba mantém o mesmo esquema ao crescer. As
+    colunas já com o tipo certo não são copiadas. Devolve um novo DataFrame.
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        dtype = dtypes.get(col)
+        if dtype is None:
+            if series.dtype == object:
+                columns[col] = series.astype(TEXT)
+            continue
+        if str(series.dtype) == str(dtype):
+            continue
+        if dtype in (MONEY, RATIO, COUNT):
+            columns[col] = pd.to_numeric(series, errors='coerce').astype(dtype)
+        elif dtype == LABEL:
+            columns[col] = series.astype(TEXT).astype(LABEL)
+        else:
+            columns[col] = series.astype(dtype)
+    return df.assign(**columns) if columns else df
+
+
+def frame_nbytes(df):
+    """Bytes em memória de um DataFrame, incluindo o conteúdo das strings Python."""
+    return int(df.memory_usage(deep=True, index=True).sum())
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from data_loader.snapshot import UNCHANGED
+
+# Intervalo entre verificações do ficheiro (um os.stat, sem ler o conteúdo)
+POLL_INTERVAL = 2.0
+# Um ficheiro modificado há menos do que isto pode ainda estar a ser escrito:
+# só é lido se o tamanho e a data não mudarem durante este tempo
+SETTLE_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class FileIdentity:
+    """
+    Identidade de um ficheiro num dado momento.
+
+    - stat: (inode, tamanho, mtime em ns). Barato; muda a cada escrita ou rename.
+    - digest: sha256 do conteúdo. Distingue uma alteração real de um simples
+      'touch' ou de um export idêntico ao anterior.
+    """
+    inode: int
+    size: int
+    mtime_ns: int
+    digest: str | None = None
+
+    @classmethod
+    def of_stat(cls, st):
+        return cls(st.st_ino, st.st_size, st.st_mtime_ns)
+
+    @property
+    def stat_key(self):
+        return self.inode, self.size, self.mtime_ns
+
+
+class FileWatcher:
+    """
+    Deteta alterações num ficheiro local pela sua identidade (inode, tamanho,
+    mtime e hash do conteúdo), em vez de um TTL.
+
+    - Sem alterações no stat: não lê nada.
+    - Stat diferente mas mesmo hash (ex: 'touch', export repetido): não recarrega.
+    - Escrita a meio: se o ficheiro foi alterado há pouco no mesmo inode, espera
+      até o tamanho e a data estabilizarem. Um rename atómico (novo inode) é
+      sempre um ficheiro completo e é lido de imediato.
+    - O conteúdo é lido uma única vez: o hash e o parse usam os mesmos bytes.
+    """
+
+    def __init__(self, path, settle=SETTLE_SECONDS):
+        self.path = path
+        self.settle = settle
+        self._lock = threading.Lock()
+        self.identity = None
+        self._failed = None
+        self.stats = {"checks": 0, "unchanged": 0, "same_content": 0, "unstable": 0, "reloads": 0}
+
+    def _stable_stat(self):
+        """os.stat do ficheiro, ou None se ainda estiver a ser escrito."""
+        st = os.stat(self.path)
+        atomic_rename = self.identity is not None and st.st_ino != self.identity.inode
+        if atomic_rename or time.time() - st.st_mtime >= self.settle:
+            return st
+        time.sleep(self.settle)
+        again = os.stat(self.path)
+        if FileIdentity.of_stat(again).stat_key != FileIdentity.of_stat(st).stat_key:
+            return None
+        return again
+
+    def changed(self):
+        """True se o stat do ficheiro difere da última leitura (sem ler o conteúdo)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        key = FileIdentity.of_stat(st).stat_key
+        with self._lock:
+            # Um ficheiro que falhou o parse só volta a ser lido quando mudar outra vez
+            if key == self._failed:
+                return False
+            return self.identity is None or key != self.identity.stat_key
+
+    def read_if_changed(self, parse, force=False):
+        """
+        Lê o ficheiro se a identidade mudou e devolve parse(buffer) (buffer em
+        memória com o conteúdo). Devolve UNCHANGED se não houve alterações ou se
+        o ficheiro ainda está a ser escrito. FileNotFoundError se não existir.
+        """
+        with self._lock:
+            self.stats["checks"] += 1
+            st = os.stat(self.path)
+            if not force and self.identity is not None and FileIdentity.of_stat(st).stat_key == self.identity.stat_key:
+                self.stats["unchanged"] += 1
+                return UNCHANGED
+
+            st = self._stable_stat()
+            if st is None:
+                self.stats["unstable"] += 1
+                return UNCHANGED
+
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            identity = FileIdentity(st.st_ino, st.st_size, st.st_mtime_ns, hashlib.sha256(content).hexdigest())
+            if not force and self.identity is not None and identity.digest == self.identity.digest:
+                # Conteúdo igual: só atualiza o stat para não voltar a ler
+                self.identity = identity
+                self.stats["same_content"] += 1
+                return UNCHANGED
+
+            try:
+                result = parse(io.BytesIO(content))
+            except Exception:
+                self._failed = identity.stat_key
+                raise
+            # Só regista a identidade depois de um parse bem sucedido
+            self.identity, self._failed = identity, None
+            self.stats["reloads"] += 1
+            return result
+
+
+class FileWatchThread(threading.Thread):
+    """
+    Verifica o ficheiro a cada POLL_INTERVAL segundos (só os.stat) e chama
+    `on_change()` assim que o stat mudar. Substitui um watcher inotify sem
+    dependências extra e funciona também em pastas de rede.
+    """
+
+    def __init__(self, watcher, on_change, interval=POLL_INTERVAL):
+        super().__init__(name=f"file-watch-{os.path.basename(watcher.path)}", daemon=True)
+        self.watcher = watcher
+        self.on_change = on_change
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if self.watcher.changed():
+                    self.on_change()
+            except Exception as e:
+                print(f"[file_watch.py] Erro ao verificar '{self.watcher.path}': {e}")
+
+    def stop(self):
+        self.stopped.set()
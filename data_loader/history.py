@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from data_loader.periods import parse_months
+from data_loader.snapshot import SNAPSHOT_DIR
+from data_loader.tracing import span
+
+# Ficheiro SQLite do histórico, ao lado dos snapshots
+HISTORY_PATH = os.path.join(SNAPSHOT_DIR, "history.sqlite")
+
+# Sufixos das colunas da aba 'DADOS OPERACIONAL' e o mês a que se referem
+# (0 = mês em que o snapshot foi buscado, 1 = mês anterior)
+OPERATIONAL_SUFFIXES = {' mes atual': 0, ' mes anterior': 1}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_history (
+    source      TEXT    NOT NULL,
+    metric      TEXT    NOT NULL,
+    month       INTEGER NOT NULL,  -- ordinal do período mensal (meses desde 01/1970)
+    value       REAL,
+    captured_at TEXT    NOT NULL,
+    PRIMARY KEY (source, metric, month)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS metric_history_month ON metric_history (source, month);
+"""
+
+
+def operational_metrics(df, month):
+    """
+    Converte a linha da aba 'DADOS OPERACIONAL' em registos (métrica, mês, valor):
+    'ctr google mes atual' -> ('ctr google', mês atual), '... mes anterior' -> mês - 1.
+    Outras colunas numéricas ficam registadas no mês atual.
+    """
+    if df.empty:
+        return []
+    row = df.iloc[0]
+    registos = []
+    for coluna, valor in row.items():
+        nome = str(coluna).strip().lower()
+        numero = pd.to_numeric(pd.Series([valor]), errors='coerce').iloc[0]
+        if pd.isna(numero):
+            continue
+        sufixo = next((s for s in OPERATIONAL_SUFFIXES if nome.endswith(s)), None)
+        if sufixo:
+            registos.append((nome[:-len(sufixo)], (month - OPERATIONAL_SUFFIXES[sufixo]).ordinal, float(numero)))
+        else:
+            registos.append((nome, month.ordinal, float(numero)))
+    return registos
+
+
+def monthly_metrics(df, month=None):
+    """
+    Converte uma aba com uma linha por mês (coluna 'Mes', ex: 'DADOS STREAMLIT') em
+    registos (métrica, mês, valor), somando as colunas numéricas de cada mês.
+    `month` não é usado (cada linha já traz o seu mês).
+    """
+    if df.empty or 'Mes' not in df.columns:
+        return []
+    numeric = df.drop(columns='Mes').select_dtypes('number')
+    if numeric.empty:
+        return []
+    meses = parse_months(df['Mes'])
+    mensal = numeric[meses.notna()].groupby(meses[meses.notna()].asi8).sum(min_count=1)
+    longo = mensal.stack().dropna()
+    return [(str(metric), int(ordinal), float(v)) for (ordinal, metric), v in longo.items()]
+
+
+class HistoryStore:
+    """
+    Histórico local de KPIs por mês, numa tabela SQLite indexada por
+    (fonte, métrica, mês).
+
+    Cada snapshot publicado é acrescentado ao histórico (o último valor de cada
+    mês prevalece), por isso a série de qualquer KPI e comparações com qualquer
+    mês anterior são consultas locais de milissegundos, sem pedidos ao Sheets,
+    e o histórico não se perde quando a planilha passa para o mês seguinte.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        # Uma ligação por operação: o pipeline grava noutra thread
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        con = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_SCHEMA)
+            self._ready = True
+        return con
+
+    def record(self, source, registos, captured_at=None):
+        """Grava registos (métrica, mês ordinal, valor) de uma fonte. Devolve quantos gravou."""
+        if not registos:
+            return 0
+        captured_at = (captured_at or datetime.now()).isoformat(timespec='seconds')
+        with self._lock:
+            con = self._connect()
+            try:
+                with con, span("history.record"):
+                    con.executemany(
+                        "INSERT INTO metric_history (source, metric, month, value, captured_at) "
+                        "VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT (source, metric, month) DO UPDATE SET "
+                        "value = excluded.value, captured_at = excluded.captured_at",
+                        [(source, m, mes, v, captured_at) for m, mes, v in registos],
+                    )
+            finally:
+                con.close()
+        return len(registos)
+
+    def _query(self, sql, params):
+        if not os.path.exists(self.path):
+            return []
+        con = self._connect()
+        try:
+            with span("history.query"):
+                return con.execute(sql, params).fetchall()
+        finally:
+            con.close()
+
+    def series(self, source, metric, start=None, end=None):
+        """Série mensal de uma métrica (pd.Series indexada por PeriodIndex), opcionalmente entre dois meses."""
+        sql = "SELECT month, value FROM metric_history WHERE source = ? AND metric = ?"
+        params = [source, metric]
+        if start is not None:
+            sql += " AND month >= ?"
+            params.append(pd.Period(start, 'M').ordinal)
+        if end is not None:
+            sql += " AND month <= ?"
+            params.append(pd.Period(end, 'M').ordinal)
+        rows = self._query(sql + " ORDER BY month", params)
+        index = pd.PeriodIndex.from_ordinals([r[0] for r in rows], freq='M').rename('Mes')
+        return pd.Series([r[1] for r in rows], index=index, name=metric, dtype='float64')
+
+    def metrics(self, source):
+        """Nomes das métricas com histórico de uma fonte."""
+        return [r[0] for r in self._query(
+            "SELECT DISTINCT metric FROM metric_history WHERE source = ? ORDER BY metric", (source,))]
+
+    def value(self, source, metric, month):
+        """Valor de uma métrica num mês (NaN se não houver registo)."""
+        serie = self.series(source, metric, month, month)
+        return serie.iloc[0] if len(serie) else float('nan')
+
+
+def history_listener(store, extractors):
+    """
+    Listener para o RefreshPipeline: acrescenta ao histórico cada snapshot publicado.
+    `extractors` = {nome do snapshot: função(df, mês atual) -> registos}.
+    """
+    def record(results):
+        month = pd.Period.now('M')
+        for name, df in results.items():
+            extract = extractors.get(name)
+            if extract is None:
+                continue
+            try:
+                store.record(name, extract(df, month))
+            except Exception as e:
+                # O histórico nunca deve impedir a publicação dos dados
+                print(f"[history.py] Erro ao gravar o histórico de '{name}': {e}")
+    return record
+
+
+@st.cache_resource
+def get_history_store():
+    """Instância única do HistoryStore no processo do Streamlit."""
+    return HistoryStore()
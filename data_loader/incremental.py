@@ -0,0 +1,168 @@
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from data_loader.periods import parse_months
+from data_loader.tracing import get_tracer, span
+
+# Modo incremental ligado por omissão; KAPTHA_INCREMENTAL=0 volta a descarregar sempre a aba inteira
+INCREMENTAL_ENABLED = os.environ.get("KAPTHA_INCREMENTAL", "1") != "0"
+# Meses mais recentes que são sempre relidos (o mês corrente e o anterior costumam mudar)
+RECENT_MONTHS = 2
+# A cada N atualizações com alterações, faz uma leitura completa para apanhar edições no histórico
+FULL_FETCH_EVERY = 6
+# Fórmulas que importam dados de outras planilhas (IMPORTRANGE) não alteram a data de
+# modificação: após N verificações seguidas "sem alterações", lê na mesma
+MAX_UNCHANGED_CHECKS = 6
+# Sem coluna 'Mes', relê apenas as últimas N linhas (mais as que forem acrescentadas)
+TAIL_ROWS = 3
+
+# Mesmos parâmetros que o gspread_dataframe usa com evaluate_formulas=True
+VALUE_PARAMS = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+
+
+class _ValuesSpreadsheet:
+    def __init__(self, values):
+        self._values = values
+
+    def values_get(self, range_name, params=None):
+        return {"values": self._values}
+
+
+class ValuesWorksheet:
+    """
+    Worksheet em memória com valores já descarregados. Permite passar os valores
+    combinados pelos mesmos fetch_* dos loaders (via get_as_dataframe), garantindo
+    que uma leitura incremental produz exatamente o mesmo DataFrame que uma completa.
+    """
+
+    def __init__(self, title, values):
+        self.title = title
+        self.spreadsheet = _ValuesSpreadsheet(values)
+        self.row_count = len(values)
+        self.col_count = max((len(row) for row in values), default=0)
+
+
+class IncrementalSheet:
+    """
+    Leitura incremental de uma aba do Google Sheets.
+
+    1. Sinal barato de alteração: a data de modificação do ficheiro (Drive API).
+       Se não mudou desde a última leitura, não descarrega nada.
+    2. Se mudou, relê só as linhas a partir dos meses recentes (e as acrescentadas
+       no fim) e junta-as às linhas em cache.
+    3. A cada FULL_FETCH_EVERY leituras com alterações, ou se o cabeçalho mudar,
+       faz uma leitura completa. Após MAX_UNCHANGED_CHECKS verificações sem
+       alterações, lê na mesma (fórmulas importadas não mudam a data).
+    """
+
+    def __init__(self, recent_months=RECENT_MONTHS, full_every=FULL_FETCH_EVERY, tail_rows=TAIL_ROWS,
+                 max_unchanged=MAX_UNCHANGED_CHECKS):
+        self.recent_months = recent_months
+        self.full_every = full_every
+        self.tail_rows = tail_rows
+        self.max_unchanged = max_unchanged
+        self._unchanged_streak = 0
+        self._lock = threading.Lock()
+        self._values = None
+        self._modified = None
+        self._since_full = 0
+        self.stats = {"unchanged": 0, "partial": 0, "full": 0}
+
+    def _modified_time(self, worksheet):
+        try:
+            return worksheet.spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            # Sem acesso à Drive API não há sinal de alteração: lê sempre (de forma parcial)
+            print(f"[incremental.py] Sem data de modificação para '{worksheet.title}': {e}")
+            return None
+
+    def _tail_start(self, values):
+        """Índice (0-based, na lista de valores) da primeira linha a reler."""
+        header = [str(h).strip() for h in values[0]]
+        first_data, last = 1, len(values)
+        if 'Mes' in header and last > first_data:
+            col = header.index('Mes')
+            meses = parse_months([row[col] if col < len(row) else None for row in values[first_data:]])
+            corte = pd.Period.now('M') - (self.recent_months - 1)
+            recentes = (meses >= corte).nonzero()[0]
+            if len(recentes):
+                return first_data + int(recentes[0])
+        return max(first_data, last - self.tail_rows)
+
+    def _get(self, worksheet, range_name):
+        with span("sheets.values_get"):
+            data = worksheet.spreadsheet.values_get(range_name, params=VALUE_PARAMS)
+        return data.get("values", [])
+
+    def _batch_get(self, worksheet, ranges):
+        """Cabeçalho e linhas recentes num único pedido à API."""
+        with span("sheets.values_batch_get"):
+            data = worksheet.spreadsheet.values_batch_get(ranges, params=VALUE_PARAMS)
+        return [r.get("values", []) for r in data.get("valueRanges", [])]
+
+    def reset(self):
+        """Esquece o estado (ex: após um erro), forçando uma leitura completa."""
+        with self._lock:
+            self._values, self._modified, self._since_full, self._unchanged_streak = None, None, 0, 0
+
+    def read(self, worksheet):
+        """
+        Devolve os valores atuais da aba (lista de linhas, com cabeçalho), ou None
+        se a aba não mudou desde a última leitura.
+        """
+        with self._lock:
+            modified = self._modified_time(worksheet)
+            if (self._values is not None and modified is not None and modified == self._modified
+                    and self._unchanged_streak < self.max_unchanged):
+                self._unchanged_streak += 1
+                self.stats["unchanged"] += 1
+                get_tracer().count("sheets.unchanged_skips")
+                return None
+            self._unchanged_streak = 0
+
+            title = f"'{worksheet.title}'"
+            full = self._values is None or self._since_full + 1 >= self.full_every
+            if not full:
+                from gspread.utils import rowcol_to_a1
+
+                start = self._tail_start(self._values)
+                last_col = max(len(self._values[0]), worksheet.col_count)
+                # Intervalo aberto em linhas ("A25:AH"): inclui as linhas acrescentadas no fim
+                end_col = rowcol_to_a1(1, last_col).rstrip('0123456789')
+                ranges = [f"{title}!A1:{end_col}1", f"{title}!A{start + 1}:{end_col}"]
+                head, tail = self._batch_get(worksheet, ranges)
+                if head[:1] != self._values[:1]:
+                    full = True
+                else:
+                    values = self._values[:start] + tail
+                    self._since_full += 1
+                    self.stats["partial"] += 1
+
+            if full:
+                values = self._get(worksheet, title)
+                self._since_full = 0
+                self.stats["full"] += 1
+
+            self._values, self._modified = values, modified
+            return values
+
+
+@st.cache_resource
+def get_incremental_sheet(connection, title):
+    """Estado incremental (valores em cache e data de modificação) de uma aba, por processo."""
+    return IncrementalSheet()
+
+
+def incremental_worksheet(connection, worksheet):
+    """
+    Envolve um worksheet real para leitura incremental. Devolve um ValuesWorksheet
+    com os valores atuais, ou None se a aba não mudou desde a última leitura.
+    Com o modo incremental desligado devolve o próprio worksheet.
+    """
+    if not INCREMENTAL_ENABLED:
+        return worksheet
+    values = get_incremental_sheet(connection, worksheet.title).read(worksheet)
+    return None if values is None else ValuesWorksheet(worksheet.title, values)
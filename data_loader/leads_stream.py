@@ -0,0 +1,311 @@
+import glob
+import hashlib
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_loader.parsing import parse_brazilian_numbers
+from data_loader.schema import normalize_name
+from data_loader.snapshot import SNAPSHOT_DIR, UNCHANGED
+
+# Exports brutos do SprintHub (uma linha por lead) colocados em data_loader/
+RAW_EXPORTS_GLOB = os.path.join("data_loader", "_LEADS_SPRINTHUB*.csv")
+# Linhas lidas de cada vez: a memória usada não depende do tamanho do ficheiro
+CHUNK_ROWS = 50_000
+# Bytes iniciais usados para reconhecer o mesmo ficheiro entre execuções
+HEAD_BYTES = 64 * 1024
+
+# Formato das datas do SprintHub ('31/08/2025', às vezes seguido da hora);
+# só as linhas que não o seguem passam pelo parser lento (format='mixed')
+RAW_DATE_FORMAT = '%d/%m/%Y'
+
+# Etapas do funil (a mesma ordem de loader_leads.FUNNEL_STAGES)
+FUNNEL_STAGES = ['gerados', 'qualificados', 'diagnostico', 'proposta', 'vendas']
+REVENUE_COLUMN = 'receita_vendas'
+
+# Nomes de coluna aceites no export bruto, por ordem de preferência
+RAW_COLUMNS = {
+    'data': ['data_criacao', 'data de criacao', 'criado em', 'created_at', 'data'],
+    'etapa': ['etapa', 'etapa do funil', 'stage', 'fase'],
+    'valor': ['valor_venda', 'valor da venda', 'valor', 'receita'],
+}
+
+# Etapa atingida pelo lead -> posição no funil (um lead em 'proposta' também
+# conta como gerado, qualificado e diagnóstico)
+STAGE_ALIASES = {
+    'gerado': 0, 'gerados': 0, 'lead': 0, 'novo': 0, 'novo lead': 0,
+    'qualificado': 1, 'qualificados': 1, 'qualificacao': 1,
+    'diagnostico': 2, 'reuniao de diagnostico': 2,
+    'proposta': 3, 'proposta enviada': 3, 'negociacao': 3,
+    'venda': 4, 'vendas': 4, 'vendido': 4, 'ganho': 4, 'fechado': 4,
+}
+
+
+def _resolve_columns(header):
+    """{'data': nome real, 'etapa': ..., 'valor': ... ou None} a partir do cabeçalho do export."""
+    normalized = {normalize_name(c): c for c in header}
+    resolved = {}
+    for role, candidates in RAW_COLUMNS.items():
+        resolved[role] = next((normalized[normalize_name(c)] for c in candidates if normalize_name(c) in normalized), None)
+    missing = [r for r in ('data', 'etapa') if resolved[r] is None]
+    if missing:
+        raise ValueError(f"Export de leads sem as colunas {missing} (cabeçalho: {list(header)})")
+    return resolved
+
+
+def empty_rollup():
+    return pd.DataFrame(
+        {**{etapa: pd.Series(dtype='int64') for etapa in FUNNEL_STAGES}, REVENUE_COLUMN: pd.Series(dtype='float64')},
+        index=pd.PeriodIndex([], freq='M', name='Mes'),
+    )
+
+
+def parse_dates(values):
+    """
+    Datas do export, só ao dia (a hora não interessa para o mês). Os dias
+    repetem-se entre leads: cada valor distinto é lido uma vez com
+    RAW_DATE_FORMAT e só os que falharem passam por format='mixed' (ex: '2025-08-31').
+    """
+    codigos, distintas = pd.factorize(values.str.strip().str.slice(0, 10))
+    distintas = pd.Series(distintas, dtype=object)
+    datas = pd.to_datetime(distintas, format=RAW_DATE_FORMAT, errors='coerce')
+    falhas = datas.isna().to_numpy()
+    if falhas.any():
+        datas[falhas] = pd.to_datetime(distintas[falhas], dayfirst=True, errors='coerce', format='mixed')
+    # Código -1 (data vazia) aponta para o NaT acrescentado no fim
+    return pd.Series(np.append(datas.to_numpy(), np.datetime64('NaT', 'ns'))[codigos], index=values.index)
+
+
+def stage_positions(values):
+    """
+    Posição no funil de cada lead. As etapas repetem-se muito: normaliza só os
+    valores distintos (pd.factorize) e espalha o resultado pelas linhas.
+    """
+    codigos, distintas = pd.factorize(values)
+    posicoes = pd.Series(distintas, dtype=object).map(normalize_name).map(STAGE_ALIASES).fillna(0).to_numpy('int64')
+    # Código -1 (etapa vazia) aponta para o 0 acrescentado no fim: conta como gerado
+    return pd.Series(np.append(posicoes, 0)[codigos], index=values.index)
+
+
+def aggregate_chunk(chunk, columns):
+    """
+    Agrega um bloco de leads por mês: contagem por etapa atingida (cumulativa ao
+    longo do funil) e soma do valor das vendas. Tudo vetorizado.
+    """
+    meses = parse_dates(chunk[columns['data']]).dt.to_period('M')
+    valido = meses.notna().to_numpy()
+    if not valido.any():
+        return empty_rollup()
+
+    # Meses como ordinais inteiros (sem criar um objeto Period por lead)
+    ordinais = meses.array.asi8[valido]
+    etapas = stage_positions(chunk[columns['etapa']]).to_numpy()[valido]
+    unicos, linha = np.unique(ordinais, return_inverse=True)
+    # Leads por (mês, etapa final) -> acumulado da direita para a esquerda =
+    # leads que chegaram pelo menos a cada etapa
+    etapas_funil = len(FUNNEL_STAGES)
+    por_etapa = np.bincount(linha * etapas_funil + etapas, minlength=len(unicos) * etapas_funil)
+    atingidos = por_etapa.reshape(len(unicos), etapas_funil)[:, ::-1].cumsum(axis=1)[:, ::-1]
+    rollup = pd.DataFrame(atingidos, index=pd.PeriodIndex.from_ordinals(unicos, freq='M').rename('Mes'),
+                          columns=FUNNEL_STAGES).astype('int64')
+
+    if columns.get('valor'):
+        valores = parse_brazilian_numbers(chunk[columns['valor']][valido]).fillna(0.0).to_numpy(dtype='float64')
+        vendas = etapas == etapas_funil - 1
+        rollup[REVENUE_COLUMN] = np.bincount(linha[vendas], weights=valores[vendas], minlength=len(unicos))
+    else:
+        rollup[REVENUE_COLUMN] = 0.0
+    return rollup
+
+
+def merge_rollups(*rollups):
+    """Soma rollups mensais (meses em comum somam-se)."""
+    frames = [r for r in rollups if r is not None and not r.empty]
+    if not frames:
+        return empty_rollup()
+    merged = pd.concat(frames).groupby(level='Mes').sum()
+    return merged.astype({etapa: 'int64' for etapa in FUNNEL_STAGES} | {REVENUE_COLUMN: 'float64'})
+
+
+class _BoundedReader:
+    """Vista só de leitura de um ficheiro até um byte limite (exclui a última linha incompleta)."""
+
+    def __init__(self, f, limit):
+        self._f = f
+        self._remaining = limit - f.tell()
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        return iter(lambda: self.read(1 << 16), b'')
+
+
+def _complete_end(f, size):
+    """Posição logo a seguir à última quebra de linha (linhas a meio de escrita ficam para depois)."""
+    pos = size
+    while pos > 0:
+        step = min(1 << 16, pos)
+        f.seek(pos - step)
+        block = f.read(step)
+        idx = block.rfind(b'\n')
+        if idx >= 0:
+            return pos - step + idx + 1
+        pos -= step
+    return 0
+
+
+class LeadsStreamIngestor:
+    """
+    Ingestão incremental de exports brutos do SprintHub (uma linha por lead).
+
+    Cada ficheiro é lido em blocos de CHUNK_ROWS linhas e agregado por mês à
+    medida que é lido, por isso a memória usada é limitada pelo bloco e não pelo
+    tamanho do export. O resultado (rollup mensal por ficheiro) e a posição já
+    processada de cada ficheiro ficam gravados em disco: na execução seguinte só
+    são lidas as linhas acrescentadas desde então. Se o início do ficheiro mudar
+    (export substituído) ou ele encolher, é reprocessado do zero.
+    """
+
+    def __init__(self, pattern=RAW_EXPORTS_GLOB, state_dir=SNAPSHOT_DIR, chunk_rows=CHUNK_ROWS):
+        self.pattern = pattern
+        self.state_dir = state_dir
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._state = None
+        self._rollups = None
+        self.stats = {"rows": 0, "chunks": 0, "bytes": 0, "files_reset": 0, "state_errors": 0}
+        # Último problema com o estado gravado (reprocessado do zero), para diagnóstico
+        self.last_error = None
+
+    @property
+    def state_path(self):
+        return os.path.join(self.state_dir, "leads_stream.json")
+
+    def _load(self):
+        if self._state is not None:
+            return
+        self._state, self._rollups = {}, {}
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                stored = json.load(f)
+            for path, entry in stored.items():
+                rollup = pd.DataFrame(entry['rollup'])
+                rollup.index = pd.PeriodIndex.from_ordinals(np.asarray(rollup.pop('Mes'), dtype=np.int64), freq='M').rename('Mes')
+                self._rollups[path] = merge_rollups(rollup)
+                self._state[path] = {"offset": entry['offset'], "head": entry['head']}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            # Reprocessa os exports do zero; fica nos contadores ('leads_stream.state_errors')
+            self.stats["state_errors"] += 1
+            self.last_error = f"Estado ilegível, exports reprocessados: {e}"
+            self._state, self._rollups = {}, {}
+
+    def _save(self):
+        """
+        Rollups e posições num único ficheiro, substituído de forma atómica: uma
+        interrupção nunca deixa linhas contadas sem a posição correspondente.
+        """
+        stored = {}
+        for path, estado in self._state.items():
+            rollup = self._rollups.get(path, empty_rollup())
+            stored[path] = {
+                **estado,
+                "rollup": {"Mes": rollup.index.asi8.tolist(), **{c: rollup[c].tolist() for c in rollup.columns}},
+            }
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(stored, f)
+        os.replace(tmp, self.state_path)
+
+    @staticmethod
+    def _head_digest(f, length):
+        """Hash dos primeiros `length` bytes (até HEAD_BYTES): identifica o ficheiro já processado."""
+        f.seek(0)
+        return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+    def _ingest_file(self, path):
+        """Processa as linhas novas de um ficheiro. Devolve True se algo mudou."""
+        size = os.path.getsize(path)
+        estado = self._state.get(path)
+        with open(path, 'rb') as f:
+            reset = False
+            if estado and (size < estado['offset'] or self._head_digest(f, estado['offset']) != estado['head']):
+                # Export substituído: reprocessado do início ('leads_stream.files_reset')
+                self.stats["files_reset"] += 1
+                self._state.pop(path)
+                self._rollups.pop(path, None)
+                estado, reset = None, True
+
+            end = _complete_end(f, size)
+            if estado and end <= estado['offset']:
+                return False
+
+            f.seek(0)
+            header = pd.read_csv(io.BytesIO(f.readline()), sep=';', nrows=0).columns
+            columns = _resolve_columns(header)
+            start = estado['offset'] if estado else f.tell()
+            if end <= start:
+                return reset
+
+            f.seek(start)
+            # Colunas por posição: uma linha com menos campos não interrompe a leitura
+            posicoes = {header.get_loc(c): c for c in columns.values() if c}
+            reader = pd.read_csv(_BoundedReader(f, end), sep=';', header=None, names=range(len(header)),
+                                 usecols=list(posicoes), dtype='string', chunksize=self.chunk_rows)
+            rollup = self._rollups.get(path) if estado else None
+            for chunk in reader:
+                chunk = chunk.rename(columns=posicoes)
+                # Junta bloco a bloco: em memória fica só um rollup (meses), não os blocos
+                rollup = merge_rollups(rollup, aggregate_chunk(chunk, columns))
+                self.stats["rows"] += len(chunk)
+                self.stats["chunks"] += 1
+            head = self._head_digest(f, end)
+
+        self.stats["bytes"] += end - start
+        self._rollups[path] = merge_rollups(rollup)
+        self._state[path] = {"offset": end, "head": head}
+        return True
+
+    def ingest(self):
+        """
+        Processa as linhas novas de todos os exports. Devolve o rollup mensal total
+        (DataFrame com índice 'Mes'), ou UNCHANGED se não havia nada de novo.
+        """
+        with self._lock:
+            self._load()
+            paths = sorted(glob.glob(self.pattern))
+            changed = False
+            for path in paths:
+                changed |= self._ingest_file(path)
+            # Exports apagados deixam de contar
+            for gone in [p for p in self._state if p not in paths]:
+                self._state.pop(gone)
+                self._rollups.pop(gone, None)
+                changed = True
+            if not changed:
+                return UNCHANGED
+            self._save()
+            return merge_rollups(*self._rollups.values())
+
+    def rollup(self):
+        """Rollup mensal total já processado (sem ler os ficheiros)."""
+        with self._lock:
+            self._load()
+            return merge_rollups(*self._rollups.values())
+
+    def as_dict(self):
+        """Contadores da ingestão (linhas, blocos, bytes, ficheiros reprocessados, erros de estado)."""
+        return dict(self.stats, files=len(self._state or {}))
@@ -1,44 +1,97 @@
 import streamlit as st
-import gspread
-from gspread_dataframe import get_as_dataframe
 import pandas as pd
 import re
 
-@st.cache_data(ttl=600)
-def load_operacional_data():
+from data_loader.broker import get_data_broker
+from data_loader.connections import get_connection_manager, open_worksheet
+from data_loader.dtypes import MONEY, RATIO
+from data_loader.incremental import get_incremental_sheet, incremental_worksheet
+from data_loader.pipeline import get_pipeline
+from data_loader.refresher import get_refresher
+from data_loader.schema import Column, Schema
+from data_loader.snapshot import UNCHANGED, get_snapshot_cache
+from data_loader.tracing import span
+
+# Nome do snapshot local desta aba (ver data_loader/snapshot.py)
+SNAPSHOT_NAME = "dados_operacional"
+
+# Esquema da aba (data_loader/schema.py), com os tipos compactos de data_loader/dtypes.py:
+# CTR é uma fração (0.054 = 5,40%), CPR é em reais. 'mês' com acento também é aceite.
+OPERACIONAL_SCHEMA = Schema("DADOS OPERACIONAL", [
+    Column(f'{kpi} {canal} {mes}', RATIO if kpi == 'ctr' else MONEY)
+    for kpi in ('ctr', 'cpr') for canal in ('google', 'meta') for mes in ('mes atual', 'mes anterior')
+])
+
+
+def fetch_operacional_data(worksheet):
     """
-    Carrega os dados da aba 'DADOS OPERACIONAL', pedindo ao Google Sheets
+    Lê a aba 'DADOS OPERACIONAL' de um worksheet já aberto, pedindo ao Google Sheets
     pelos valores numéricos brutos (UNFORMATTED_VALUE).
-    Isto é mais confiável para decimais (porcentagens) e números.
+    Não usa cache nem credenciais, por isso aceita um worksheet falso em testes.
     """
+    # Importação diferida: o primeiro render serve o snapshot local sem carregar o gspread
+    from gspread_dataframe import get_as_dataframe
+
+    # [A CHAVE ESTÁ AQUI]
+    # Pede o valor NÚMERICO puro (ex: 0.0540 para 5.40%, e 66.81 para 66,81)
+    with span("operacional.get_as_dataframe"):
+        df = get_as_dataframe(worksheet,
+                              header=0,
+                              value_render_option='UNFORMATTED_VALUE',
+                              evaluate_formulas=True) # Garante que PROCV/fórmulas funcionam
+
+    # Garante que os nomes das colunas não tenham espaços
+    df.columns = df.columns.str.strip()
+
+    # Remove linhas que possam estar completamente vazias
+    df.dropna(how='all', inplace=True)
+
+    # Não faz limpeza de texto, confia no UNFORMATTED_VALUE; só fixa nomes e tipos
+    # (um '#N/A' numa coluna de KPI passa a vazio)
+    df, columns = OPERACIONAL_SCHEMA.conform(df)
+    for mensagem in columns.report.messages():
+        print(f"[loader_op.py] {mensagem}")
+    return df
+
+
+def download_operacional_data():
+    """Descarrega a aba 'DADOS OPERACIONAL', reaproveitando a ligação ao Google Sheets."""
     try:
-        # Conecta na API correta
-        creds = st.secrets["connections"]["gsheets_operacional"]
-        gc = gspread.service_account_from_dict(creds)
-        spreadsheet = gc.open_by_url(creds["spreadsheet"])
-        
         # TENTE MUDAR "DADOS OPERACIONAL" se o nome da sua aba for outro
-        worksheet = spreadsheet.worksheet("DADOS OPERACIONAL")
-        
-        # [A CHAVE ESTÁ AQUI]
-        # Pede o valor NÚMERICO puro (ex: 0.0540 para 5.40%, e 66.81 para 66,81)
-        df = get_as_dataframe(worksheet, 
-                              header=0, 
-                              value_render_option='UNFORMATTED_VALUE', 
-                              evaluate_formulas=True) # Garante que PROCV/fórmulas funcionam
+        worksheet = incremental_worksheet("gsheets_operacional", open_worksheet("gsheets_operacional", "DADOS OPERACIONAL"))
+        if worksheet is None:
+            return UNCHANGED
+        df = fetch_operacional_data(worksheet)
+    except Exception:
+        # Um handle inválido (ex: aba renomeada, permissão revogada) não deve ficar em cache
+        get_connection_manager().invalidate("gsheets_operacional")
+        get_incremental_sheet("gsheets_operacional", "DADOS OPERACIONAL").reset()
+        raise
+
+    print("[loader_op.py] Dados carregados com sucesso.")
+    return df
 
-        # Garante que os nomes das colunas não tenham espaços
-        df.columns = df.columns.str.strip()
 
-        # Remove linhas que possam estar completamente vazias
-        df.dropna(how='all', inplace=True)
+def load_operacional_snapshot():
+    """
+    Devolve o Snapshot atual da aba 'DADOS OPERACIONAL' (ou None se nunca foi carregada).
+    Os dados são atualizados em segundo plano pelo BackgroundRefresher; só espera pela
+    rede no primeiro arranque sem nenhum snapshot em disco.
+    """
+    return get_refresher().watch(get_pipeline(), SNAPSHOT_NAME)
+
 
-        # Não faz nenhuma conversão/limpeza, confia no UNFORMATTED_VALUE
-        
-        print("[loader_op.py] Dados carregados com sucesso.")
-        return df
-        
-    except Exception as e:
+def load_operacional_data():
+    """
+    Carrega os dados da aba 'DADOS OPERACIONAL', pedindo ao Google Sheets
+    pelos valores numéricos brutos (UNFORMATTED_VALUE).
+    Isto é mais confiável para decimais (porcentagens) e números.
+    """
+    snapshot = load_operacional_snapshot()
+    if snapshot is None:
+        e = get_snapshot_cache().last_error(SNAPSHOT_NAME)
         print(f"Erro ao carregar dados do loader_op.py: {e}")
         st.error(f"Erro no loader_op.py: {e}")
         return pd.DataFrame()
+    # Vista sem cópia do snapshot partilhado (alterá-la não afeta as outras sessões)
+    return get_data_broker().frame(SNAPSHOT_NAME)
@@ -1,78 +1,121 @@
-import streamlit as st
-import gspread
-from gspread_dataframe import get_as_dataframe
 import pandas as pd
-import re
 
-def clean_brazilian_number(value):
+from data_loader.dtypes import COUNT, MONEY, RATIO, compact_frame
+from data_loader.parsing import clean_numeric_columns
+from data_loader.periods import parse_months
+from data_loader.broker import get_data_broker
+from data_loader.connections import get_connection_manager, open_worksheet
+from data_loader.incremental import get_incremental_sheet, incremental_worksheet
+from data_loader.pipeline import get_pipeline
+from data_loader.refresher import get_refresher
+from data_loader.schema import Column, Schema
+from data_loader.snapshot import UNCHANGED, get_snapshot_cache
+from data_loader.tracing import span
+
+# Esquema da aba 'DADOS STREAMLIT' (data_loader/schema.py): nomes canónicos,
+# nomes alternativos aceites e tipos compactos (data_loader/dtypes.py) — contagens
+# e percentagens em float32 e valores em reais em float64; 'Mes' fica period[M]
+MRR_SCHEMA = Schema("DADOS STREAMLIT", [
+    Column('Mes', required=True),
+    # Sem a receita realizada nenhuma tela faz sentido: a carga falha e fica o último snapshot
+    Column('Receita Realizada', MONEY, required=True),
+    *[Column(c, MONEY) for c in [
+        'Receita Orcada', 'Receita Diferenca',
+        'Essencial Orcado', 'Essencial Realizado', 'Essencial Diferenca',
+        'Vender Orcado', 'Vender Realizado', 'Vender Diferenca',
+        'Avancado Orcado', 'Avancado Realizado', 'Avancado Diferenca',
+        'Receita Essencial', 'Receita Vender', 'Receita Avancado',
+        'Receita Essencial Mensal', 'Receita Vender Mensal', 'Receita Avancado Mensal',
+    ]],
+    *[Column(c, COUNT) for c in [
+        'Churn Orcado', 'Churn Realizado', 'Churn Diferenca',
+        'Total de Clientes Orcados', 'Total de Clientes Realizados',
+        'Churn Orcado Mensal', 'Churn Realizado Mensal',
+    ]],
+    Column('Churn % Orcado', RATIO),
+    Column('Churn % Realizado', RATIO),
+    *[Column(c, MONEY) for c in [
+        'TM Geral',
+        'LTV Essencial', 'LTV Vender', 'LTV Avancado',
+        'LTV Essencial Total', 'LTV Vender Total', 'LTV Avancado Total',
+    ]],
+    # Coluna de resultado (o nome varia conforme a versão da planilha)
+    Column('Resultado Acumulado', MONEY, aliases=('Resultado AC', 'AC')),
+])
+
+# Colunas numéricas do esquema (nomes canónicos)
+NUMERIC_COLUMNS = list(MRR_SCHEMA.dtypes)
+
+# Nome do snapshot local desta aba (ver data_loader/snapshot.py)
+SNAPSHOT_NAME = "dados_streamlit"
+
+
+def fetch_dashboard_data(worksheet):
     """
-    Limpa e converte um número em formato string brasileiro (ex: "R$ 1.234,56" ou "5,40%")
-    para um float (ex: 1234.56 ou 5.40).
+    Lê a aba 'DADOS STREAMLIT' de um worksheet já aberto, convertendo valores para
+    os nomes e tipos de MRR_SCHEMA e a coluna 'Mes' para períodos mensais (dtype period[M]).
+    Não usa cache nem credenciais, por isso aceita um worksheet falso em testes.
     """
-    if isinstance(value, (int, float)):
-        return float(value)
-
-    if pd.isna(value) or value == "":
-        return pd.NA
-    
-    value_str = str(value).strip()
-    
-    if value_str.startswith('#'):
-        return pd.NA
-        
+    # Importação diferida: o primeiro render serve o snapshot local sem carregar o gspread
+    from gspread_dataframe import get_as_dataframe
+
+    with span("mrr.get_as_dataframe"):
+        df = get_as_dataframe(worksheet, header=0, value_render_option='FORMATTED_VALUE', evaluate_formulas=True)
+
+    df.columns = df.columns.str.strip()
+    df.dropna(how='all', inplace=True)
+
+    # Nomes resolvidos uma vez pelo esquema; sem as colunas obrigatórias falha já
+    # (SchemaError), mantendo o último snapshot bom
+    columns = MRR_SCHEMA.compile(df.columns)
+    columns.report.raise_for_missing()
+    for mensagem in columns.report.messages():
+        print(f"[loader.py] {mensagem}")
+    df = columns.apply(df)
+
+    with span("mrr.clean_numbers"):
+        # Conversão vetorizada: uma passagem por coluna em vez de uma chamada por célula
+        clean_numeric_columns(df, columns.typed)
+
+        # 'Mes' passa a ser um período mensal real (aceita "08/2025" e "agosto/2025")
+        if 'Mes' in df.columns:
+            df['Mes'] = parse_months(df['Mes'])
+
+        return compact_frame(df, MRR_SCHEMA.dtypes)
+
+
+def download_dashboard_data():
+    """Descarrega a aba 'DADOS STREAMLIT', reaproveitando a ligação ao Google Sheets."""
     try:
-        cleaned_str = re.sub(r'[R$\s%]', '', value_str)
-        
-        if '.' in cleaned_str and ',' in cleaned_str:
-            cleaned_str = cleaned_str.replace('.', '').replace(',', '.')
-        elif ',' in cleaned_str:
-            cleaned_str = cleaned_str.replace(',', '.')
-
-        return float(cleaned_str)
-        
-    except (ValueError, TypeError):
-        return pd.NA
-
-@st.cache_data(ttl=600)
-def load_dashboard_data():
+        # Em modo incremental só relê os meses recentes, e nada se a aba não mudou
+        worksheet = incremental_worksheet("gsheets_mrr", open_worksheet("gsheets_mrr", "DADOS STREAMLIT"))
+        if worksheet is None:
+            return UNCHANGED
+        return fetch_dashboard_data(worksheet)
+    except Exception:
+        # Um handle inválido (ex: aba renomeada, permissão revogada) não deve ficar em cache
+        get_connection_manager().invalidate("gsheets_mrr")
+        get_incremental_sheet("gsheets_mrr", "DADOS STREAMLIT").reset()
+        raise
+
+
+def load_dashboard_snapshot():
     """
-    Carrega os dados da aba 'DADOS STREAMLIT', convertendo valores para float.
+    Devolve o Snapshot atual da aba 'DADOS STREAMLIT' (ou None se nunca foi carregada).
+    Os dados são atualizados em segundo plano pelo BackgroundRefresher; só espera pela
+    rede no primeiro arranque sem nenhum snapshot em disco.
     """
-    try:
-        creds = st.secrets["connections"]["gsheets_mrr"] 
-        gc = gspread.service_account_from_dict(creds)
-        spreadsheet = gc.open_by_url(creds["spreadsheet"])
-        
-        worksheet = spreadsheet.worksheet("DADOS STREAMLIT")
-        
-        df = get_as_dataframe(worksheet, header=0, value_render_option='FORMATTED_VALUE', evaluate_formulas=True)
+    return get_refresher().watch(get_pipeline(), SNAPSHOT_NAME)
+
 
-        df.columns = df.columns.str.strip()
-        df.dropna(how='all', inplace=True)
-
-        # Lista de todas as colunas que esperamos que sejam numéricas
-        numeric_columns = [
-            'Receita Orcada', 'Receita Realizada', 'Receita Diferenca',
-            'Essencial Orcado', 'Essencial Realizado', 'Essencial Diferenca',
-            'Vender Orcado', 'Vender Realizado', 'Vender Diferenca',
-            'Avancado Orcado', 'Avancado Realizado', 'Avancado Diferenca',
-            'Receita Essencial', 'Receita Vender', 'Receita Avancado',
-            'Receita Essencial Mensal', 'Receita Vender Mensal', 'Receita Avancado Mensal',
-            'Churn Orcado', 'Churn Realizado', 'Churn Diferenca',
-            'Total de Clientes Orcados', 'Total de Clientes Realizados',
-            'Churn Orcado Mensal', 'Churn Realizado Mensal',
-            'Churn % Orcado', 'Churn % Realizado',
-            'TM Geral',
-            'LTV Essencial', 'LTV Vender', 'LTV Avancado',
-            'LTV Essencial Total', 'LTV Vender Total', 'LTV Avancado Total'
-        ]
-
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = df[col].apply(clean_brazilian_number)
-
-        return df
-        
-    except Exception as e:
-        print(f"Erro ao carregar dados da aba 'DADOS STREAMLIT' (MRR): {e}")
-        return pd.DataFrame()
\ No newline at end of file
+def load_dashboard_data():
+    """
+    Carrega os dados da aba 'DADOS STREAMLIT', com os nomes e tipos de MRR_SCHEMA
+    e a coluna 'Mes' como períodos mensais (dtype period[M]).
+    """
+    snapshot = load_dashboard_snapshot()
+    if snapshot is None:
+        print(f"Erro ao carregar dados da aba 'DADOS STREAMLIT' (MRR): {get_snapshot_cache().last_error(SNAPSHOT_NAME)}")
+        return pd.DataFrame()
+    # Vista sem cópia do snapshot partilhado (alterá-la não afeta as outras sessões)
+    return get_data_broker().frame(SNAPSHOT_NAME)
@@ -1,50 +1,245 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
+from dataclasses import dataclass
 from datetime import datetime
 
-@st.cache_data(ttl=3600)
+from data_loader.broker import get_data_broker
+from data_loader.dtypes import COUNT, MONEY, TEXT, compact_frame
+from data_loader.file_watch import FileWatchThread, FileWatcher
+from data_loader.leads_stream import LeadsStreamIngestor
+from data_loader.periods import month_label, parse_months
+from data_loader.pipeline import get_pipeline
+from data_loader.refresher import get_refresher
+from data_loader.snapshot import SERVE_ROLE, UNCHANGED, WORKER, get_snapshot_cache
+from data_loader.tracing import get_tracer, traced
+
+# Caminho para o ficheiro dentro da pasta data_loader
+LEADS_CSV_PATH = os.path.join("data_loader", "_DADOS_SPRINTHUB.csv")
+# Nome do snapshot local do CSV (ver data_loader/snapshot.py)
+SNAPSHOT_NAME = "leads_sprinthub"
+# Snapshot do rollup mensal dos exports brutos (uma linha por lead)
+RAW_SNAPSHOT_NAME = "leads_sprinthub_raw"
+
+# Etapas do funil, pela ordem em que o lead avança
+FUNNEL_STAGES = ['gerados', 'qualificados', 'diagnostico', 'proposta', 'vendas']
+REVENUE_COLUMN = 'receita_vendas'
+
+# Tipos declarados na leitura (sem conversões linha a linha depois), os mesmos
+# tipos compactos das abas do Sheets (data_loader/dtypes.py); 'Periodo' é quase
+# único por linha, por isso fica TEXT e não LABEL
+LEADS_DTYPES = {'Periodo': TEXT, **{etapa: COUNT for etapa in FUNNEL_STAGES}, REVENUE_COLUMN: MONEY}
+
+# Rótulos relativos do export do SprintHub: meses antes do mês de referência
+RELATIVE_PERIODS = {'este_mes': 0, 'mes_passado': 1, 'dois_meses_atras': 2}
+
+
+@traced("leads.read_csv")
+def read_leads_csv(source=LEADS_CSV_PATH):
+    """Lê o CSV de leads exportado do SprintHub (caminho ou buffer), com os tipos já declarados."""
+    # Lê o CSV utilizando o separador ponto e vírgula (;) conforme identificado no ficheiro
+    return pd.read_csv(source, sep=';', dtype=LEADS_DTYPES,
+                       usecols=lambda c: c in LEADS_DTYPES)
+
+
+@st.cache_resource
+def get_leads_watcher():
+    """
+    FileWatcher do CSV, único no processo. Arranca também uma thread que verifica
+    o ficheiro a cada poucos segundos e publica um novo snapshot assim que ele
+    mudar (em vez de esperar por um TTL ou pelo próximo ciclo do pipeline).
+    """
+    watcher = FileWatcher(LEADS_CSV_PATH)
+    cache = get_snapshot_cache()
+    FileWatchThread(watcher, lambda: cache.refresh(SNAPSHOT_NAME, fetch_leads_csv)).start()
+    return watcher
+
+
+def fetch_leads_csv():
+    """
+    Fonte do RefreshPipeline para o CSV: devolve UNCHANGED se o ficheiro não mudou
+    (inode, tamanho, data e hash) desde a última leitura, ou se ainda está a ser escrito.
+    """
+    force = get_snapshot_cache().current(SNAPSHOT_NAME) is None
+    return get_leads_watcher().read_if_changed(read_leads_csv, force=force)
+
+
+def _periodos(labels, reference):
+    """
+    Converte a coluna 'Periodo' num PeriodIndex mensal. Aceita os rótulos relativos
+    ('este_mes', 'mes_passado', ...) e meses explícitos ('08/2025', 'agosto/2025').
+    """
+    labels = labels.astype('string').str.strip()
+    atras = labels.map(RELATIVE_PERIODS)
+    explicitos = parse_months(labels)
+    ordinais = np.where(atras.notna(), reference.ordinal - atras.fillna(0).to_numpy(dtype=np.int64),
+                        explicitos.asi8)
+    return pd.PeriodIndex.from_ordinals(ordinais, freq='M').rename('Mes')
+
+
+def funnel_frame(df, reference=None):
+    """
+    Funil de leads por mês: DataFrame indexado por 'Mes' (PeriodIndex ordenado),
+    com as etapas do funil (int64) e a receita das vendas. Meses repetidos somam-se;
+    linhas com período inválido são ignoradas.
+    """
+    reference = reference if reference is not None else pd.Period.now('M')
+    colunas = FUNNEL_STAGES + [REVENUE_COLUMN]
+    if df.empty or 'Periodo' not in df.columns:
+        return pd.DataFrame(columns=colunas, index=pd.PeriodIndex([], freq='M', name='Mes'))
+
+    frame = df.reindex(columns=colunas).set_axis(_periodos(df['Periodo'], reference), axis=0)
+    frame = frame[frame.index.notna()]
+    frame = frame.astype({etapa: 'Int64' for etapa in FUNNEL_STAGES}).fillna(0)
+    frame = frame.groupby(level='Mes').sum()
+    return frame.astype({etapa: 'int64' for etapa in FUNNEL_STAGES} | {REVENUE_COLUMN: 'float64'})
+
+
+def conversion_rates(funnel):
+    """
+    Taxas de conversão entre etapas consecutivas do funil (ex: 'gerados→qualificados')
+    e a conversão total 'gerados→vendas', por mês. Sem leads na etapa anterior, NaN.
+    """
+    anteriores = funnel[FUNNEL_STAGES[:-1]].to_numpy(dtype=float)
+    seguintes = funnel[FUNNEL_STAGES[1:]].to_numpy(dtype=float)
+    total = funnel[[FUNNEL_STAGES[0], FUNNEL_STAGES[-1]]].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        taxas = np.where(anteriores > 0, seguintes / anteriores, np.nan)
+        geral = np.where(total[:, 0] > 0, total[:, 1] / total[:, 0], np.nan)
+
+    nomes = [f"{a}→{b}" for a, b in zip(FUNNEL_STAGES[:-1], FUNNEL_STAGES[1:])]
+    rates = pd.DataFrame(taxas, index=funnel.index, columns=nomes)
+    rates[f"{FUNNEL_STAGES[0]}→{FUNNEL_STAGES[-1]}"] = geral
+    return rates
+
+
+@dataclass(frozen=True)
+class LeadsFunnel:
+    """
+    Dados de leads preparados uma vez por versão do snapshot.
+
+    - frame: etapas do funil e receita por mês (índice 'Mes', PeriodIndex).
+    - rates: taxas de conversão por mês, com o mesmo índice.
+    - reference: mês a que corresponde 'este_mes' no export.
+    - updated_at: data de modificação do CSV de origem.
+    """
+    frame: pd.DataFrame
+    rates: pd.DataFrame
+    reference: pd.Period
+    updated_at: datetime | None = None
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def month(self, period):
+        """Linha do funil de um mês (zeros se o mês não existir no export)."""
+        period = pd.Period(period, 'M') if not isinstance(period, pd.Period) else period
+        return self.frame.reindex([period], fill_value=0).iloc[0]
+
+    def as_report(self):
+        """Dicionário no formato antigo de load_leads_data (três períodos relativos)."""
+        meses = pd.PeriodIndex([self.reference - n for n in RELATIVE_PERIODS.values()], freq='M')
+        linhas = self.frame.reindex(meses, fill_value=0)
+        linhas.index = list(RELATIVE_PERIODS)
+        relatorio = {
+            periodo: {**{etapa: int(v[etapa]) for etapa in FUNNEL_STAGES}, REVENUE_COLUMN: float(v[REVENUE_COLUMN])}
+            for periodo, v in linhas.to_dict('index').items()
+        }
+        relatorio["ultima_atualizacao"] = (self.updated_at.strftime("%d/%m/%Y %H:%M")
+                                           if self.updated_at else "Ficheiro não encontrado")
+        return relatorio
+
+    def history_labels(self):
+        """Rótulos dos meses disponíveis (ex: para um seletor na interface)."""
+        return [month_label(p) for p in self.frame.index]
+
+
+def prepare_leads(df, updated_at=None, raw=None):
+    """
+    Constrói o LeadsFunnel a partir do CSV lido por read_leads_csv e, se existir,
+    do rollup dos exports brutos (data_loader/leads_stream.py). Nos meses presentes
+    nos dois, prevalece o rollup dos exports brutos.
+    """
+    # 'este_mes' refere-se ao mês em que o export foi gerado
+    reference = pd.Period(updated_at, 'M') if updated_at else pd.Period.now('M')
+    funnel = funnel_frame(df, reference)
+    if raw is not None and not raw.empty:
+        funnel = funnel_frame(raw, reference).combine_first(funnel)
+        funnel = funnel.astype({etapa: 'int64' for etapa in FUNNEL_STAGES} | {REVENUE_COLUMN: 'float64'})
+    return LeadsFunnel(funnel, conversion_rates(funnel), reference, updated_at)
+
+
+def _csv_updated_at():
+    if os.path.exists(LEADS_CSV_PATH):
+        return datetime.fromtimestamp(os.path.getmtime(LEADS_CSV_PATH))
+    return None
+
+
+@st.cache_resource
+def get_leads_ingestor():
+    """Ingestor único dos exports brutos do SprintHub (estado das posições já lidas)."""
+    ingestor = LeadsStreamIngestor()
+    # Linhas lidas e ficheiros reprocessados entram nas métricas exportadas ('leads_stream.rows', ...)
+    get_tracer().add_collector("leads_stream", ingestor.as_dict)
+    return ingestor
+
+
+@traced("leads.ingest_exports")
+def ingest_leads_exports():
+    """
+    Fonte do RefreshPipeline para os exports brutos: processa só as linhas novas
+    e devolve o rollup mensal ('Periodo' = '08/2025', ...), ou UNCHANGED.
+    """
+    ingestor = get_leads_ingestor()
+    rollup = ingestor.ingest()
+    if rollup is UNCHANGED:
+        if get_snapshot_cache().current(RAW_SNAPSHOT_NAME) is not None:
+            return rollup
+        # Sem snapshot (ex: pasta de snapshots apagada): republica o rollup já gravado
+        rollup = ingestor.rollup()
+    rollup = rollup.reset_index().assign(Periodo=lambda d: d.pop('Mes').dt.strftime('%m/%Y'))
+    return compact_frame(rollup, LEADS_DTYPES)
+
+
+def _prepare_leads_snapshot(csv, raw):
+    """LeadsFunnel dos snapshots do CSV e dos exports brutos (chamado pelo DataBroker, uma vez por versão)."""
+    return prepare_leads(csv.data if csv else pd.DataFrame(), _csv_updated_at(), raw.data if raw else None)
+
+
+def load_leads_funnel():
+    """
+    Devolve o LeadsFunnel atual (None se o CSV nunca foi carregado). O CSV é
+    relido em segundo plano pelo RefreshPipeline, tal como os exports brutos de
+    leads (ver ingest_leads_exports); aqui só se leem os snapshots.
+    """
+    # Num worker (serve.py) o CSV é vigiado pelo processo refresher
+    if SERVE_ROLE != WORKER:
+        get_leads_watcher()
+    snapshot = get_refresher().watch(get_pipeline(), SNAPSHOT_NAME)
+    raw = get_snapshot_cache().current(RAW_SNAPSHOT_NAME)
+    if snapshot is None and raw is None:
+        erro = get_snapshot_cache().last_error(SNAPSHOT_NAME)
+        if erro and os.path.exists(LEADS_CSV_PATH):
+            raise RuntimeError(erro)
+        return None
+    return get_data_broker().derive("leads_funnel", [SNAPSHOT_NAME, RAW_SNAPSHOT_NAME], _prepare_leads_snapshot)
+
+
 def load_leads_data():
     """
     Carrega os dados de leads a partir do ficheiro CSV local.
     O ficheiro deve estar localizado em: data_loader/_DADOS_SPRINTHUB.csv
+    Devolve o dicionário dos três períodos relativos (ver LeadsFunnel.as_report).
     """
-    # Caminho para o ficheiro dentro da pasta data_loader
-    file_path = os.path.join("data_loader", "_DADOS_SPRINTHUB.csv")
-    
     # Estrutura inicial de retorno para garantir que o app não quebre se o ficheiro falhar
-    relatorio = {
-        "este_mes": {"gerados": 0, "qualificados": 0, "diagnostico": 0, "proposta": 0, "vendas": 0, "receita_vendas": 0.0},
-        "mes_passado": {"gerados": 0, "qualificados": 0, "diagnostico": 0, "proposta": 0, "vendas": 0, "receita_vendas": 0.0},
-        "dois_meses_atras": {"gerados": 0, "qualificados": 0, "diagnostico": 0, "proposta": 0, "vendas": 0, "receita_vendas": 0.0},
-        "ultima_atualizacao": "Ficheiro não encontrado"
-    }
-
+    vazio = LeadsFunnel(funnel_frame(pd.DataFrame()), conversion_rates(funnel_frame(pd.DataFrame())),
+                        pd.Period.now('M'))
     try:
-        # Verifica se o ficheiro existe antes de tentar ler
-        if os.path.exists(file_path):
-            # Lê o CSV utilizando o separador ponto e vírgula (;) conforme identificado no ficheiro
-            df_leads = pd.read_csv(file_path, sep=';')
-            
-            # Itera sobre as linhas para preencher o dicionário do relatório
-            for _, row in df_leads.iterrows():
-                periodo = str(row['Periodo']).strip()
-                if periodo in relatorio:
-                    relatorio[periodo] = {
-                        "gerados": int(row['gerados']),
-                        "qualificados": int(row['qualificados']),
-                        "diagnostico": int(row['diagnostico']),
-                        "proposta": int(row['proposta']),
-                        "vendas": int(row['vendas']),
-                        "receita_vendas": float(row['receita_vendas'])
-                    }
-            
-            # Obtém a data e hora da última modificação do ficheiro CSV
-            mod_time = os.path.getmtime(file_path)
-            relatorio["ultima_atualizacao"] = datetime.fromtimestamp(mod_time).strftime("%d/%m/%Y %H:%M")
-            
-        return relatorio
+        funnel = load_leads_funnel()
+        return (funnel or vazio).as_report()
     except Exception as e:
         # Em caso de erro, exibe um aviso na barra lateral para depuração
         st.sidebar.warning(f"Aviso: Não foi possível ler o CSV de Leads ({e})")
-        return relatorio
\ No newline at end of file
+        return vazio.as_report()
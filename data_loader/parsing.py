@@ -0,0 +1,92 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Caracteres removidos antes da conversão: símbolo de moeda, espaços e percentagem
+_RUIDO_NUMERICO = r"[R$\s%]"
+# Número decimal já normalizado (ponto como separador decimal), como aceite por float()
+_NUMERO_VALIDO = r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"
+
+try:
+    import pyarrow  # noqa: F401 - as operações de string em Arrow são bem mais rápidas
+    _STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    _STRING_DTYPE = "string"
+
+
+def clean_brazilian_number(value):
+    """
+    Limpa e converte um número em formato string brasileiro (ex: "R$ 1.234,56" ou "5,40%")
+    para um float (ex: 1234.56 ou 5.40).
+
+    Versão escalar (célula a célula). Para colunas inteiras use parse_brazilian_numbers.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    if pd.isna(value) or value == "":
+        return pd.NA
+
+    value_str = str(value).strip()
+
+    if value_str.startswith('#'):
+        return pd.NA
+
+    try:
+        cleaned_str = re.sub(_RUIDO_NUMERICO, '', value_str)
+
+        if '.' in cleaned_str and ',' in cleaned_str:
+            cleaned_str = cleaned_str.replace('.', '').replace(',', '.')
+        elif ',' in cleaned_str:
+            cleaned_str = cleaned_str.replace(',', '.')
+
+        return float(cleaned_str)
+
+    except (ValueError, TypeError):
+        return pd.NA
+
+
+def parse_brazilian_numbers(values):
+    """
+    Converte uma coluna inteira de números em formato brasileiro para float64,
+    numa única passagem vetorizada (operações de string do pandas + NumPy).
+
+    Segue as mesmas regras de clean_brazilian_number:
+    - "R$ 1.234,56" -> 1234.56 ; "5,40%" -> 5.40 ; "12,5" -> 12.5
+    - valores já numéricos são mantidos
+    - vazios, "#N/A", "#REF!" e textos inválidos -> NaN
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    # Colunas que já chegam numéricas (ex: UNFORMATTED_VALUE) não precisam de limpeza
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.astype(np.float64)
+
+    text = series.astype(_STRING_DTYPE).str.replace(_RUIDO_NUMERICO, '', regex=True)
+
+    # Com ponto e vírgula, o ponto é separador de milhar e é descartado
+    tem_ponto = text.str.contains('.', regex=False)
+    tem_virgula = text.str.contains(',', regex=False)
+    milhar = (tem_ponto & tem_virgula).fillna(False)
+    if milhar.any():
+        text = text.mask(milhar, text.str.replace('.', '', regex=False))
+    text = text.str.replace(',', '.', regex=False)
+
+    # Só convertemos o que é de facto um número; erros da planilha ("#N/A") e textos ficam NaN
+    valido = text.str.fullmatch(_NUMERO_VALIDO).fillna(False)
+    numbers = text.where(valido).astype(np.float64)
+    return pd.Series(numbers.to_numpy(), index=series.index, name=series.name)
+
+
+def clean_numeric_columns(df, columns, fill_value=None):
+    """
+    Aplica parse_brazilian_numbers a cada coluna de `columns` presente em `df`.
+    Se `fill_value` for indicado, os valores inválidos/vazios são substituídos por ele.
+    Altera e devolve o próprio DataFrame.
+    """
+    for col in columns:
+        if col in df.columns:
+            parsed = parse_brazilian_numbers(df[col])
+            df[col] = parsed if fill_value is None else parsed.fillna(fill_value)
+    return df
@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+MONTH_MAP = {'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4, 'maio': 5, 'junho': 6, 'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12}
+
+# Variações que também aparecem na planilha ("ago/2025", "marco/2025")
+_MONTH_ALIASES = {nome[:3]: num for nome, num in MONTH_MAP.items()}
+_MONTH_ALIASES['marco'] = 3
+_MONTH_ALIASES.update(MONTH_MAP)
+
+# "08/2025", "8-2025", "agosto/2025", "ago/25"
+_MONTH_PATTERN = r'^([a-zç]+|\d{1,2})\s*[/\-]\s*(\d{4}|\d{2})$'
+
+
+def parse_months(values):
+    """
+    Normaliza rótulos de mês para um pandas.PeriodIndex mensal, de forma vetorizada.
+
+    Aceita meses numéricos ("08/2025") e por extenso em português ("agosto/2025"),
+    além de colunas que já sejam datas ou períodos. Rótulos inválidos ficam NaT.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    if isinstance(series.dtype, pd.PeriodDtype):
+        return pd.PeriodIndex(series).asfreq('M')
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.PeriodIndex(series.dt.to_period('M'))
+
+    parts = series.astype("string").str.strip().str.lower().str.extract(_MONTH_PATTERN)
+    mes, ano = parts[0], pd.to_numeric(parts[1], errors='coerce')
+    mes = pd.to_numeric(mes, errors='coerce').fillna(mes.map(_MONTH_ALIASES))
+    ano = ano.where(ano >= 100, ano + 2000)
+
+    # Ordinal de um período mensal: meses desde 01/1970
+    valido = (mes.between(1, 12) & ano.notna()).to_numpy(dtype=bool)
+    ordinais = np.full(len(series), np.iinfo(np.int64).min, dtype=np.int64)
+    ordinais[valido] = ((ano[valido] - 1970) * 12 + mes[valido] - 1).to_numpy(dtype=np.int64)
+    return pd.PeriodIndex.from_ordinals(ordinais, freq='M')
+
+
+def to_period(value):
+    """Converte um rótulo ("08/2025"), data ou Period num pd.Period mensal."""
+    if isinstance(value, pd.Period):
+        return value.asfreq('M')
+    period = parse_months([value])[0]
+    if pd.isna(period):
+        raise ValueError(f"Mês inválido: {value!r}")
+    return period
+
+
+def month_label(period):
+    """Rótulo usado no dashboard para um mês (ex: '08/2025')."""
+    return period.strftime('%m/%Y')
+
+
+@dataclass(frozen=True)
+class MonthRange:
+    """
+    Intervalo fechado de meses [start, end].
+
+    Sobre um índice de períodos ordenado, a seleção é um slice por pesquisa
+    binária (O(log n)), sem percorrer nem comparar rótulos em Python.
+    """
+    start: pd.Period
+    end: pd.Period
+
+    @classmethod
+    def of(cls, start, end):
+        return cls(to_period(start), to_period(end))
+
+    def select(self, obj):
+        """Linhas de `obj` (DataFrame/Series/PeriodIndex ordenado) dentro do intervalo."""
+        if self.end < self.start:
+            return obj[:0]
+        if isinstance(obj, pd.Index):
+            return obj[obj.searchsorted(self.start, 'left'):obj.searchsorted(self.end, 'right')]
+        return obj.loc[self.start:self.end]
+
+    def label(self):
+        return f"{month_label(self.start)}-{month_label(self.end)}"
+
+
+def select_months(obj, months):
+    """
+    Seleciona as linhas de `obj` (indexado por mês) para `months`, que pode ser
+    um MonthRange (slice ordenado) ou uma lista de meses avulsos (ex: multiselect).
+    """
+    if isinstance(months, MonthRange):
+        return months.select(obj)
+    wanted = parse_months(list(months)) if len(months) else pd.PeriodIndex([], freq='M')
+    return obj[obj.index.isin(wanted)]
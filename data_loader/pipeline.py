@@ -0,0 +1,171 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import streamlit as st
+
+from data_loader.connections import get_connection_manager
+from data_loader.incremental import MAX_UNCHANGED_CHECKS, VALUE_PARAMS, ValuesWorksheet
+from data_loader.snapshot import UNCHANGED, get_snapshot_cache
+from data_loader.tracing import get_tracer, span
+
+
+@dataclass(frozen=True)
+class Source:
+    """
+    Uma fonte de dados do dashboard.
+
+    - fetch: leitura individual (sem argumentos), devolve DataFrame ou UNCHANGED.
+    - connection/title/parse: para abas do Google Sheets; permitem ler várias abas
+      da mesma planilha num único pedido (parse recebe um worksheet, ex: fetch_dashboard_data).
+    - required: se False, uma falha desta fonte não conta como falha do ciclo
+      (não ativa o backoff das restantes), ex: o CSV local de leads.
+    """
+    name: str
+    fetch: object
+    connection: str | None = None
+    title: str | None = None
+    parse: object = None
+    required: bool = True
+
+
+def _raise_or_return(result):
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+class RefreshPipeline:
+    """
+    Atualiza todas as fontes num único ciclo, em paralelo (ThreadPoolExecutor).
+
+    Abas da mesma planilha são lidas juntas com values_batch_get (um pedido só).
+    No fim do ciclo todas as fontes são publicadas de uma vez, com uma nova
+    versão (SnapshotSet), por isso o ciclo demora o tempo da fonte mais lenta e
+    não a soma de todas.
+    """
+
+    def __init__(self, cache, sources, listeners=()):
+        self.cache = cache
+        self.sources = list(sources)
+        # Chamados após cada publicação com {nome: DataFrame} das fontes que mudaram
+        self.listeners = list(listeners)
+        self._modified = {}
+        self._lock = threading.Lock()
+        self.last_timings = {}
+
+    @property
+    def names(self):
+        return [s.name for s in self.sources]
+
+    def _groups(self):
+        """Agrupa as abas por planilha; fontes sem planilha (ex: CSV) ficam sozinhas."""
+        manager = get_connection_manager()
+        groups = {}
+        for source in self.sources:
+            key = source.name
+            if source.connection and source.parse:
+                try:
+                    key = manager.spreadsheet_key(source.connection)
+                except Exception:
+                    pass
+            groups.setdefault(key, []).append(source)
+        return list(groups.values())
+
+    def _read_batch(self, group):
+        """Lê várias abas da mesma planilha num único pedido. Devolve {nome: DataFrame ou UNCHANGED}."""
+        manager = get_connection_manager()
+        connection = group[0].connection
+        spreadsheet = manager.spreadsheet(connection)
+
+        try:
+            modified = spreadsheet.get_lastUpdateTime()
+        except Exception:
+            modified = None
+        # Mesma lógica do modo incremental: não relê uma planilha que não mudou
+        with self._lock:
+            last, streak = self._modified.get(spreadsheet.id, (None, 0))
+            unchanged = modified is not None and last == modified and streak < MAX_UNCHANGED_CHECKS
+            if unchanged and all(self.cache.current(s.name) is not None for s in group):
+                self._modified[spreadsheet.id] = (last, streak + 1)
+                get_tracer().count("sheets.unchanged_skips")
+                return {s.name: UNCHANGED for s in group}
+
+        with span("sheets.values_batch_get"):
+            data = spreadsheet.values_batch_get([f"'{s.title}'" for s in group], params=VALUE_PARAMS)
+        ranges = data.get("valueRanges", [])
+        frames = {s.name: s.parse(ValuesWorksheet(s.title, r.get("values", []))) for s, r in zip(group, ranges)}
+        with self._lock:
+            self._modified[spreadsheet.id] = (modified, 0)
+        return frames
+
+    def _run_group(self, group):
+        with span(f"fetch.{'+'.join(s.name for s in group)}"):
+            return self._fetch_group(group)
+
+    def _fetch_group(self, group):
+        started = time.perf_counter()
+        if len(group) == 1:
+            source = group[0]
+            results = {source.name: self.cache.run_fetch(source.name, source.fetch)}
+        else:
+            try:
+                frames = self._read_batch(group)
+            except Exception as e:
+                get_connection_manager().invalidate(group[0].connection)
+                frames = {s.name: e for s in group}
+            results = {
+                s.name: self.cache.run_fetch(s.name, lambda r=frames.get(s.name): _raise_or_return(r))
+                for s in group
+            }
+        elapsed = time.perf_counter() - started
+        return results, {name: elapsed for name in results}
+
+    def run(self):
+        """Executa um ciclo completo. Devolve True se todas as fontes obrigatórias foram atualizadas."""
+        groups = self._groups()
+        started = time.perf_counter()
+        results, timings = {}, {}
+        with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="pipeline") as pool:
+            for group_results, group_timings in pool.map(self._run_group, groups):
+                results.update(group_results)
+                timings.update(group_timings)
+
+        ok = {name: r for name, r in results.items() if r is not None}
+        if ok:
+            with span("pipeline.publish"):
+                version = self.cache.publish(ok)
+            print(f"[pipeline.py] Versão {version} publicada em {time.perf_counter() - started:.1f}s "
+                  f"({', '.join(f'{n}: {t:.1f}s' for n, t in timings.items())}).")
+            changed = {name: df for name, df in ok.items() if df is not UNCHANGED}
+            for listener in self.listeners:
+                if changed:
+                    with span("pipeline.listeners"):
+                        listener(changed)
+        get_tracer().count("pipeline.cycles")
+        self.last_timings = timings
+        return all(results.get(s.name) is not None for s in self.sources if s.required)
+
+
+@st.cache_resource
+def get_pipeline():
+    """Pipeline único do processo com todas as fontes do dashboard."""
+    # Importações locais: os loaders dependem deste módulo para ler os snapshots
+    from data_loader import loader, load_operacional_data, loader_leads
+    from data_loader.history import get_history_store, history_listener, monthly_metrics, operational_metrics
+
+    # Cada snapshot publicado das abas é acrescentado ao histórico local (data_loader/history.py)
+    history = history_listener(get_history_store(), {
+        loader.SNAPSHOT_NAME: monthly_metrics,
+        load_operacional_data.SNAPSHOT_NAME: operational_metrics,
+    })
+
+    return RefreshPipeline(get_snapshot_cache(), [
+        Source(loader.SNAPSHOT_NAME, loader.download_dashboard_data,
+               "gsheets_mrr", "DADOS STREAMLIT", loader.fetch_dashboard_data),
+        Source(load_operacional_data.SNAPSHOT_NAME, load_operacional_data.download_operacional_data,
+               "gsheets_operacional", "DADOS OPERACIONAL", load_operacional_data.fetch_operacional_data),
+        Source(loader_leads.SNAPSHOT_NAME, loader_leads.fetch_leads_csv, required=False),
+        Source(loader_leads.RAW_SNAPSHOT_NAME, loader_leads.ingest_leads_exports, required=False),
+    ], listeners=[history])
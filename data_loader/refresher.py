@@ -0,0 +1,157 @@
+import random
+import threading
+import time
+
+import streamlit as st
+
+from data_loader.snapshot import SERVE_ROLE, WORKER, get_snapshot_cache
+
+# Intervalo entre atualizações das abas (segundos), igual ao antigo ttl=600
+REFRESH_INTERVAL = 600
+# Variação aleatória do intervalo (±10%) para as abas não irem todas ao Sheets ao mesmo tempo
+REFRESH_JITTER = 0.1
+# Após uma falha: 30s, 60s, 120s, ... até ao máximo abaixo
+RETRY_BASE = 30
+RETRY_MAX = 1800
+# Tempo máximo que o primeiro render espera quando ainda não há nenhum snapshot
+COLD_START_TIMEOUT = 60
+# Modo worker: de quanto em quanto tempo se verifica o contador de versão do refresher
+FOLLOW_INTERVAL = 2
+
+
+class _RefreshJob(threading.Thread):
+    """Thread que executa uma tarefa em ciclo: intervalo com jitter e backoff exponencial nas falhas."""
+
+    def __init__(self, refresher, name, task, first_delay):
+        super().__init__(name=f"refresher-{name}", daemon=True)
+        self.refresher = refresher
+        self.job_name = name
+        self.task = task
+        self.first_delay = first_delay
+        self.failures = 0
+        self.first_attempt = threading.Event()
+        if first_delay > 0:
+            self.first_attempt.set()
+
+    def next_delay(self):
+        r = self.refresher
+        if self.failures:
+            delay = min(r.retry_base * 2 ** (self.failures - 1), r.retry_max)
+        else:
+            delay = r.interval
+        return delay * (1 + random.uniform(-r.jitter, r.jitter))
+
+    def run(self):
+        delay = self.first_delay
+        while not self.refresher.stopped.wait(delay):
+            started = time.perf_counter()
+            try:
+                ok = self.task()
+            except Exception as e:
+                print(f"[refresher.py] Erro inesperado em '{self.job_name}': {e}")
+                ok = False
+            self.failures = 0 if ok else self.failures + 1
+            self.first_attempt.set()
+            delay = self.next_delay()
+            estado = "ok" if ok else f"falha #{self.failures}"
+            print(f"[refresher.py] '{self.job_name}' {estado} em {time.perf_counter() - started:.1f}s; próxima em {delay:.0f}s.")
+
+
+class _FollowJob(threading.Thread):
+    """
+    Thread do modo worker: em vez de ir ao Google Sheets, verifica o manifesto do
+    processo refresher a cada FOLLOW_INTERVAL segundos e adota as versões novas.
+    """
+
+    def __init__(self, refresher, interval):
+        super().__init__(name="refresher-follower", daemon=True)
+        self.refresher = refresher
+        self.interval = interval
+        self.first_attempt = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                version = self.refresher.cache.sync()
+                if version is not None:
+                    print(f"[refresher.py] Versão {version} adotada do processo refresher.")
+            except Exception as e:
+                print(f"[refresher.py] Erro ao ler os snapshots partilhados: {e}")
+            self.first_attempt.set()
+            if self.refresher.stopped.wait(self.interval):
+                break
+
+
+class BackgroundRefresher:
+    """
+    Atualiza os dados em segundo plano, numa thread partilhada por todas as
+    sessões do processo. A tarefa é normalmente o RefreshPipeline, que busca
+    todas as fontes num só ciclo.
+
+    Os renders leem sempre o último snapshot completo (SnapshotCache.current)
+    e nunca esperam pela rede; a única exceção é o primeiro arranque sem
+    nenhum snapshot em disco, em que não há nada para mostrar.
+    """
+
+    def __init__(self, cache, interval=REFRESH_INTERVAL, jitter=REFRESH_JITTER,
+                 retry_base=RETRY_BASE, retry_max=RETRY_MAX):
+        self.cache = cache
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def schedule(self, job_name, task, names):
+        """
+        Garante que `task` corre em ciclo (uma única thread por job_name).
+        No arranque carrega os snapshots em disco de `names`; se algum faltar ou
+        estiver velho, a primeira execução é imediata.
+        """
+        with self._lock:
+            job = self._jobs.get(job_name)
+            if job is None:
+                snapshots = [self.cache.warm_start(name) for name in names]
+                if any(s is None for s in snapshots):
+                    first_delay = 0
+                else:
+                    first_delay = max(0.0, self.interval - max(s.age_seconds() for s in snapshots))
+                job = self._jobs[job_name] = _RefreshJob(self, job_name, task, first_delay)
+                job.start()
+        return job
+
+    def follow(self, interval=FOLLOW_INTERVAL):
+        """Modo worker: garante a thread que adota os snapshots do processo refresher."""
+        with self._lock:
+            job = self._jobs.get("follower")
+            if job is None:
+                job = self._jobs["follower"] = _FollowJob(self, interval)
+                job.start()
+        return job
+
+    def watch(self, pipeline, name, timeout=COLD_START_TIMEOUT):
+        """
+        Garante que o pipeline está a ser executado em segundo plano e devolve o
+        snapshot atual da fonte `name` (None se nunca foi carregada). Num worker
+        (serve.py) só segue as versões do processo refresher: nenhum pedido ao Sheets.
+        """
+        if SERVE_ROLE == WORKER:
+            job = self.follow()
+        else:
+            job = self.schedule("pipeline", pipeline.run, pipeline.names)
+        snapshot = self.cache.current(name)
+        if snapshot is None:
+            job.first_attempt.wait(timeout)
+            snapshot = self.cache.current(name)
+        return snapshot
+
+    def stop(self):
+        self.stopped.set()
+
+
+@st.cache_resource
+def get_refresher():
+    """Instância única do BackgroundRefresher no processo do Streamlit."""
+    return BackgroundRefresher(get_snapshot_cache())
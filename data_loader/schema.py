@@ -0,0 +1,153 @@
+import unicodedata
+from dataclasses import dataclass
+
+from data_loader.dtypes import compact_frame
+
+
+def normalize_name(text):
+    """Minúsculas, sem acentos nem espaços extra (para comparar nomes de colunas e rótulos)."""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode()
+    return ' '.join(text.lower().replace('_', ' ').split())
+
+
+class SchemaError(ValueError):
+    """A aba não tem as colunas obrigatórias do esquema."""
+
+
+@dataclass(frozen=True)
+class Column:
+    """
+    Uma coluna declarada no esquema de uma aba.
+
+    - name: nome canónico, usado pelas telas e pelos snapshots.
+    - dtype: tipo compacto (data_loader/dtypes.py); None para colunas tratadas à
+      parte (ex: 'Mes', convertida em períodos).
+    - aliases: outros nomes aceites na planilha, por ordem de preferência.
+    - required: sem ela a carga falha (e o último snapshot bom continua em uso).
+    """
+    name: str
+    dtype: str | None = None
+    aliases: tuple = ()
+    required: bool = False
+
+
+@dataclass(frozen=True)
+class ValidationReport:
+    """Resultado de comparar o cabeçalho de uma aba com o esquema."""
+    schema: str
+    missing_required: tuple = ()
+    missing_optional: tuple = ()
+    renamed: tuple = ()  # (nome na planilha, nome canónico)
+    unknown: tuple = ()
+
+    @property
+    def ok(self):
+        return not self.missing_required
+
+    @property
+    def clean(self):
+        """Sem colunas em falta (obrigatórias ou opcionais)."""
+        return self.ok and not self.missing_optional
+
+    def messages(self, limit=6):
+        """Avisos curtos para a interface e os logs."""
+        def lista(nomes):
+            extra = f" (+{len(nomes) - limit})" if len(nomes) > limit else ""
+            return ", ".join(nomes[:limit]) + extra
+
+        mensagens = []
+        if self.missing_required:
+            mensagens.append(f"'{self.schema}' sem as colunas obrigatórias: {lista(self.missing_required)}")
+        if self.missing_optional:
+            mensagens.append(f"'{self.schema}' sem as colunas: {lista(self.missing_optional)}")
+        if self.renamed:
+            mensagens.append(f"'{self.schema}' com nomes alternativos: "
+                             f"{lista([f'{origem} → {nome}' for origem, nome in self.renamed])}")
+        return mensagens
+
+    def raise_for_missing(self):
+        if not self.ok:
+            raise SchemaError(self.messages()[0])
+
+
+@dataclass(frozen=True)
+class ColumnMap:
+    """
+    Mapa compilado de uma aba: nome canónico -> nome na planilha, para as colunas
+    encontradas. Calculado uma vez por carga; as telas consultam `available`
+    (um frozenset) em vez de procurar nomes alternativos a cada render.
+    """
+    schema: 'Schema'
+    sources: dict
+    report: ValidationReport
+
+    @property
+    def available(self):
+        return frozenset(self.sources)
+
+    def has(self, name):
+        return name in self.sources
+
+    @property
+    def typed(self):
+        """Colunas encontradas com tipo declarado (as que são convertidas para número)."""
+        return [c.name for c in self.schema.columns if c.dtype and c.name in self.sources]
+
+    def apply(self, df):
+        """Renomeia as colunas encontradas para os nomes canónicos (sem copiar os dados)."""
+        renames = {origem: nome for nome, origem in self.sources.items() if origem != nome}
+        return df.rename(columns=renames) if renames else df
+
+
+class Schema:
+    """
+    Esquema declarativo de uma aba: colunas, tipos e nomes alternativos.
+
+    compile(cabeçalho) resolve os nomes de uma vez (sem diferenças de acentos,
+    maiúsculas ou espaços) e devolve um ColumnMap com o relatório de validação.
+    Se várias colunas da planilha servirem para a mesma coluna canónica, ganha o
+    nome canónico e depois os nomes alternativos pela ordem declarada.
+    """
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = tuple(columns)
+        self._lookup = {}
+        for column in self.columns:
+            for rank, nome in enumerate((column.name,) + tuple(column.aliases)):
+                self._lookup.setdefault(normalize_name(nome), (column.name, rank))
+
+    @property
+    def names(self):
+        return [c.name for c in self.columns]
+
+    @property
+    def dtypes(self):
+        return {c.name: c.dtype for c in self.columns if c.dtype}
+
+    def compile(self, header):
+        escolhidas = {}
+        unknown = []
+        for origem in header:
+            match = self._lookup.get(normalize_name(origem))
+            if match is None:
+                unknown.append(str(origem))
+                continue
+            nome, rank = match
+            if nome not in escolhidas or rank < escolhidas[nome][1]:
+                escolhidas[nome] = (origem, rank)
+
+        sources = {nome: origem for nome, (origem, _) in escolhidas.items()}
+        report = ValidationReport(
+            self.name,
+            missing_required=tuple(c.name for c in self.columns if c.required and c.name not in sources),
+            missing_optional=tuple(c.name for c in self.columns if not c.required and c.name not in sources),
+            renamed=tuple((str(origem), nome) for nome, origem in sources.items() if origem != nome),
+            unknown=tuple(unknown),
+        )
+        return ColumnMap(self, sources, report)
+
+    def conform(self, df):
+        """Renomeia para os nomes canónicos e aplica os tipos compactos. Devolve (DataFrame, ColumnMap)."""
+        columns = self.compile(df.columns)
+        return compact_frame(columns.apply(df), self.dtypes), columns
@@ -0,0 +1,374 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Devolvido por um fetch quando a aba não mudou desde a última leitura (ver incremental.py)
+UNCHANGED = object()
+
+# Pasta dos snapshots locais (pode ser alterada por variável de ambiente, ex: em testes)
+SNAPSHOT_DIR = os.environ.get("KAPTHA_SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+
+# Papel deste processo (ver serve.py): "standalone" (um processo faz tudo, o padrão),
+# "refresher" (só atualiza os dados) ou "worker" (só serve páginas, com os snapshots
+# gravados pelo refresher). Fora do modo standalone os snapshots são ficheiros Arrow
+# partilhados (SharedSnapshotStore).
+STANDALONE, REFRESHER, WORKER = "standalone", "refresher", "worker"
+SERVE_ROLE = os.environ.get("KAPTHA_ROLE", STANDALONE)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Uma cópia completa de uma aba, tal como foi gravada em disco."""
+    name: str
+    data: pd.DataFrame
+    saved_at: datetime
+    # Última vez que se confirmou que os dados continuam atuais (ex: aba sem alterações)
+    checked_at: datetime | None = None
+
+    @property
+    def version(self):
+        """Identificador único da carga (muda a cada nova gravação)."""
+        return self.saved_at.timestamp()
+
+    def age_seconds(self, now=None):
+        return ((now or datetime.now()) - (self.checked_at or self.saved_at)).total_seconds()
+
+
+def _arrow_safe(df):
+    """
+    O Parquet exige um tipo por coluna: colunas de texto misturado com números
+    (comuns com UNFORMATTED_VALUE) são gravadas como texto, mantendo os vazios.
+    """
+    mixed = [
+        col for col in df.columns
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed')
+    ]
+    if not mixed:
+        return df
+    return df.assign(**{col: df[col].where(df[col].isna(), df[col].astype(str)) for col in mixed})
+
+
+class SnapshotStore:
+    """Grava e lê snapshots Parquet em disco, um ficheiro por aba."""
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.parquet")
+
+    def save(self, name, df):
+        """
+        Grava o snapshot de forma atómica: escreve num ficheiro temporário na mesma
+        pasta e só depois o renomeia, para que um leitor nunca veja um ficheiro a meio.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        final_path = self.path(name)
+        tmp_path = f"{final_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            _arrow_safe(df).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, final_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return Snapshot(name, df, datetime.fromtimestamp(os.path.getmtime(final_path)))
+
+    def load(self, name):
+        """Devolve o último snapshot gravado, ou None se não existir / estiver ilegível."""
+        path = self.path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            saved_at = datetime.fromtimestamp(os.path.getmtime(path))
+            return Snapshot(name, pd.read_parquet(path), saved_at)
+        except Exception as e:
+            print(f"[snapshot.py] Snapshot '{name}' ilegível, a ignorar: {e}")
+            return None
+
+    def commit(self, snapshots):
+        """Chamado após cada publicação com todos os snapshots atuais (só o store partilhado o usa)."""
+
+    def manifest(self):
+        return None
+
+
+def _arrow_table(df):
+    """
+    Tabela Arrow do DataFrame. As colunas float64/float32 guardam os NaN como valores
+    e não como nulos: sem máscara de nulos, o pandas lê-as sem cópia do ficheiro mapeado.
+    """
+    import pyarrow as pa
+
+    df = _arrow_safe(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, col in enumerate(df.columns):
+        if df[col].dtype in (np.float64, np.float32) and table.column(i).null_count:
+            table = table.set_column(i, table.schema.field(i), pa.array(df[col].to_numpy(), from_pandas=False))
+    return table
+
+
+class SharedSnapshotStore(SnapshotStore):
+    """
+    Snapshots partilhados entre processos (modo multi-processo, ver serve.py).
+
+    O processo refresher grava cada fonte num ficheiro Arrow IPC sem compressão
+    e, no fim de cada publicação, o manifesto (manifest.json) com um contador de
+    versão e a data de cada fonte. Os workers leem o manifesto a cada poucos
+    segundos e, quando o contador muda, mapeiam em memória (mmap) os ficheiros
+    das fontes alteradas: as colunas numéricas sem nulos são usadas sem cópia, e
+    as páginas do ficheiro ficam na cache do sistema operativo, partilhadas por
+    todos os workers.
+
+    Todas as gravações são atómicas (ficheiro temporário + os.replace): um worker
+    que ainda tenha o ficheiro anterior mapeado continua a lê-lo sem erros.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.arrow")
+
+    def _atomic_write(self, final_path, write):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{final_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, final_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def save(self, name, df):
+        import pyarrow as pa
+
+        table = _arrow_table(df)
+
+        def write(tmp_path):
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+        final_path = self.path(name)
+        self._atomic_write(final_path, write)
+        return Snapshot(name, df, datetime.fromtimestamp(os.path.getmtime(final_path)))
+
+    def load(self, name):
+        import pyarrow as pa
+
+        path = self.path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            saved_at = datetime.fromtimestamp(os.path.getmtime(path))
+            table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+            return Snapshot(name, table.to_pandas(split_blocks=True), saved_at)
+        except Exception as e:
+            print(f"[snapshot.py] Snapshot '{name}' ilegível, a ignorar: {e}")
+            return None
+
+    def manifest(self):
+        """Conteúdo do manifesto ({'version': n, 'sources': {nome: {...}}}), ou None se ainda não existir."""
+        try:
+            with open(os.path.join(self.directory, self.MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def commit(self, snapshots):
+        """Grava o manifesto com o contador de versão seguinte (continua após reiniciar o refresher)."""
+        anterior = self.manifest() or {}
+        manifest = {
+            "version": anterior.get("version", 0) + 1,
+            "sources": {
+                name: {"saved_at": s.version,
+                       "checked_at": s.checked_at.timestamp() if s.checked_at else None}
+                for name, s in snapshots.items()
+            },
+        }
+
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+
+        self._atomic_write(os.path.join(self.directory, self.MANIFEST), write)
+        return manifest["version"]
+
+
+@dataclass(frozen=True)
+class SnapshotSet:
+    """
+    Conjunto consistente dos snapshots de todas as fontes, publicado de uma só vez.
+    `version` aumenta a cada publicação (a cada ciclo de atualização concluído).
+    """
+    version: int
+    snapshots: dict
+
+    def get(self, name):
+        return self.snapshots.get(name)
+
+
+class SnapshotCache:
+    """
+    Cache em memória por cima do SnapshotStore, partilhada por todas as sessões.
+
+    Guarda o último snapshot bom de cada fonte. As leituras (current) nunca vão à
+    rede; quem atualiza os dados é o BackgroundRefresher (data_loader/refresher.py),
+    em segundo plano. Cada ciclo publica todas as fontes de uma vez (publish): quem
+    já tem a versão anterior continua a usá-la até ao próximo rerun.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or SnapshotStore()
+        self._lock = threading.Lock()
+        self._current = {}
+        self._errors = {}
+        self._version = 0
+        self._subscribers = []
+        # Modo worker: último manifesto adotado e data de cada fonte carregada (ver sync)
+        self._manifest = None
+        self._synced = {}
+
+    def current(self, name):
+        with self._lock:
+            return self._current.get(name)
+
+    def current_set(self):
+        """Versão atual de todas as fontes (SnapshotSet imutável)."""
+        with self._lock:
+            return SnapshotSet(self._version, dict(self._current))
+
+    def subscribe(self, callback):
+        """Regista `callback(versão, nomes publicados)`, chamado após cada publicação (ex: DataBroker)."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def last_error(self, name):
+        with self._lock:
+            return self._errors.get(name)
+
+    def warm_start(self, name):
+        """Carrega para memória o último snapshot em disco (se ainda não houver nenhum)."""
+        current = self.current(name)
+        if current is not None:
+            return current
+        current = self.store.load(name)
+        if current is None:
+            return None
+        with self._lock:
+            return self._current.setdefault(name, current)
+
+    def run_fetch(self, name, fetch):
+        """
+        Executa `fetch` (função sem argumentos que devolve o DataFrame da fonte, ou
+        UNCHANGED se não mudou). Devolve o resultado, ou None se falhar (exceção,
+        dados vazios, ou UNCHANGED sem snapshot anterior); o erro fica em last_error().
+        """
+        try:
+            df = fetch()
+        except Exception as e:
+            print(f"[snapshot.py] Erro ao buscar '{name}': {e}")
+            return self._fail(name, str(e))
+        if df is UNCHANGED:
+            if self.current(name) is None:
+                return self._fail(name, "Fonte sem alterações, mas sem snapshot local")
+            return df
+        if df is None or df.empty:
+            print(f"[snapshot.py] Busca de '{name}' sem dados; mantendo o último snapshot.")
+            return self._fail(name, "Fonte sem dados")
+        return df
+
+    def _fail(self, name, error):
+        with self._lock:
+            self._errors[name] = error
+        return None
+
+    def publish(self, results):
+        """
+        Grava em disco e publica de uma só vez os resultados de um ciclo
+        ({nome: DataFrame ou UNCHANGED}). Devolve a nova versão.
+        """
+        saved = {}
+        for name, df in results.items():
+            if df is UNCHANGED:
+                continue
+            try:
+                saved[name] = self.store.save(name, df)
+            except Exception as e:
+                # Sem disco gravável o dashboard continua a funcionar só em memória
+                print(f"[snapshot.py] Não foi possível gravar o snapshot '{name}': {e}")
+                saved[name] = Snapshot(name, df, datetime.now())
+
+        agora = datetime.now()
+        version = self._install(saved, {name: agora for name in results})
+        self.store.commit(self.current_set().snapshots)
+        return version
+
+    def _install(self, saved, checked):
+        """
+        Publica `saved` ({nome: Snapshot}) e marca as fontes de `checked`
+        ({nome: data}) como confirmadas nessa data. Devolve a nova versão.
+        """
+        with self._lock:
+            for name, when in checked.items():
+                if name in self._current and name not in saved:
+                    self._current[name] = replace(self._current[name], checked_at=when)
+                self._errors.pop(name, None)
+            self._current.update(saved)
+            self._version += 1
+            version = self._version
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(version, list(saved))
+        return version
+
+    def sync(self):
+        """
+        Modo worker: adota o que o processo refresher publicou no store partilhado.
+        Lê o manifesto e só carrega (mmap) as fontes cuja data mudou. Devolve a
+        nova versão, ou None se não havia nada de novo.
+        """
+        manifest = self.store.manifest()
+        if manifest is None or manifest == self._manifest:
+            return None
+
+        saved, checked = {}, {}
+        for name, info in manifest.get("sources", {}).items():
+            if info.get("checked_at"):
+                checked[name] = datetime.fromtimestamp(info["checked_at"])
+            if self._synced.get(name) == info["saved_at"] and self.current(name) is not None:
+                continue
+            snapshot = self.store.load(name)
+            if snapshot is not None:
+                saved[name] = replace(snapshot, checked_at=checked.get(name))
+                self._synced[name] = info["saved_at"]
+        self._manifest = manifest
+        return self._install(saved, checked)
+
+    def refresh(self, name, fetch):
+        """Busca e publica uma única fonte agora. Devolve True em caso de sucesso."""
+        result = self.run_fetch(name, fetch)
+        if result is None:
+            return False
+        self.publish({name: result})
+        return True
+
+
+@st.cache_resource
+def get_snapshot_cache():
+    """Instância única da SnapshotCache no processo do Streamlit."""
+    # Com vários processos (serve.py) os snapshots ficam em ficheiros Arrow partilhados
+    return SnapshotCache(SharedSnapshotStore() if SERVE_ROLE != STANDALONE else None)
+
+
+def format_snapshot_age(snapshot, now=None):
+    """Texto curto para a interface, ex: 'Dados de 18/10 14:05 (há 3 min)'."""
+    if snapshot is None:
+        return "Sem snapshot local"
+    minutos = int(snapshot.age_seconds(now) // 60)
+    idade = "agora mesmo" if minutos < 1 else f"há {minutos} min" if minutos < 120 else f"há {minutos // 60} h"
+    return f"Dados de {snapshot.checked_at or snapshot.saved_at:%d/%m %H:%M} ({idade})"
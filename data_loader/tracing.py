@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+import streamlit as st
+
+# Amostras guardadas por etapa (os percentis são calculados sobre as mais recentes)
+MAX_SAMPLES = 512
+# Reruns recentes guardados por página (spans de cada rerun)
+MAX_RERUNS = 20
+# Se definido, cada span terminado é acrescentado a este ficheiro (JSON lines)
+TRACE_FILE = os.environ.get("KAPTHA_TRACE_FILE")
+
+
+class Tracer:
+    """
+    Medição leve do caminho crítico: tempos por etapa, contadores e spans por rerun.
+
+    - span(nome): context manager que mede uma etapa (ex: 'sheets.auth',
+      'mrr.clean_numbers', 'view.Receita'); guarda as últimas MAX_SAMPLES
+      durações de cada etapa para os percentis p50/p95.
+    - count(nome): contadores de eventos (ex: acertos/falhas de cache).
+    - add_collector(nome, fn): contadores mantidos noutros objetos (ex: bytes
+      descarregados em ConnectionStats), lidos só na exportação.
+    - start_rerun/end_rerun: agrupa os spans da thread do script num rerun, para
+      ver onde foi o tempo de um rerun concreto.
+
+    Spans em threads de fundo (pipeline, refresher) entram nas estatísticas das
+    etapas, mas não no rerun de nenhuma sessão.
+    """
+
+    def __init__(self, max_samples=MAX_SAMPLES, trace_file=TRACE_FILE):
+        self.max_samples = max_samples
+        self.trace_file = trace_file
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}
+        self._counters = Counter()
+        self._collectors = {}
+        self._reruns = {}
+        self._local = threading.local()
+
+    # --- Medição ---
+    @contextmanager
+    def span(self, name, **attrs):
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._finish(name, time.perf_counter() - started, attrs, error)
+
+    def _finish(self, name, seconds, attrs, error):
+        record = {"stage": name, "seconds": seconds, "at": time.time(), **attrs}
+        if error:
+            record["error"] = error
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append(seconds)
+            count, total = self._totals.get(name, (0, 0.0))
+            self._totals[name] = (count + 1, total + seconds)
+            if error:
+                self._counters[f"{name}.errors"] += 1
+            if self.trace_file:
+                self._append(record)
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun["spans"].append(record)
+
+    def _append(self, record):
+        try:
+            with open(self.trace_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            # O registo nunca deve interromper o dashboard
+            print(f"[tracing.py] Não foi possível escrever em '{self.trace_file}': {e}")
+            self.trace_file = None
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def add_collector(self, name, collect):
+        """Regista uma função sem argumentos que devolve {contador: valor} (ex: ConnectionStats.as_dict)."""
+        with self._lock:
+            self._collectors[name] = collect
+
+    # --- Reruns ---
+    def start_rerun(self, page):
+        """Começa a agrupar os spans desta thread num rerun de `page`."""
+        self._local.rerun = {"page": page, "started": time.perf_counter(), "at": datetime.now(), "spans": []}
+
+    def end_rerun(self):
+        """Termina o rerun atual (mede-o como a etapa 'rerun.<página>') e devolve-o."""
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is None:
+            return None
+        self._local.rerun = None
+        rerun["seconds"] = time.perf_counter() - rerun.pop("started")
+        self._finish(f"rerun.{rerun['page']}", rerun["seconds"], {}, None)
+        with self._lock:
+            self._reruns.setdefault(rerun["page"], deque(maxlen=MAX_RERUNS)).append(rerun)
+        return rerun
+
+    def last_rerun(self, page):
+        with self._lock:
+            reruns = self._reruns.get(page)
+            return reruns[-1] if reruns else None
+
+    # --- Leitura / exportação ---
+    def stage_stats(self):
+        """{etapa: {count, p50_ms, p95_ms, max_ms, last_ms, total_s}} de todas as etapas medidas."""
+        with self._lock:
+            samples = {name: np.fromiter(s, dtype=float) for name, s in self._samples.items()}
+            totals = dict(self._totals)
+        stats = {}
+        for name in sorted(samples):
+            ms = samples[name] * 1000
+            p50, p95 = np.percentile(ms, [50, 95])
+            count, total = totals[name]
+            stats[name] = {"count": count, "p50_ms": float(p50), "p95_ms": float(p95),
+                           "max_ms": float(ms.max()), "last_ms": float(ms[-1]), "total_s": total}
+        return stats
+
+    def counters(self):
+        """Contadores de eventos e dos coletores registados ('<coletor>.<campo>')."""
+        with self._lock:
+            counters = dict(self._counters)
+            collectors = dict(self._collectors)
+        for prefix, collect in collectors.items():
+            try:
+                valores = collect()
+            except Exception as e:
+                print(f"[tracing.py] Coletor '{prefix}' falhou: {e}")
+                continue
+            for field, value in valores.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    counters[f"{prefix}.{field}"] = value
+        return dict(sorted(counters.items()))
+
+    def prometheus(self):
+        """Estatísticas no formato de texto do Prometheus."""
+        linhas = ["# TYPE kaptha_stage_seconds summary"]
+        for name, s in self.stage_stats().items():
+            label = f'stage="{name}"'
+            linhas.append(f'kaptha_stage_seconds{{{label},quantile="0.5"}} {s["p50_ms"] / 1000:.6f}')
+            linhas.append(f'kaptha_stage_seconds{{{label},quantile="0.95"}} {s["p95_ms"] / 1000:.6f}')
+            linhas.append(f'kaptha_stage_seconds_sum{{{label}}} {s["total_s"]:.6f}')
+            linhas.append(f'kaptha_stage_seconds_count{{{label}}} {s["count"]}')
+        # Contadores e valores dos coletores (ex: taxa de acertos) juntos, sem tipo
+        linhas.append("# TYPE kaptha_metric untyped")
+        for name, value in self.counters().items():
+            linhas.append(f'kaptha_metric{{name="{name}"}} {value}')
+        return "\n".join(linhas) + "\n"
+
+    def jsonl(self):
+        """Estatísticas em JSON lines: uma linha por etapa e uma com os contadores."""
+        at = datetime.now().isoformat(timespec='seconds')
+        linhas = [json.dumps({"type": "stage", "stage": name, "at": at, **s}, ensure_ascii=False)
+                  for name, s in self.stage_stats().items()]
+        linhas.append(json.dumps({"type": "counters", "at": at, **self.counters()}, ensure_ascii=False))
+        return "\n".join(linhas) + "\n"
+
+    def export(self, path):
+        """Grava as estatísticas num ficheiro: '.prom' em formato Prometheus, senão JSON lines."""
+        text = self.prometheus() if path.endswith(".prom") else self.jsonl()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+            self._reruns.clear()
+
+
+@st.cache_resource
+def get_tracer():
+    """Instância única do Tracer no processo do Streamlit."""
+    return Tracer()
+
+
+def span(name, **attrs):
+    """Atalho: get_tracer().span(name)."""
+    return get_tracer().span(name, **attrs)
+
+
+def traced(name):
+    """Atalho: decorador que mede cada chamada com o Tracer do processo."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,89 @@
+"""
+Exportação estática das telas do MRR_app.py (HTML e, opcionalmente, PNG).
+
+Para ecrãs que só precisam do rodízio dos KPIs e não conseguem manter uma sessão
+WebSocket aberta: as telas são calculadas com a mesma lógica do dashboard
+(dashboard/views.py) e gravadas como ficheiros estáticos, servidos por qualquer
+servidor HTTP quase sem CPU. Só volta a gerar os ficheiros quando a versão dos
+dados muda.
+
+    python export_static.py --out static_site                     # uma exportação (dados reais)
+    python export_static.py --out static_site --watch             # volta a exportar a cada versão nova
+    python export_static.py --out static_site --fixture --png     # dados sintéticos (benchmarks/fixtures.py)
+
+Ficheiros gerados: index.html (as 4 telas em rodízio no navegador, a cada 30s),
+receita.html, ltv.html, ticket_medio.html, clientes.html, plotly.min.js e, com
+--png, os gráficos em PNG (precisa do pacote kaleido).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Pasta temporária dos snapshots com --fixture (apagada no fim do processo)
+_FIXTURE_DIR = None
+
+
+def use_fixture(rows):
+    """Snapshots numa pasta temporária e planilhas falsas (sem rede nem credenciais)."""
+    global _FIXTURE_DIR
+    _FIXTURE_DIR = tempfile.TemporaryDirectory(prefix="kaptha_export_")
+    os.environ["KAPTHA_SNAPSHOT_DIR"] = os.path.join(_FIXTURE_DIR.name, "snapshots")
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    import fixtures
+
+    fixtures.install_fake_sheets(mrr_rows=rows)
+
+
+def export_once(out_dir, force, png):
+    import pandas as pd
+
+    from dashboard.static_export import export_if_changed
+    from dashboard.views import default_filters
+    from data_loader.dataset import load_prepared_dataset
+
+    ds = load_prepared_dataset()
+    if ds.empty:
+        print("[export_static.py] Sem dados da aba 'DADOS STREAMLIT'; nada exportado.")
+        return []
+    filters = default_filters(ds.months, pd.Period(datetime.now(), 'M'))
+    started = time.perf_counter()
+    escritos = export_if_changed(ds, filters, out_dir, force=force, png=png)
+    if escritos:
+        print(f"[export_static.py] {len(escritos)} ficheiros em '{out_dir}' "
+              f"({time.perf_counter() - started:.2f}s, versão {ds.version}).")
+    return escritos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="static_site", help="pasta de saída")
+    parser.add_argument("--watch", action="store_true", help="continua a correr e exporta a cada versão nova")
+    parser.add_argument("--interval", type=float, default=30, help="espera máxima (segundos) por uma versão nova com --watch")
+    parser.add_argument("--png", action="store_true", help="grava também os gráficos em PNG (kaleido)")
+    parser.add_argument("--force", action="store_true", help="exporta mesmo sem dados novos")
+    parser.add_argument("--fixture", action="store_true", help="usa dados sintéticos em vez do Google Sheets")
+    parser.add_argument("--fixture-rows", type=int, default=48, help="meses da aba sintética (até ao mês corrente)")
+    args = parser.parse_args()
+
+    # Antes de importar data_loader: a pasta dos snapshots é lida na importação
+    if args.fixture:
+        use_fixture(args.fixture_rows)
+    sys.path.insert(0, ROOT)
+
+    from data_loader.broker import get_data_broker
+
+    broker = get_data_broker()
+    version = broker.version
+    export_once(args.out, args.force, args.png)
+    while args.watch:
+        # Acorda assim que o pipeline publica uma versão nova (ou ao fim de --interval)
+        version = broker.wait_for_version(version, timeout=args.interval)
+        export_once(args.out, False, args.png)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import sys
 import os
 
@@ -11,8 +10,18 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # --- FIM DA CORREÇÃO ---
 
-# [ALTERAÇÃO] Importando do NOVO ficheiro loader_op.py
-from data_loader.loader_op import load_operacional_data
+# [ALTERAÇÃO] Importando do ficheiro load_operacional_data.py (antigo loader_op.py)
+from data_loader.load_operacional_data import SNAPSHOT_NAME, load_operacional_data, load_operacional_snapshot
+from data_loader.snapshot import format_snapshot_age
+from data_loader.history import get_history_store # [NOVO] Histórico local de KPIs por mês
+from data_loader.tracing import get_tracer # [NOVO] Tempos por etapa (painel com ?perf=1)
+from dashboard.perf_panel import render_perf_panel
+# [ALTERAÇÃO] Formatação pt-BR partilhada com o MRR_app.py (antes definida nesta página)
+from dashboard.formatting import format_currency, format_currency_delta, format_percent, format_points_delta
+
+# [NOVO] Agrupa os tempos de cada etapa deste rerun
+tracer = get_tracer()
+tracer.start_rerun("metricas_operacionais")
 
 
 # Configuração inicial da página
@@ -69,73 +78,46 @@ st.markdown("""
 # --- FIM DO AJUSTE DE CSS ---
 
 
-# --- FUNÇÕES DE FORMATAÇÃO ---
-
-def format_percentage(value, decimals=2):
-    """[CORRETO] Formata um valor decimal (ex: 0.0540) como porcentagem (ex: 5,40%)."""
-    try:
-        numeric_value = float(value)
-        if pd.isna(numeric_value):
-            return "0,00%"
-        # Multiplica por 100 para converter decimal em porcentagem
-        percentage_value = numeric_value * 100
-        return f"{percentage_value:,.{decimals}f}%".replace('.', ',')
-    except (ValueError, TypeError):
-        return "0,00%"
-
-def format_delta_percentage(current, previous, decimals=2):
-    """[CORRETO] Cria a string de delta para métricas de porcentagem (valores decimais)."""
-    if pd.isna(current): current = 0.0
-    if pd.isna(previous): previous = 0.0
-    else:
-        try:
-            previous = float(previous)
-        except (ValueError, TypeError):
-             previous = 0.0
-
-    if previous == 0:
-        return f"{format_percentage(current, decimals)} (Novo)" if current != 0 else "0,00% (0.0%)"
-
-    # Multiplica os valores por 100 para calcular a diferença de p.p.
-    delta_val = (float(current) * 100) - (previous * 100)
-    delta_pct_points = delta_val
-
-    delta_formatted = f"{delta_pct_points:,.{decimals}f} p.p.".replace('.', ',')
-    if delta_pct_points > 0: delta_formatted = f"+{delta_formatted}"
-    return f"{delta_formatted}"
-
-# [NOVO] Função para formatar CPR (assumindo que é moeda)
-def format_cpr(value):
-    """Formata um valor numérico como moeda BRL para CPR."""
-    try:
-        numeric_value = float(value)
-        if pd.isna(numeric_value):
-            return "R$ 0,00"
-        # Formata o número para o padrão brasileiro
-        return f"R$ {numeric_value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-    except (ValueError, TypeError):
-        return "R$ 0,00"
-
-# [NOVO] Função para criar delta de CPR (valor absoluto e percentual)
-def format_delta_cpr(current, previous):
-    """Cria a string de delta para métricas de CPR (moeda)."""
-    if pd.isna(current): current = 0.0
-    if pd.isna(previous) or previous == 0:
-        return f"{format_cpr(current)} (Novo)" if current > 0 else "R$ 0,00 (0.0%)"
-
-    delta_val = current - previous
-    # Evita divisão por zero se previous for zero
-    delta_pct = (delta_val / previous) * 100 if previous != 0 else 0
-
-    delta_val_formatted = f"{delta_val:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-    if delta_val > 0: delta_val_formatted = f"+{delta_val_formatted}"
-
-    # Retorna valor absoluto e percentual
-    return f"R$ {delta_val_formatted} ({delta_pct:+.1f}%)".replace('.', ',') # Ajusta formato percentual
+# --- CARREGA OS DADOS ---
+df_operacional = load_operacional_data() # Agora vindo do load_operacional_data.py
 
+# [NOVO] Idade do snapshot local (serve o último snapshot enquanto atualiza em segundo plano)
+st.sidebar.caption(format_snapshot_age(load_operacional_snapshot()))
+
+# [NOVO] Janela de comparação dos deltas, consultada no histórico local (sem pedidos ao Sheets)
+COMPARACOES = {1: "Mês anterior", 3: "Há 3 meses", 6: "Há 6 meses", 12: "Há 12 meses"}
+meses_comparacao = st.sidebar.selectbox("Comparar com", list(COMPARACOES), format_func=COMPARACOES.get)
+history = get_history_store()
+mes_atual = pd.Period.now('M')
+
+
+def kpi_values(data_row, metric):
+    """
+    (valor atual, valor de comparação) de uma KPI. O valor de comparação vem do
+    histórico (data_loader/history.py); para o mês anterior, sem histórico, usa a
+    coluna 'mes anterior' da planilha como antes.
+    """
+    atual = data_row.get(f'{metric} mes atual', pd.NA)
+    anterior = history.value(SNAPSHOT_NAME, metric, mes_atual - meses_comparacao)
+    if pd.isna(anterior) and meses_comparacao == 1:
+        anterior = data_row.get(f'{metric} mes anterior', pd.NA)
+    return atual, anterior
+
+
+# [NOVO] Delta mostrado quando a janela escolhida (3, 6 ou 12 meses) ainda não tem histórico
+SEM_HISTORICO = "Sem histórico"
+
+
+def kpi_delta(format_delta, atual, anterior, delta_color="normal"):
+    """
+    (texto do delta, delta_color) para o st.metric. Sem valor de comparação no
+    histórico o card diz "Sem histórico" (a cinzento) em vez de "(Novo)", que
+    sugeriria uma métrica nova; "(Novo)" fica para o mês anterior, como antes.
+    """
+    if pd.isna(anterior) and meses_comparacao > 1:
+        return SEM_HISTORICO, "off"
+    return format_delta(atual, anterior), delta_color
 
-# --- CARREGA OS DADOS ---
-df_operacional = load_operacional_data() # Agora vindo do loader_op.py
 
 # --- [REMOVIDO] PRÉ-CÁLCULOS GERAIS ---
 # A lógica de ordenação de 'Mes' foi removida pois não é necessária.
@@ -161,29 +143,31 @@ if not df_operacional.empty:
         st.markdown("<h6 style='text-align: center;'>Google Ads</h6>", unsafe_allow_html=True)
 
         # Extrai os valores do Google
-        ctr_google_atual = data_row.get('ctr google mes atual', pd.NA)
-        ctr_google_anterior = data_row.get('ctr google mes anterior', pd.NA)
-        cpr_google_atual = data_row.get('cpr google mes atual', pd.NA)
-        cpr_google_anterior = data_row.get('cpr google mes anterior', pd.NA)
+        # [ALTERAÇÃO] Valor anterior vem do histórico local, conforme a janela escolhida
+        ctr_google_atual, ctr_google_anterior = kpi_values(data_row, 'ctr google')
+        cpr_google_atual, cpr_google_anterior = kpi_values(data_row, 'cpr google')
 
         # Calcula os deltas
-        delta_ctr_google_str = format_delta_percentage(ctr_google_atual, ctr_google_anterior)
-        delta_cpr_google_str = format_delta_cpr(cpr_google_atual, cpr_google_anterior)
+        # [ALTERAÇÃO] "Sem histórico" quando a janela escolhida não tem valor de comparação
+        delta_ctr_google_str, cor_ctr_google = kpi_delta(format_points_delta, ctr_google_atual, ctr_google_anterior)
+        # Geralmente CPR menor é melhor
+        delta_cpr_google_str, cor_cpr_google = kpi_delta(format_currency_delta, cpr_google_atual, cpr_google_anterior, "inverse")
 
         # Exibe as métricas
         with st.container(border=True):
             st.metric(
                 label="CTR Atual",
-                value=format_percentage(ctr_google_atual),
+                value=format_percent(ctr_google_atual, decimals=2),
                 delta=delta_ctr_google_str,
+                delta_color=cor_ctr_google,
                 # delta_color="inverse" # Se CTR menor for melhor
             )
         with st.container(border=True):
             st.metric(
                 label="CPR Atual",
-                value=format_cpr(cpr_google_atual),
+                value=format_currency(cpr_google_atual),
                 delta=delta_cpr_google_str,
-                delta_color="inverse" # Geralmente CPR menor é melhor
+                delta_color=cor_cpr_google,
             )
 
     # Coluna 2: Meta Ads
@@ -191,29 +175,31 @@ if not df_operacional.empty:
         st.markdown("<h6 style='text-align: center;'>Meta Ads</h6>", unsafe_allow_html=True)
 
         # Extrai os valores do Meta
-        ctr_meta_atual = data_row.get('ctr meta mes atual', pd.NA)
-        ctr_meta_anterior = data_row.get('ctr meta mes anterior', pd.NA)
-        cpr_meta_atual = data_row.get('cpr meta mes atual', pd.NA)
-        cpr_meta_anterior = data_row.get('cpr meta mes anterior', pd.NA)
+        # [ALTERAÇÃO] Valor anterior vem do histórico local, conforme a janela escolhida
+        ctr_meta_atual, ctr_meta_anterior = kpi_values(data_row, 'ctr meta')
+        cpr_meta_atual, cpr_meta_anterior = kpi_values(data_row, 'cpr meta')
 
         # Calcula os deltas
-        delta_ctr_meta_str = format_delta_percentage(ctr_meta_atual, ctr_meta_anterior)
-        delta_cpr_meta_str = format_delta_cpr(cpr_meta_atual, cpr_meta_anterior)
+        # [ALTERAÇÃO] "Sem histórico" quando a janela escolhida não tem valor de comparação
+        delta_ctr_meta_str, cor_ctr_meta = kpi_delta(format_points_delta, ctr_meta_atual, ctr_meta_anterior)
+        # Geralmente CPR menor é melhor
+        delta_cpr_meta_str, cor_cpr_meta = kpi_delta(format_currency_delta, cpr_meta_atual, cpr_meta_anterior, "inverse")
 
         # Exibe as métricas
         with st.container(border=True):
             st.metric(
                 label="CTR Atual",
-                value=format_percentage(ctr_meta_atual),
+                value=format_percent(ctr_meta_atual, decimals=2),
                 delta=delta_ctr_meta_str,
+                delta_color=cor_ctr_meta,
                  # delta_color="inverse" # Se CTR menor for melhor
             )
         with st.container(border=True):
             st.metric(
                 label="CPR Atual",
-                value=format_cpr(cpr_meta_atual), 
+                value=format_currency(cpr_meta_atual), 
                 delta=delta_cpr_meta_str,
-                delta_color="inverse" # Geralmente CPR menor é melhor
+                delta_color=cor_cpr_meta,
             )
 
     st.markdown("---")
@@ -223,3 +209,5 @@ if not df_operacional.empty:
 else:
     st.error("Falha ao carregar os dados operacionais. Verifique a planilha ou as configurações.")
 
+# [NOVO] Painel de desempenho (escondido; aparece com ?perf=1 no URL)
+render_perf_panel(tracer, tracer.end_rerun())
@@ -0,0 +1,182 @@
+"""
+Modo multi-processo: vários workers Streamlit atrás de um balanceador local.
+
+    python serve.py --workers 4 --port 8501
+
+Arranca:
+
+- um processo refresher (KAPTHA_ROLE=refresher), o único que fala com o Google
+  Sheets e com o CSV do SprintHub: corre o RefreshPipeline e grava cada fonte num
+  ficheiro Arrow partilhado, mais o manifesto com o contador de versão
+  (SharedSnapshotStore em data_loader/snapshot.py);
+- N workers `streamlit run MRR_app.py` (KAPTHA_ROLE=worker) em portas locais,
+  que mapeiam os ficheiros Arrow em memória e recarregam quando o contador muda;
+- um balanceador TCP na porta pública, que distribui as ligações pelos workers
+  (round-robin). Cada sessão do Streamlit é uma única ligação WebSocket, por
+  isso fica no mesmo worker enquanto a página estiver aberta.
+
+Cada worker tem o seu próprio GIL: o número de TVs servidas cresce com os cores,
+e o número de pedidos ao Sheets é o mesmo de um só processo. Em produção o
+balanceador pode ser substituído por um nginx/haproxy à frente das portas dos workers.
+
+    python serve.py refresher   # só o processo refresher (ex: workers geridos à parte)
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DEFAULT_PORT = 8501
+# Portas dos workers: WORKER_PORT_BASE, WORKER_PORT_BASE + 1, ...
+WORKER_PORT_BASE = 8601
+# Bytes lidos de cada vez ao encaminhar uma ligação
+CHUNK_SIZE = 64 * 1024
+
+
+# --- Processo refresher ---
+def acquire_refresher_lock(directory):
+    """
+    Garante um único processo refresher por pasta de snapshots (lock exclusivo do
+    sistema operativo, libertado automaticamente se o processo morrer).
+    """
+    os.makedirs(directory, exist_ok=True)
+    lock = open(os.path.join(directory, "refresher.lock"), "w")
+    try:
+        import fcntl
+    except ImportError:
+        print("[serve.py] Sem fcntl (Windows): o lock do refresher não é verificado.")
+        return lock
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        raise SystemExit(f"[serve.py] Já existe um processo refresher para '{directory}'.")
+    return lock
+
+
+def run_refresher():
+    """Corre o RefreshPipeline em ciclo e publica os snapshots para os workers."""
+    os.environ["KAPTHA_ROLE"] = "refresher"
+    sys.path.insert(0, ROOT)
+    from data_loader.loader_leads import get_leads_watcher
+    from data_loader.pipeline import get_pipeline
+    from data_loader.refresher import get_refresher
+    from data_loader.snapshot import SNAPSHOT_DIR
+
+    lock = acquire_refresher_lock(SNAPSHOT_DIR)
+    refresher = get_refresher()
+    signal.signal(signal.SIGTERM, lambda *_: refresher.stop())
+
+    pipeline = get_pipeline()
+    refresher.schedule("pipeline", pipeline.run, pipeline.names)
+    # O CSV do SprintHub é publicado assim que muda, sem esperar pelo próximo ciclo
+    get_leads_watcher()
+    print(f"[serve.py] Refresher ativo (pid {os.getpid()}), snapshots em '{SNAPSHOT_DIR}'.")
+    try:
+        while not refresher.stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        refresher.stop()
+    lock.close()
+
+
+# --- Balanceador ---
+async def _pipe(reader, writer):
+    try:
+        while data := await reader.read(CHUNK_SIZE):
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+class Balancer:
+    """Proxy TCP round-robin: cada ligação nova vai para o próximo worker que aceitar a ligação."""
+
+    def __init__(self, ports, host="127.0.0.1"):
+        self.ports = list(ports)
+        self.host = host
+        self._next = itertools.cycle(range(len(self.ports)))
+
+    async def _connect(self):
+        for _ in range(len(self.ports)):
+            port = self.ports[next(self._next)]
+            try:
+                return await asyncio.open_connection(self.host, port)
+            except OSError:
+                continue
+        return None
+
+    async def handle(self, client_reader, client_writer):
+        backend = await self._connect()
+        if backend is None:
+            client_writer.close()
+            return
+        backend_reader, backend_writer = backend
+        await asyncio.gather(_pipe(client_reader, backend_writer), _pipe(backend_reader, client_writer))
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+# --- Arranque ---
+def _spawn(args, role):
+    env = dict(os.environ, KAPTHA_ROLE=role)
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env=env)
+
+
+def worker_command(app, port):
+    return ["-m", "streamlit", "run", app,
+            "--server.port", str(port), "--server.address", "127.0.0.1",
+            "--server.headless", "true", "--server.fileWatcherType", "none"]
+
+
+def run_cluster(args):
+    processes = [_spawn([os.path.abspath(__file__), "refresher"], "refresher")]
+    ports = [args.worker_port_base + i for i in range(args.workers)]
+    processes += [_spawn(worker_command(args.app, port), "worker") for port in ports]
+    print(f"[serve.py] {args.workers} workers ({ports[0]}-{ports[-1]}) atrás de {args.host}:{args.port}.")
+
+    def interrupt(*_):
+        raise KeyboardInterrupt
+
+    # Um worker em baixo é saltado pelo balanceador; o resto continua a servir
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        asyncio.run(Balancer(ports).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("role", nargs="?", choices=["cluster", "refresher"], default="cluster")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="número de workers Streamlit")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="porta pública (balanceador)")
+    parser.add_argument("--worker-port-base", type=int, default=WORKER_PORT_BASE)
+    parser.add_argument("--app", default="MRR_app.py")
+    args = parser.parse_args()
+
+    if args.role == "refresher":
+        run_refresher()
+    else:
+        run_cluster(args)
+
+
+if __name__ == "__main__":
+    main()